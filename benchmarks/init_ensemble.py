@@ -0,0 +1,62 @@
+"""
+Benchmark serial and parallel initialization of the ensemble.
+
+    python -m benchmarks.init_ensemble --copies 50 --num-cpu 4
+
+The test .cif files are copied into a temporary folder the given number of
+times, then the folder is loaded with one process and with num_cpu processes,
+by default the worker count chosen by init_cif_ensemble, which falls back to
+one process for small folders or a single core.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import time
+import click
+from core.utils import object
+
+SOURCE_PATTERN = "tests/data/*/*.cif"
+EXCLUDED_FOLDERS = ("format",)
+
+
+def copy_test_files(dir_path, copies) -> int:
+    file_paths = [
+        p
+        for p in sorted(glob.glob(SOURCE_PATTERN))
+        if os.path.basename(os.path.dirname(p)) not in EXCLUDED_FOLDERS
+    ]
+    for i in range(copies):
+        for file_path in file_paths:
+            file_name = f"{i}_{os.path.basename(os.path.dirname(file_path))}"
+            shutil.copy(file_path, os.path.join(dir_path, f"{file_name}_{os.path.basename(file_path)}"))
+    return copies * len(file_paths)
+
+
+def time_init(dir_path, num_cpu) -> float:
+    start_time = time.perf_counter()
+    object.init_cif_ensemble(dir_path, num_cpu=num_cpu)
+    return time.perf_counter() - start_time
+
+
+@click.command()
+@click.option("--copies", default=20, help="Copies of the test files.")
+@click.option(
+    "--num-cpu", type=int, default=None, help="Processes for the parallel run."
+)
+def main(copies, num_cpu):
+    with tempfile.TemporaryDirectory() as dir_path:
+        file_count = copy_test_files(dir_path, copies)
+        serial_time = time_init(dir_path, 1)
+        parallel_time = time_init(dir_path, num_cpu)
+    num_cpu = object.get_parse_worker_count(num_cpu, file_count)
+
+    click.echo(f"Files: {file_count}")
+    click.echo(f"Serial: {serial_time:.2f}s")
+    click.echo(f"Parallel ({num_cpu} processes): {parallel_time:.2f}s")
+    click.echo(f"Speedup: {serial_time / parallel_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Library API returning per-file results instead of moving files.
+
+>>> from core import api
+>>> for result in api.iter_results(paths, fields=("info", "min_dist")):
+...     print(result.file_name, result.formula, result.min_dist)
+
+Relocation is a separate step the caller chooses to run:
+
+>>> api.relocate(results, lambda r: "out/short" if r.min_dist < 2.6 else None)
+"""
+
+import os
+import shutil
+import traceback
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+from cifkit import Cif
+from core.utils import workers, session
+from core.utils.classify import get_dimension_values
+
+FIELDS = ("info", "min_dist", "CN")
+
+
+@dataclass
+class CifResult:
+    file_path: str
+    file_name: str
+    formula: str | None = None
+    structure: str | None = None
+    tag: str | None = None
+    supercell_atom_count: int | None = None
+    site_mixing_type: str | None = None
+    composition_type: int | None = None
+    min_dist: float | None = None
+    CN_values: set[int] | None = None
+    classification: list[str] = field(default_factory=list)
+    error: str | None = None
+
+
+def get_result(
+    file_path: str, fields: Iterable[str] = ("info",), dimensions: list[str] = None
+) -> CifResult:
+    """
+    Compute the requested fields and classification for a single file.
+    Errors are returned in the result instead of being raised.
+    """
+    result = CifResult(file_path, os.path.basename(file_path))
+    try:
+        cif = Cif(file_path, is_formatted=True)
+        if "info" in fields:
+            result.formula = cif.formula
+            result.structure = cif.structure
+            result.tag = cif.tag
+            result.supercell_atom_count = cif.supercell_atom_count
+            result.site_mixing_type = cif.site_mixing_type
+            result.composition_type = cif.composition_type
+        # Both come from the same connections computation
+        if "min_dist" in fields:
+            result.min_dist = cif.shortest_distance
+        if "CN" in fields:
+            result.CN_values = cif.CN_unique_values_by_min_dist_method
+        if dimensions:
+            result.classification = get_dimension_values(cif, dimensions)
+    except Exception as e:
+        print(f"Error while processing {result.file_name}")
+        print(traceback.format_exc())
+        result.error = str(e)
+    return result
+
+
+def _get_result_aux(args):
+    return get_result(*args)
+
+
+def iter_results(
+    file_paths: Iterable[str],
+    fields: Iterable[str] = ("info",),
+    dimensions: list[str] = None,
+    num_cpu: int = None,
+) -> Iterator[CifResult]:
+    """
+    Yield a CifResult per file path, in order, as each one is computed.
+    The file paths can be any iterable, e.g. a generator over a database.
+    By default, the number of workers is picked from the available cores and
+    memory, as in the options; pass num_cpu=1 to compute in this process.
+    """
+    fields = tuple(fields)
+    for field_name in fields:
+        if field_name not in FIELDS:
+            raise ValueError(f"Unknown field {field_name}, use one of {FIELDS}")
+
+    tasks = ((file_path, fields, dimensions) for file_path in file_paths)
+    num_cpu = workers.resolve_worker_count(num_cpu)
+    if num_cpu == 1:
+        yield from map(_get_result_aux, tasks)
+        return
+
+    with session.open_pool(num_cpu) as pool:
+        yield from pool.imap(_get_result_aux, tasks)
+
+
+def relocate(
+    results: Iterable[CifResult],
+    get_destination: Callable[[CifResult], str | None],
+    copy=False,
+) -> list[str]:
+    """
+    Move (or copy) each file to the folder returned by get_destination,
+    skipping results for which it returns None. Returns the new file paths.
+    """
+    new_file_paths = []
+    created_directories = set()
+    for result in results:
+        destination_path = get_destination(result)
+        if destination_path is None:
+            continue
+
+        if destination_path not in created_directories:
+            os.makedirs(destination_path, exist_ok=True)
+            created_directories.add(destination_path)
+
+        new_file_path = os.path.join(destination_path, result.file_name)
+        if copy:
+            shutil.copy(result.file_path, new_file_path)
+        else:
+            shutil.move(result.file_path, new_file_path)
+        new_file_paths.append(new_file_path)
+    return new_file_paths
@@ -0,0 +1,65 @@
+import os
+import click
+import shutil
+from collections import Counter
+from core.utils import intro, prompt, object
+from core.utils.classify import (
+    DIMENSIONS,
+    get_dimension_values,
+    get_destination_path,
+)
+
+
+def move_files_based_on_dimensions(
+    cif_dir_path: str,
+    is_interactive_mode=True,
+    dimensions: list[str] = None,
+    nested=True,
+) -> None:
+    """
+    Move files by composition type, tag and site mixing type in one pass,
+    into nested folders such as 'folder_binary/rt/full_occupancy' or combined
+    folders such as 'folder_binary_rt_full_occupancy'.
+    """
+    intro.prompt_classify_intro()
+
+    if is_interactive_mode:
+        dimensions = click.prompt(
+            "Q1. Enter the options to classify by in order, separated by a space"
+            f" ({' '.join(DIMENSIONS)})",
+            type=str,
+        ).split()
+        click.echo("\nQ2. Now choose the folder layout:")
+        click.echo("[1] Nested folders, e.g. folder_binary/rt/full_occupancy")
+        click.echo("[2] Combined folders, e.g. folder_binary_rt_full_occupancy")
+        nested = click.prompt("Enter your choice (1 or 2)", type=int) == 1
+
+    if not dimensions:
+        raise ValueError("Enter at least one option to classify by")
+    for dimension in dimensions:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown option to classify by: {dimension}")
+
+    ensemble = object.init_cif_ensemble(cif_dir_path)
+
+    # Every dimension is read from the same parsed file
+    destination_counts = Counter()
+    for cif in ensemble.cifs:
+        values = get_dimension_values(cif, dimensions)
+        destination_path = get_destination_path(cif_dir_path, values, nested)
+        os.makedirs(destination_path, exist_ok=True)
+        shutil.move(cif.file_path, os.path.join(destination_path, cif.file_name))
+        destination_counts[os.path.relpath(destination_path, cif_dir_path)] += 1
+
+    print_summary(destination_counts, ensemble.file_count)
+    prompt.print_done_with_option("classify files")
+
+
+def print_summary(destination_counts, file_count):
+    """
+    Print the number of files moved to each folder and their percentage.
+    """
+    print(f"Total files moved: {file_count}")
+    for destination, count in sorted(destination_counts.items()):
+        percentage = (count / file_count) * 100
+        print(f"{destination}: {count} files ({percentage:.2f}%)")
@@ -0,0 +1,244 @@
+import os
+import math
+import time
+import click
+import itertools
+import traceback
+from cifkit.utils import cif_parser
+from cifkit.utils.folder import get_file_paths
+from cifkit.utils.formula import get_parsed_norm_formula
+from core.utils import intro, prompt, table, workers, session
+
+# Decimals of the cell lengths (Å) and angles (°) in the overlap key
+CELL_LENGTH_DECIMALS = 2
+CELL_ANGLE_DECIMALS = 1
+
+# Default relative difference of the cell lengths for near matches, and the
+# largest difference of the cell angles (°)
+DEFAULT_TOLERANCE = 0.01
+ANGLE_TOLERANCE = 0.5
+
+EXACT = "exact"
+NEAR = "near"
+ONLY_IN_FOLDER = "only in folder"
+ONLY_IN_OTHER_FOLDER = "only in other folder"
+
+COMPARE_COLUMNS = {
+    "Filename": "string",
+    "Other filename": "string",
+    "Match": "string",
+    "Formula": "string",
+    "Structure": "string",
+    "Cell lengths (Å)": "string",
+    "Other cell lengths (Å)": "string",
+}
+
+
+def compare_folders(
+    cif_dir_path,
+    other_dir_path,
+    is_interactive_mode=True,
+    tolerance: float = DEFAULT_TOLERANCE,
+    num_cpu: int = None,
+):
+    """
+    Report the files of two folders that overlap, that nearly match within
+    the tolerance, or that are only in one folder, without moving any file.
+
+    Each file is read once and joined through hash tables, so the time grows
+    linearly with the number of files.
+    """
+    intro.prompt_compare_intro()
+    overall_start_time = time.perf_counter()
+
+    if is_interactive_mode:
+        num_cpu = prompt.prompt_num_cpu()
+        tolerance = click.prompt(
+            "\nEnter the relative tolerance of the cell lengths for near matches",
+            type=click.FloatRange(min=0, min_open=True),
+            default=DEFAULT_TOLERANCE,
+        )
+    if tolerance <= 0:
+        raise ValueError(f"The tolerance must be greater than 0, got {tolerance}")
+
+    entries = get_entries(cif_dir_path, num_cpu)
+    other_entries = get_entries(other_dir_path, num_cpu)
+    rows = join_entries(entries, other_entries, tolerance)
+
+    folder_name = os.path.basename(cif_dir_path)
+    other_folder_name = os.path.basename(other_dir_path)
+    table_path = table.get_table_path(
+        cif_dir_path, f"compare_{other_folder_name}", "csv"
+    )
+    writer = table.TableWriter(table_path, COMPARE_COLUMNS)
+    match_counts = {}
+    for row in rows:
+        match_counts[row["Match"]] = match_counts.get(row["Match"], 0) + 1
+        writer.write_row(row)
+    writer.close()
+    print(os.path.basename(table_path), "saved")
+
+    click.echo(f"\n{len(entries)} files in {folder_name},")
+    click.echo(f"{len(other_entries)} files in {other_folder_name}")
+    for match, count in sorted(match_counts.items()):
+        click.echo(f"{match}: {count}")
+
+    prompt.print_total_time(
+        time.perf_counter() - overall_start_time, len(entries) + len(other_entries)
+    )
+    prompt.print_done_with_option("compare folders")
+
+
+def get_entries(cif_dir_path, num_cpu=None) -> list[dict]:
+    """
+    Return the overlap entry of each file in the folder, read across a pool
+    of workers. Files that cannot be read are skipped.
+    """
+    file_paths = get_file_paths(cif_dir_path)
+    num_cpu = workers.resolve_worker_count(num_cpu, task_count=len(file_paths))
+    print(f"Reading {len(file_paths)} files in {os.path.basename(cif_dir_path)}")
+
+    if num_cpu == 1:
+        entries = map(get_entry, file_paths)
+    else:
+        with session.open_pool(num_cpu) as pool:
+            chunksize = max(1, len(file_paths) // (num_cpu * 4))
+            entries = list(pool.imap(get_entry, file_paths, chunksize=chunksize))
+    return [entry for entry in entries if entry is not None]
+
+
+def get_entry(file_path) -> dict | None:
+    """
+    Return the file name, reduced formula, structure and cell of a file,
+    or None if it cannot be read. Only the block of the file is parsed, with
+    the cifkit parser used by Cif, without generating the supercell. The
+    file is not edited.
+    """
+    try:
+        block = cif_parser.get_cif_block(file_path)
+        formula, structure, *_ = cif_parser.get_formula_structure_weight_s_group(
+            block
+        )
+        formula = "".join(
+            f"{element}{index}"
+            for element, index in sorted(get_parsed_norm_formula(formula))
+        )
+        return {
+            "file_name": os.path.basename(file_path),
+            "formula": formula,
+            "structure": structure,
+            "lengths": tuple(
+                float(length) for length in cif_parser.get_unitcell_lengths(block)
+            ),
+            "angles": tuple(
+                math.degrees(angle)
+                for angle in cif_parser.get_unitcell_angles_rad(block)
+            ),
+        }
+    except Exception:
+        print(f"Error while reading {os.path.basename(file_path)}")
+        print(traceback.format_exc())
+        return None
+
+
+def get_exact_key(entry) -> tuple:
+    return (
+        entry["formula"],
+        entry["structure"],
+        tuple(round(length, CELL_LENGTH_DECIMALS) for length in entry["lengths"]),
+        tuple(round(angle, CELL_ANGLE_DECIMALS) for angle in entry["angles"]),
+    )
+
+
+def get_length_bins(entry, tolerance) -> tuple[int, int, int]:
+    """
+    Return the bin of each cell length on a log scale with bins as wide as
+    the tolerance, so lengths within the tolerance are in the same or an
+    adjacent bin.
+    """
+    return tuple(
+        math.floor(math.log(length) / math.log1p(tolerance))
+        for length in entry["lengths"]
+    )
+
+
+def is_near_match(entry, other_entry, tolerance) -> bool:
+    return all(
+        abs(length - other_length) <= tolerance * max(length, other_length)
+        for length, other_length in zip(entry["lengths"], other_entry["lengths"])
+    ) and all(
+        abs(angle - other_angle) <= ANGLE_TOLERANCE
+        for angle, other_angle in zip(entry["angles"], other_entry["angles"])
+    )
+
+
+def join_entries(entries, other_entries, tolerance) -> list[dict]:
+    """
+    Return a row per overlapping or nearly matching pair of files, and per
+    file with no match in the other folder.
+
+    The other folder is indexed by the exact key, and by the formula,
+    structure and length bins for near matches. Each file then probes the
+    exact key and the 27 adjacent length bins, instead of every other file.
+    """
+    exact_index = {}
+    near_index = {}
+    for i, other_entry in enumerate(other_entries):
+        exact_index.setdefault(get_exact_key(other_entry), []).append(i)
+        near_key = (
+            other_entry["formula"],
+            other_entry["structure"],
+            get_length_bins(other_entry, tolerance),
+        )
+        near_index.setdefault(near_key, []).append(i)
+
+    rows = []
+    matched_other_indexes = set()
+    for entry in entries:
+        exact_indexes = exact_index.get(get_exact_key(entry), [])
+        for i in exact_indexes:
+            rows.append(get_row(entry, other_entries[i], EXACT))
+        matched_other_indexes.update(exact_indexes)
+        is_matched = bool(exact_indexes)
+
+        near_indexes = set()
+        bins = get_length_bins(entry, tolerance)
+        for offsets in itertools.product((-1, 0, 1), repeat=3):
+            near_key = (
+                entry["formula"],
+                entry["structure"],
+                tuple(b + offset for b, offset in zip(bins, offsets)),
+            )
+            near_indexes.update(near_index.get(near_key, []))
+        for i in sorted(near_indexes - set(exact_indexes)):
+            if is_near_match(entry, other_entries[i], tolerance):
+                rows.append(get_row(entry, other_entries[i], NEAR))
+                matched_other_indexes.add(i)
+                is_matched = True
+
+        if not is_matched:
+            rows.append(get_row(entry, None, ONLY_IN_FOLDER))
+
+    for i, other_entry in enumerate(other_entries):
+        if i not in matched_other_indexes:
+            rows.append(get_row(None, other_entry, ONLY_IN_OTHER_FOLDER))
+    return rows
+
+
+def get_row(entry, other_entry, match) -> dict:
+    known_entry = entry or other_entry
+    return {
+        "Filename": entry["file_name"] if entry else None,
+        "Other filename": other_entry["file_name"] if other_entry else None,
+        "Match": match,
+        "Formula": known_entry["formula"],
+        "Structure": known_entry["structure"],
+        "Cell lengths (Å)": format_lengths(entry),
+        "Other cell lengths (Å)": format_lengths(other_entry),
+    }
+
+
+def format_lengths(entry) -> str | None:
+    if entry is None:
+        return None
+    return " ".join(f"{length:.4f}" for length in entry["lengths"])
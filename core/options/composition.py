@@ -1,6 +1,8 @@
 import os
 import shutil
+from collections import Counter
 from core.utils import intro, prompt, object
+from core.utils.classify import COMPOSITION_TYPES
 
 
 def move_files_based_on_composition_type(cif_dir_path: str) -> None:
@@ -11,21 +13,15 @@ def move_files_based_on_composition_type(cif_dir_path: str) -> None:
 
     ensemble = object.init_cif_ensemble(cif_dir_path)
 
-    # Define the composition type naming conventions
-    composition_types = {
-        1: "unary",
-        2: "binary",
-        3: "ternary",
-        4: "quaternary",
-        5: "quinary",
-    }
-
+    # Counted as the files are moved, instead of from the full ensemble
+    composition_type_stats = Counter()
     for cif in ensemble.cifs:
         # Use 'other' for any composition type beyond 5
-        comp_type_name = composition_types.get(cif.composition_type, "other")
+        comp_type_name = COMPOSITION_TYPES.get(cif.composition_type, "other")
         move_to_dir(ensemble.dir_path, comp_type_name, cif.file_path)
+        composition_type_stats[cif.composition_type] += 1
 
-    print_summary(ensemble.composition_type_stats, ensemble.file_count)
+    print_summary(dict(composition_type_stats), ensemble.file_count)
 
     prompt.print_done_with_option("move files based on composition type")
 
@@ -1,38 +1,51 @@
 import os
 import click
 import time
-from core.utils import intro, prompt, object
+import itertools
+from core.utils import intro, prompt, object, folder
+from core.utils import checkpoint, session, workers
+from core.utils import neighbor, cache, shared
+from core.utils import metrics, report, summary
 from cifkit import CifEnsemble
-from cifkit.utils import folder
+from core.utils.folder import FileRelocator
+from core.utils.results import ResultStore
 import traceback
-import multiprocessing as mp
 from cifkit import Cif
 import os
 
+# CN values of each file, by the d/min_dist method
+CN_RESULT_COLUMNS = {"CN_values": "int16_list"}
+
 
 def move_files_based_on_coordination_number(
     cif_dir_path: str,
     is_interactive_mode=True,
     numbers: list[int] = None,
     option: int = None,
+    max_memory_mb: float = None,
+    skip_translated_points=False,
+    prototype_tolerance: float = None,
+    num_cpu: int = None,
 ) -> None:
     intro.prompt_coordination_number_intro()
-    ensemble = object.init_cif_ensemble(cif_dir_path)
+    # Files that cannot be parsed are moved before any is scheduled
+    ensemble = object.init_cif_ensemble(cif_dir_path, relocate_invalid=True)
     
-    num_cpu = 1
     if is_interactive_mode:
-        # mp
-        click.echo("\nSelect the number of core(s) for parallel/serial processing.")
-        click.echo("[1] Serial process (uses one CPU core).")
-        click.echo(f"[2] Parallel process with maximum ({mp.cpu_count()-2}) CPU cores (for 1000s of cifs).")
-        click.echo(f"[3] Enter the number of CPU cores (<={mp.cpu_count()-2}) manually for parallel processing.")
-        filter_choice = click.prompt("Enter your choice (1, 2, or 3)", type=int)
-    
-        if filter_choice == 2:
-            num_cpu = mp.cpu_count()-2
-        elif filter_choice == 3:
-            num_cpu = click.prompt(f"Enter the number of CPU cores ({mp.cpu_count()-2})", type=int)
-            num_cpu = min(num_cpu, mp.cpu_count()-2)
+        num_cpu = prompt.prompt_num_cpu()
+        max_memory_mb = prompt.prompt_max_memory_mb()
+
+        click.echo("\nQ. Do you want to reuse CN values across copies of the same")
+        click.echo("site and across files with the same prototype and cell geometry?")
+        click.echo("Faster on prototype-heavy folders, the CN may differ on files")
+        click.echo("where the rounding of coordinates moves the largest gap.")
+        if click.confirm("(Default: N)", default=False):
+            skip_translated_points = True
+            prototype_tolerance = click.prompt(
+                "Enter the tolerance for cell ratios, angles and coordinates",
+                type=float,
+                default=0.01,
+            )
 
     if is_interactive_mode:
         # Prompt for elements
@@ -56,118 +69,426 @@ def move_files_based_on_coordination_number(
     else:
         filter_choice = option
 
-    filter_and_move_files(ensemble, filter_choice, cif_dir_path, numbers, num_cpu)
+    filter_and_move_files(
+        ensemble,
+        filter_choice,
+        cif_dir_path,
+        numbers,
+        num_cpu,
+        max_memory_mb,
+        skip_translated_points,
+        prototype_tolerance,
+    )
 
 
-def CN_Num_worker(idx, cif_path, file_count, file_names_and_CNs):
-    
+def CN_Num_worker(
+    idx,
+    cif_path,
+    file_count,
+    max_memory_mb=None,
+    skip_translated_points=False,
+    structure: dict = None,
+):
+    """
+    Return the file name and its CN values, or None for the CN values if the
+    file could not be processed.
+
+    The distances are reduced in chunks of the supercell within max_memory_mb
+    (see core.utils.neighbor), the same computation as for batches of small
+    files, so the CN values of a file do not depend on how it was scheduled.
+    """
     start_time = time.perf_counter()
-    cif = Cif(cif_path, is_formatted=True)
-    file_name = cif.file_name
-    atom_count = cif.supercell_atom_count
-    
-    print(f"Processing {file_name} with {atom_count} ({idx}/{file_count})")
+    file_name = os.path.basename(cif_path)
+    CN_values = None
+
     try:
+        cif = shared.load_cif(cif_path, structure)
+        atom_count = cif.supercell_atom_count
+        print(f"Processing {file_name} with {atom_count} ({idx}/{file_count})")
+
         # Compute CN values for each .cif
-        CN_values = cif.CN_unique_values_by_min_dist_method
-        file_names_and_CNs.append([file_name, CN_values])
+        site_neighbors, _ = neighbor.compute_site_neighbors(
+            *cache.get_point_arrays(cif),
+            cif.unitcell_lengths,
+            cif.unitcell_angles,
+            max_memory_mb or neighbor.DEFAULT_MAX_MEMORY_MB,
+            skip_translated_points,
+        )
+        CN_values = neighbor.get_CN_unique_values_by_min_dist_method(site_neighbors)
     except:
         print(f"Error while processing {file_name}")
         print(traceback.format_exc())
-    
+
+    elasped_time = time.perf_counter() - start_time
+    print(f"Processed {file_name} in {elasped_time:.2f}s")
+    return file_name, CN_values
+
+
+def CN_batch_worker(batch):
+    """
+    Return the result of CN_Num_worker and the profile of each file of a
+    batch of small files, with the neighbours of every file computed at once
+    (see core.utils.neighbor.compute_batch_site_neighbors).
+    """
+    start_time = time.perf_counter()
+    profile_start = report.start_profile()
+    results = {}
+    cifs = {}
+    for task in batch:
+        file_name = os.path.basename(task["cif_path"])
+        try:
+            cif = shared.load_cif(task["cif_path"], task.get("structure"))
+            atom_count = cif.supercell_atom_count
+            print(
+                f"Processing {file_name} with {atom_count}"
+                f" ({task['idx']}/{task['file_count']})"
+            )
+            cifs[file_name] = cif
+        except:
+            print(f"Error while processing {file_name}")
+            print(traceback.format_exc())
+            results[file_name] = (file_name, None)
+
+    try:
+        batch_site_neighbors = neighbor.compute_batch_site_neighbors(
+            [
+                (
+                    *cache.get_point_arrays(cif),
+                    cif.unitcell_lengths,
+                    cif.unitcell_angles,
+                )
+                for cif in cifs.values()
+            ],
+            batch[0].get("skip_translated_points", False),
+        )
+    except:
+        # Fall back to one file at a time
+        print(traceback.format_exc())
+        return [mp_aux(task)[0] for task in batch]
+
+    for file_name, (site_neighbors, _) in zip(cifs, batch_site_neighbors):
+        try:
+            CN_values = neighbor.get_CN_unique_values_by_min_dist_method(
+                site_neighbors
+            )
+            results[file_name] = (file_name, CN_values)
+        except:
+            print(f"Error while processing {file_name}")
+            print(traceback.format_exc())
+            results[file_name] = (file_name, None)
+
     elasped_time = time.perf_counter() - start_time
-    print(f"Processed {file_name} with {atom_count} atoms in {elasped_time:.2f}s")
+    print(f"Processed {len(batch)} files in {elasped_time:.2f}s")
+    profile = report.get_profile(profile_start, None, len(batch))
+    return [
+        (
+            results[os.path.basename(task["cif_path"])],
+            {**profile, "file_name": os.path.basename(task["cif_path"])},
+        )
+        for task in batch
+    ]
+
+
+def mp_aux(arg):
+    """
+    Return the result and the profile (see core.utils.report) of each file of
+    a task, either a single file or a batch of small files.
+    """
+    if "batch" in arg:
+        return CN_batch_worker(arg["batch"])
+    profile_start = report.start_profile()
+    result = CN_Num_worker(**arg)
+    return [(result, report.get_profile(profile_start, result[0]))]
+
+
+def get_CN_values(file_names_and_CNs: ResultStore, file_name) -> set[int] | None:
+    CN_values = file_names_and_CNs.get(file_name, "CN_values")
+    return set(CN_values) if CN_values is not None else None
+
+
+def get_prototype_key(cif: Cif, tolerance: float) -> tuple:
+    """
+    Return a key shared by files with the same structure and space group, and
+    cell ratios, angles and site coordinates equal to within the tolerance.
+    The CN values only depend on distances normalized by the shortest one, so
+    element substitution and a uniform change of the cell size keep the key.
+    """
+
+    def to_bin(value):
+        return round(value / tolerance)
+
+    a, b, c = cif.unitcell_lengths
+    sites = sorted(
+        (
+            str(site.get("wyckoff_symbol")),
+            to_bin(site["x_frac_coord"] % 1),
+            to_bin(site["y_frac_coord"] % 1),
+            to_bin(site["z_frac_coord"] % 1),
+        )
+        for site in cif.atom_site_info.values()
+    )
+    return (
+        cif.structure,
+        cif.space_group_number,
+        to_bin(b / a),
+        to_bin(c / a),
+        *[to_bin(angle) for angle in cif.unitcell_angles],
+        tuple(sites),
+    )
+
+
+def compute_CN_values(
+    tasks,
+    task_memory_mbs,
+    num_cpu,
+    checkpoint_file,
+    file_names_and_CNs,
+    sink,
+    relocate_result,
+    file_report: report.FileReport = None,
+    cifs_by_name: dict = None,
+):
+    """
+    Compute the CN values of the tasks, appending each result to the
+    checkpoint, the metrics sink and the file report and relocating the file
+    as soon as it is finished. A task is a single file or a batch of small
+    files.
+    """
+    with session.open_pool(num_cpu) as pool, shared.share_structures(
+        tasks, cifs_by_name or {}
+    ):
+        for result, profile in itertools.chain.from_iterable(
+            workers.imap_unordered_within_memory(
+                pool, mp_aux, tasks, task_memory_mbs, num_cpu
+            )
+        ):
+            file_name, CN_values = result
+            file_names_and_CNs.set(file_name, CN_values=CN_values)
+            sink.observe_file(profile["wall_time"], is_error=CN_values is None)
+            if file_report is not None:
+                file_report.add(profile, (cifs_by_name or {}).get(file_name))
+            checkpoint.append_checkpoint(
+                checkpoint_file,
+                {
+                    "file_name": file_name,
+                    "CN_values": sorted(CN_values) if CN_values is not None else None,
+                },
+            )
+            relocate_result(file_name, CN_values)
 
 
-def mp_aux(*args):
-    for arg in args:
-        CN_Num_worker(**arg)
-        
-        
 def filter_and_move_files(
     ensemble: CifEnsemble,
     filter_choice: int,
     cif_dir_path: str,
     numbers: list[int],
-    num_cpu: int
+    num_cpu: int,
+    max_memory_mb: float = None,
+    skip_translated_points=False,
+    prototype_tolerance: float = None,
 ) -> None:
     # Folder info
 
     numbers_str = "_".join(str(number) for number in numbers)
     overall_start_time = time.perf_counter()
     folder_name = os.path.basename(cif_dir_path)
-    filtered_file_paths = set()
-    
-    # parallel
-    mp_manager = mp.Manager() 
-    file_names_and_CNs = mp_manager.list()
+    file_count = ensemble.file_count
+
+    if filter_choice == 1:
+        destination_path = os.path.join(
+            cif_dir_path, f"{folder_name}_CN_exact_{numbers_str}"
+        )
+    else:
+        destination_path = os.path.join(
+            cif_dir_path, f"{folder_name}_CN_contain_{numbers_str}"
+        )
+
+    # Resume from the files finished by an interrupted run with the same
+    # settings, which change the CN values
+    checkpoint_name = "CN"
+    if skip_translated_points:
+        checkpoint_name += "_skip_translated"
+    if prototype_tolerance:
+        checkpoint_name += f"_prototype_{prototype_tolerance}"
+    checkpoint_path = checkpoint.get_checkpoint_path(cif_dir_path, checkpoint_name)
+    file_names = {cif.file_name for cif in ensemble.cifs}
+    file_names_and_CNs = ResultStore(CN_RESULT_COLUMNS)
+    for file_name, record in checkpoint.load_checkpoint(checkpoint_path).items():
+        if file_name in file_names:
+            file_names_and_CNs.set(file_name, CN_values=record["CN_values"])
+    if file_names_and_CNs:
+        print(f"Resuming, {len(file_names_and_CNs)} files already processed")
+
+    # Each file is relocated as soon as its CN values are known, to folders
+    # created once on the first file moved to them
+    error_path = os.path.join(cif_dir_path, f"{folder_name}_cifs_encountered_error")
+    relocator = FileRelocator()
+    sink = metrics.open_metrics("CN")
+    file_report = report.open_report("CN")
+    cifs_by_name = {cif.file_name: cif for cif in ensemble.cifs}
+    CN_summary = summary.StreamingSummary("CN", 1)
+    active_session = session.get_active_session()
+    feature_name = ("CN", skip_translated_points, prototype_tolerance)
+
+    def relocate_result(file_name, CN_values):
+        file_path = f"{cif_dir_path}{os.sep}{file_name}"
+        if active_session is not None and CN_values is not None:
+            active_session.put_feature(feature_name, file_path, CN_values)
+        for CN in CN_values or ():
+            CN_summary.add(CN)
+
+        if CN_values is None:
+            relocator.move(file_path, error_path)
+        # Check if the CN values are exactly the same
+        elif filter_choice == 1 and set(numbers) == CN_values:
+            relocator.move(file_path, destination_path)
+        # Check if at least one of the CN values is present
+        elif filter_choice == 2 and any(num in CN_values for num in numbers):
+            relocator.move(file_path, destination_path)
+        else:
+            return
+        sink.add_relocations(1)
+
+    # Reuse the CN values computed with the same settings earlier in the session
+    if active_session is not None:
+        reused_count = 0
+        for cif in ensemble.cifs:
+            CN_values = active_session.get_feature(
+                feature_name, f"{cif_dir_path}{os.sep}{cif.file_name}"
+            )
+            if CN_values is not None and cif.file_name not in file_names_and_CNs:
+                file_names_and_CNs.set(cif.file_name, CN_values=CN_values)
+                reused_count += 1
+        if reused_count:
+            print(f"Reused CN values of {reused_count} files from the session")
+
+    for file_name in file_names_and_CNs.iter_file_names():
+        relocate_result(file_name, get_CN_values(file_names_and_CNs, file_name))
+
+    # With a prototype tolerance, only the first file per prototype key is
+    # computed and the other files of the key reuse its CN values
+    prototype_file_names = {}
+    reusing_tasks = {}
+    cifs = {}
+
     tasks = []
-    
     for i, cif in enumerate(ensemble.cifs, start=1):
-        file_name = cif.file_name
-        file_count = ensemble.file_count
-        
-        tasks.append({'idx': i,
-            'cif_path': f"{cif_dir_path}{os.sep}{cif.file_name}", 
-            'file_count': ensemble.file_count, 'file_names_and_CNs': file_names_and_CNs})
-    
-    print(f"Num tasks: {len(tasks)}")
-    with mp.Pool(num_cpu) as pool:
-        pool.map(mp_aux, tasks)
-        
-    pool.close()
-    pool.join()
+        task = {'idx': i,
+            'cif_path': f"{cif_dir_path}{os.sep}{cif.file_name}",
+            'file_count': file_count,
+            'max_memory_mb': max_memory_mb,
+            'skip_translated_points': skip_translated_points}
+        cifs[task['cif_path']] = cif
+        if prototype_tolerance:
+            key = get_prototype_key(cif, prototype_tolerance)
+            prototype_file_name = prototype_file_names.setdefault(key, cif.file_name)
+            if prototype_file_name != cif.file_name:
+                if cif.file_name not in file_names_and_CNs:
+                    reusing_tasks.setdefault(prototype_file_name, []).append(task)
+                continue
+        if cif.file_name in file_names_and_CNs:
+            continue
+        tasks.append(task)
 
-    file_names_and_CNs = list(file_names_and_CNs)
-    
-    for file_name, CN_values in file_names_and_CNs:
+    # Append each result to the checkpoint as soon as it is finished, with
+    # small files computed together in batches
+    print(f"Num tasks: {len(tasks)}")
+    tasks, task_memory_mbs = workers.batch_small_tasks(
+        tasks, [cifs[task['cif_path']] for task in tasks], max_memory_mb
+    )
+    num_cpu = workers.resolve_worker_count(num_cpu, task_memory_mbs, len(tasks))
+    with checkpoint.open_checkpoint(checkpoint_path) as checkpoint_file:
+        compute_CN_values(
+            tasks,
+            task_memory_mbs,
+            num_cpu,
+            checkpoint_file,
+            file_names_and_CNs,
+            sink,
+            relocate_result,
+            file_report,
+            cifs_by_name,
+        )
 
-        if filter_choice == 1:
-            destination_path = os.path.join(
-                cif_dir_path, f"{folder_name}_CN_exact_{numbers_str}"
+        # Files of a prototype that could not be processed are computed
+        retry_tasks = []
+        for prototype_file_name, prototype_tasks in reusing_tasks.items():
+            CN_values = get_CN_values(file_names_and_CNs, prototype_file_name)
+            if CN_values is None:
+                retry_tasks.extend(prototype_tasks)
+                continue
+            for task in prototype_tasks:
+                file_name = os.path.basename(task["cif_path"])
+                file_names_and_CNs.set(file_name, CN_values=CN_values)
+                checkpoint.append_checkpoint(
+                    checkpoint_file,
+                    {"file_name": file_name, "CN_values": sorted(CN_values)},
+                )
+                relocate_result(file_name, CN_values)
+        if reusing_tasks:
+            print(
+                f"Reused CN values for"
+                f" {sum(map(len, reusing_tasks.values())) - len(retry_tasks)}"
+                " files with the same prototype"
             )
-            # Check if the CN values are exactly the same
-            if set(numbers) == CN_values:
-                filtered_file_paths.add(f"{cif_dir_path}{os.sep}{file_name}")
-
-        elif filter_choice == 2:
-            destination_path = os.path.join(
-                cif_dir_path, f"{folder_name}_CN_contain_{numbers_str}"
+        if retry_tasks:
+            retry_tasks, retry_task_memory_mbs = workers.batch_small_tasks(
+                retry_tasks,
+                [cifs[task['cif_path']] for task in retry_tasks],
+                max_memory_mb,
+            )
+            compute_CN_values(
+                retry_tasks,
+                retry_task_memory_mbs,
+                num_cpu,
+                checkpoint_file,
+                file_names_and_CNs,
+                sink,
+                relocate_result,
+                file_report,
+                cifs_by_name,
             )
-            # Check if at least one of the CN values is present
-            if any(num in CN_values for num in numbers):
-                filtered_file_paths.add(f"{cif_dir_path}{os.sep}{file_name}")
 
-    move_files_and_prompt(
-        filtered_file_paths, destination_path, file_count, overall_start_time,
-        "filter by coordination numbers"
+    print_moved_files(
+        relocator.get_moved_file_paths(destination_path),
+        destination_path,
+        file_count,
+        overall_start_time,
+        "filter by coordination numbers",
     )
-    
-    # Find files encountered error
-    processed_file_names = [f[0] for f in file_names_and_CNs]
-    files_encountered_errors = [f"{folder_name}{os.sep}{f.file_name}" for f in ensemble.cifs if f.file_name not in processed_file_names]
+
+    # Files encountered error
+    files_encountered_errors = relocator.get_moved_file_paths(error_path)
     if files_encountered_errors:
-        move_files_and_prompt(
-            filtered_file_paths=files_encountered_errors, 
-            destination_path=os.path.join(cif_dir_path, f"{folder_name}_cifs_encountered_error"),
-            file_count=len(files_encountered_errors),
-            overall_start_time=overall_start_time,
-            message="files encountered errors"
+        print_moved_files(
+            files_encountered_errors,
+            error_path,
+            len(files_encountered_errors),
+            overall_start_time,
+            "files encountered errors",
         )
-    
 
+    # Summary of the CN values of every file
+    if CN_summary.count:
+        summary.save_summary_files(cif_dir_path, CN_summary, "CN")
+    folder.save_to_csv_directory(
+        cif_dir_path,
+        file_names_and_CNs.to_dataframe({"CN_values": "CN values"}),
+        "CN",
+    )
+
+    sink.close()
+    file_report.save(cif_dir_path)
+    checkpoint.remove_checkpoint(checkpoint_path)
 
-def move_files_and_prompt(
-    filtered_file_paths: set[str],
+
+def print_moved_files(
+    filtered_file_paths: list[str],
     destination_path: str,
     file_count: int,
     overall_start_time: float,
     message: str
 ) -> None:
-    if filtered_file_paths:
-        # Create folder and move files
-        folder.move_files(destination_path, filtered_file_paths)
-
     overall_elapsed_time = time.perf_counter() - overall_start_time
     prompt.print_total_time(overall_elapsed_time, file_count)
     prompt.print_moved_files_summary(filtered_file_paths, file_count, destination_path)
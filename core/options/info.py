@@ -1,63 +1,97 @@
+import os
 import click
-import pandas as pd
 import time
-from core.utils import folder, prompt, intro, object
+from core.utils import prompt, intro, object, table, report
 
+# Column name: (type, function computing the value from the Cif object).
+# Only the functions of the chosen columns are evaluated, so the min
+# distance, which needs every connection in the supercell, is only computed
+# when its column is chosen.
+INFO_COLUMNS = {
+    "Filename": ("string", lambda cif: cif.file_name_without_ext),
+    "Formula": ("string", lambda cif: cif.formula),
+    "Structure": ("string", lambda cif: cif.structure),
+    "Tag": ("string", lambda cif: cif.tag),
+    "Supercell atom count": ("int64", lambda cif: cif.supercell_atom_count),
+    "Site mixing type": ("string", lambda cif: cif.site_mixing_type),
+    "Composition type": ("int64", lambda cif: cif.composition_type),
+    "Min distance (Å)": ("float64", lambda cif: round(cif.shortest_distance, 3)),
+}
+MIN_DIST_COLUMN = "Min distance (Å)"
+PROCESSING_TIME_COLUMN = "Processing time (s)"
+
+# Computed unless columns are chosen
+DEFAULT_COLUMNS = [c for c in INFO_COLUMNS if c != MIN_DIST_COLUMN]
 
-def get_cif_folder_info(cif_dir_path, is_interactive_mode=True, compute_dist=False):
-    intro.prompt_info_intro()
 
-    # Keep track of data for .csv
-    results = []
+def get_cif_folder_info(
+    cif_dir_path,
+    is_interactive_mode=True,
+    compute_dist=False,
+    columns: list[str] = None,
+    output_format="csv",
+):
+    """
+    Save the chosen info columns of each file to a table, written in batches
+    as the files are processed. By default, every column but the min
+    distance is saved to CSV, and compute_dist adds the min distance.
+    """
+    intro.prompt_info_intro()
 
     # Keep track overall time
     overall_start_time = time.perf_counter()
 
     ensemble = object.init_cif_ensemble(cif_dir_path)
 
-    # Ask user to calculate distance
+    # Ask user for the columns and the format
     if is_interactive_mode:
-        click.echo("\nQ. Do you want to compute minimum distance per file (slow)?")
-        compute_dist = click.confirm("(Default: N)", default=False)
-    else:
-        compute_dist = compute_dist
+        columns = prompt_info_columns()
+        if columns is None:
+            click.echo("\nQ. Do you want to compute minimum distance per file (slow)?")
+            compute_dist = click.confirm("(Default: N)", default=False)
+        output_format = prompt_output_format()
+
+    if columns is None:
+        columns = DEFAULT_COLUMNS + ([MIN_DIST_COLUMN] if compute_dist else [])
+    for column in columns:
+        if column not in INFO_COLUMNS:
+            raise ValueError(
+                f"Unknown column {column}, use one of {list(INFO_COLUMNS)}"
+            )
+
+    base_filename = "info_with_dist" if MIN_DIST_COLUMN in columns else "info"
+    table_path = table.get_table_path(cif_dir_path, base_filename, output_format)
+    writer = table.TableWriter(
+        table_path,
+        {
+            **{column: INFO_COLUMNS[column][0] for column in columns},
+            PROCESSING_TIME_COLUMN: "float64",
+        },
+        output_format,
+    )
 
     # Process each cif object
+    file_report = report.open_report("info")
     for i, cif in enumerate(ensemble.cifs, start=1):
         file_start_time = time.perf_counter()
+        profile_start = report.start_profile()
 
         prompt.print_progress_current(
             i, cif.file_name, cif.supercell_atom_count, ensemble.file_count
         )
-        min_distance = None
-        if compute_dist:
-            min_distance = round(cif.shortest_distance, 3)
+        data = {column: INFO_COLUMNS[column][1](cif) for column in columns}
         elapsed_time = time.perf_counter() - file_start_time
-
-        data = {
-            "Filename": cif.file_name_without_ext,
-            "Formula": cif.formula,
-            "Structure": cif.structure,
-            "Tag": cif.tag,
-            "Supercell atom count": cif.supercell_atom_count,
-            "Site mixing type": cif.site_mixing_type,
-            "Composition type": cif.composition_type,
-            "Min distance (Å)": min_distance,
-            "Processing time (s)": round(elapsed_time, 3),
-        }
-        results.append(data)
+        data[PROCESSING_TIME_COLUMN] = round(elapsed_time, 3)
+        writer.write_row(data)
+        file_report.add(report.get_profile(profile_start, cif.file_name, cif=cif))
 
         prompt.print_finished_progress(
             cif.file_name, cif.supercell_atom_count, elapsed_time
         )
 
-    # Save csv
-    if compute_dist:
-        folder.save_to_csv_directory(
-            cif_dir_path, pd.DataFrame(results), "info_with_dist"
-        )
-    else:
-        folder.save_to_csv_directory(cif_dir_path, pd.DataFrame(results), "info")
+    writer.close()
+    print(os.path.basename(table_path), "saved")
+    file_report.save(cif_dir_path)
 
     # Total processing time
     total_elapsed_time = time.perf_counter() - overall_start_time
@@ -65,3 +99,59 @@ def get_cif_folder_info(cif_dir_path, is_interactive_mode=True, compute_dist=Fal
 
     # Done message
     prompt.print_done_with_option("Info")
+
+
+def prompt_info_columns() -> list[str] | None:
+    """
+    Ask for the columns to compute, or return None for the default columns.
+    """
+    click.echo("\nQ. Choose the columns to compute:")
+    column_names = list(INFO_COLUMNS)
+    for i, column in enumerate(column_names, start=1):
+        click.echo(f"[{i}] {column}")
+    while True:
+        choice = click.prompt(
+            "Enter the numbers separated by a space (Ex: '1 2 8'),"
+            " or press Enter for all but the min distance",
+            default="",
+            show_default=False,
+        )
+        try:
+            return parse_info_columns(choice, column_names)
+        except ValueError as e:
+            click.echo(f"Invalid columns: {e}")
+
+
+def parse_info_columns(choice: str, column_names: list[str]) -> list[str] | None:
+    """
+    Parse the numbers of the chosen columns, such as '1 2 8', into the
+    column names, or None if no number is given. Raise ValueError if a number
+    is not one of the listed columns.
+    """
+    columns = []
+    for number in choice.split():
+        if not number.isdigit() or not 1 <= int(number) <= len(column_names):
+            raise ValueError(
+                f"'{number}' is not a number from 1 to {len(column_names)}"
+            )
+        column = column_names[int(number) - 1]
+        if column not in columns:
+            columns.append(column)
+    return columns or None
+
+
+def prompt_output_format() -> str:
+    """
+    Ask for the table format, only offering Parquet and Arrow with pyarrow.
+    """
+    if not table.is_arrow_available():
+        return "csv"
+    click.echo("\nQ. Choose the format of the table:")
+    for i, output_format in enumerate(table.OUTPUT_FORMATS, start=1):
+        click.echo(f"[{i}] {output_format}")
+    choice = click.prompt(
+        "Enter your choice",
+        type=click.IntRange(1, len(table.OUTPUT_FORMATS)),
+        default=1,
+    )
+    return table.OUTPUT_FORMATS[choice - 1]
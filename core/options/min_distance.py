@@ -1,119 +1,567 @@
 import time
 import click
+import itertools
+import numpy as np
+import pandas as pd
 from os.path import join
-from core.utils import prompt, intro, object
+from core.utils import prompt, intro, object, folder
+from core.utils import checkpoint, session, workers
+from core.utils import neighbor, cache, shared
+from core.utils import metrics, report, summary
 from cifkit import CifEnsemble
-from core.utils.histogram import plot_distance_histogram
+from core.utils.results import ResultStore
+from core.utils.histogram import (
+    plot_distance_histogram,
+    plot_pair_distance_histograms,
+)
 import traceback
-import multiprocessing as mp
 from cifkit import Cif
 import os
 
+# Saved next to plot/histogram-min-dist.png for re-filtering
+MIN_DIST_TABLE = "min-dist"
+MIN_DIST_COLUMN = "Min distance (Å)"
+
+# Min distances are rounded to 3 decimals by cifkit
+MIN_DIST_BIN_WIDTH = 0.001
+
+# Results of each file, with the per-pair min distances sorted by pair
+MIN_DIST_RESULT_COLUMNS = {
+    "min_dist": "fixed3",
+    "pairs": "string_list",
+    "pair_min_dists": "fixed3_list",
+    "radius_sums": "fixed3_list",
+}
+
 
 def move_files_based_on_min_dist(cif_dir):
     intro.prompt_min_dist_intro()
     filter_files_by_min_dist(cif_dir)
     
 
-def min_dist_worker(idx, cif_path, file_count, file_names_and_min_dists):
+def min_dist_worker(
+    idx, cif_path, file_count, max_memory_mb=None, structure: dict = None
+):
+    """
+    Return the file name, min distance and min distance per element pair, or
+    None for the distances if the file could not be processed.
+
+    The distances are reduced in chunks of the supercell within max_memory_mb
+    (see core.utils.neighbor), the same computation as for batches of small
+    files, so the min distance and the per-pair min distances of a file do
+    not depend on how it was scheduled.
+    """
     start_time = time.perf_counter()
-    
-    cif = Cif(cif_path, is_formatted=True)
-    
-    file_name = cif.file_name
-    atom_count = cif.supercell_atom_count
+    file_name = os.path.basename(cif_path)
+    min_dist = None
+    pair_min_dists = None
 
-    # prompt.print_progress_current(idx, file_name, atom_count, file_count)
-    print(f"Processing {file_name} with {atom_count} ({idx}/{file_count})")
-    # Compute min distance
     try:
-        min_dist = cif.shortest_distance
-        file_names_and_min_dists.append([file_name, min_dist])
+        cif = shared.load_cif(cif_path, structure)
+        atom_count = cif.supercell_atom_count
+
+        # prompt.print_progress_current(idx, file_name, atom_count, file_count)
+        print(f"Processing {file_name} with {atom_count} ({idx}/{file_count})")
+
+        # Compute min distance, the per-pair min distances come from the same pass
+        min_dist, pair_min_dists = get_min_dists_in_chunks(
+            cif, max_memory_mb or neighbor.DEFAULT_MAX_MEMORY_MB
+        )
     except:
         print(f"Error while processing {file_name}")
         print(traceback.format_exc())
-    
+
     elasped_time = time.perf_counter() - start_time
     # prompt.print_finished_progress(file_name, atom_count, elasped_time)
-    print(f"Processed {file_name} with {atom_count} atoms in {elasped_time:.2f}s")
-        
-def mp_aux(*args):
-    for arg in args:
-        min_dist_worker(**arg)
+    print(f"Processed {file_name} in {elasped_time:.2f}s")
+    return file_name, min_dist, pair_min_dists
+
+
+def min_dist_batch_worker(batch):
+    """
+    Return the result of min_dist_worker and the profile of each file of a
+    batch of small files, with the distances of every file computed at once
+    (see core.utils.neighbor.compute_batch_site_neighbors).
+    """
+    start_time = time.perf_counter()
+    profile_start = report.start_profile()
+    results = {}
+    cifs = {}
+    for task in batch:
+        file_name = os.path.basename(task["cif_path"])
+        try:
+            cif = shared.load_cif(task["cif_path"], task.get("structure"))
+            atom_count = cif.supercell_atom_count
+            print(
+                f"Processing {file_name} with {atom_count}"
+                f" ({task['idx']}/{task['file_count']})"
+            )
+            cifs[file_name] = cif
+        except:
+            print(f"Error while processing {file_name}")
+            print(traceback.format_exc())
+            results[file_name] = (file_name, None, None)
+
+    try:
+        batch_site_neighbors = neighbor.compute_batch_site_neighbors(
+            [
+                (
+                    *cache.get_point_arrays(cif),
+                    cif.unitcell_lengths,
+                    cif.unitcell_angles,
+                )
+                for cif in cifs.values()
+            ]
+        )
+    except:
+        # Fall back to one file at a time
+        print(traceback.format_exc())
+        return [mp_aux(task)[0] for task in batch]
+
+    for (file_name, cif), (site_neighbors, site_pair_dists) in zip(
+        cifs.items(), batch_site_neighbors
+    ):
+        try:
+            results[file_name] = (
+                file_name,
+                *get_min_dists_from_neighbors(cif, site_neighbors, site_pair_dists),
+            )
+        except:
+            print(f"Error while processing {file_name}")
+            print(traceback.format_exc())
+            results[file_name] = (file_name, None, None)
+
+    elasped_time = time.perf_counter() - start_time
+    print(f"Processed {len(batch)} files in {elasped_time:.2f}s")
+    profile = report.get_profile(profile_start, None, len(batch))
+    return [
+        (
+            results[os.path.basename(task["cif_path"])],
+            {**profile, "file_name": os.path.basename(task["cif_path"])},
+        )
+        for task in batch
+    ]
+
+
+def get_min_dists_in_chunks(cif: Cif, max_memory_mb: float):
+    """
+    Return the min distance and the per-pair min distances and CIF radius sums
+    computed within the memory ceiling.
+    """
+    site_neighbors, site_pair_dists = neighbor.compute_site_neighbors(
+        *cache.get_point_arrays(cif),
+        cif.unitcell_lengths,
+        cif.unitcell_angles,
+        max_memory_mb,
+    )
+    return get_min_dists_from_neighbors(cif, site_neighbors, site_pair_dists)
 
 
-def filter_files_by_min_dist(cif_dir_path, is_interactive_mode=True):
+def get_min_dists_from_neighbors(cif: Cif, site_neighbors, site_pair_dists):
+    """
+    Return the min distance and the per-pair min distances and CIF radius sums
+    from the site neighbours computed by core.utils.neighbor.
+    """
+    radius_sums = neighbor.get_CIF_radius_sum(cif.unique_elements) or {}
+
+    pair_min_dists = {}
+    for (element_1, element_2), dist in neighbor.get_shortest_bond_pair_distance(
+        site_pair_dists
+    ).items():
+        pair = f"{element_1}-{element_2}"
+        pair_min_dists[pair] = (dist, radius_sums.get(pair))
+    return neighbor.get_shortest_distance(site_neighbors), pair_min_dists
+
+
+def set_min_dist_result(results: ResultStore, result) -> None:
+    """
+    Store the min distance and the per-pair min distances of a file.
+    """
+    file_name, min_dist, pair_min_dists = result
+    pair_items = sorted((pair_min_dists or {}).items())
+    results.set(
+        file_name,
+        min_dist=min_dist,
+        pairs=[pair for pair, _ in pair_items] if min_dist is not None else None,
+        pair_min_dists=[dist for _, (dist, _) in pair_items],
+        radius_sums=[radius_sum for _, (_, radius_sum) in pair_items],
+    )
+
+
+def get_min_dist_result(results: ResultStore, file_name):
+    """
+    Return the file name, min distance and per-pair min distances of a file,
+    as returned by min_dist_worker.
+    """
+    min_dist = results.get(file_name, "min_dist")
+    if min_dist is None:
+        return file_name, None, None
+    pair_min_dists = dict(
+        zip(
+            results.get(file_name, "pairs"),
+            zip(
+                results.get(file_name, "pair_min_dists"),
+                results.get(file_name, "radius_sums"),
+            ),
+        )
+    )
+    return file_name, min_dist, pair_min_dists
+
+
+def get_pair_min_dist_table(results: ResultStore) -> pd.DataFrame:
+    """
+    Return the per-pair min distances as one row per file and element pair.
+    """
+    pair_table = results.explode(
+        {
+            "pairs": "Pair",
+            "pair_min_dists": "Min distance (Å)",
+            "radius_sums": "CIF radius sum (Å)",
+        }
+    )
+    radius_sums = pair_table["CIF radius sum (Å)"]
+    pair_table["Normalized distance"] = np.where(
+        radius_sums > 0,
+        np.round(pair_table["Min distance (Å)"] / radius_sums, 3),
+        np.nan,
+    )
+    return pair_table
+
+
+def has_pair_below_normalized_dist(pair_min_dists, threshold) -> bool:
+    """
+    Return whether any element pair is below the normalized distance.
+    """
+    return any(
+        radius_sum and round(dist / radius_sum, 3) < threshold
+        for dist, radius_sum in pair_min_dists.values()
+    )
+
+
+def filter_pair_rows_by_normalized_dist(pair_table: pd.DataFrame, threshold) -> set[str]:
+    """
+    Return file names with any element pair below the normalized distance.
+    """
+    return set(
+        pair_table.loc[pair_table["Normalized distance"] < threshold, "Filename"]
+    )
+
+
+def mp_aux(arg):
+    """
+    Return the result and the profile (see core.utils.report) of each file of
+    a task, either a single file or a batch of small files.
+    """
+    if "batch" in arg:
+        return min_dist_batch_worker(arg["batch"])
+    profile_start = report.start_profile()
+    result = min_dist_worker(**arg)
+    return [(result, report.get_profile(profile_start, result[0]))]
+
+
+def filter_files_by_min_dist(
+    cif_dir_path,
+    is_interactive_mode=True,
+    pairs: list[str] = None,
+    normalized_dist_threshold: float = None,
+    max_memory_mb: float = None,
+    num_cpu: int = None,
+):
     """
     Filter files for files below the minimum distance threshold.
+
+    The min distance per element pair is collected in the same pass and saved
+    as a table, from which per-pair histograms and the normalized distance
+    filter (min distance / CIF radius sum) are built without recomputing.
+
+    By default, the number of workers is picked from the available cores and
+    memory, and fewer files are processed at once if memory runs low.
     """
 
-    # Initialize the ensemble
-    ensemble = object.init_cif_ensemble(cif_dir_path)
+    # Initialize the ensemble, moving files that cannot be parsed before any
+    # is scheduled
+    ensemble = object.init_cif_ensemble(cif_dir_path, relocate_invalid=True)
     
     # parallel
-    num_cpu = 1
     if is_interactive_mode:
-        # mp
-        click.echo("\nSelect the number of core(s) for parallel/serial processing.")
-        click.echo("[1] Serial process (uses one CPU core).")
-        click.echo(f"[2] Parallel process with maximum ({mp.cpu_count()-2}) CPU cores (for 1000s of cifs).")
-        click.echo(f"[3] Enter the number of CPU cores (<={mp.cpu_count()-2}) manually for parallel processing.")
-        filter_choice = click.prompt("Enter your choice (1, 2, or 3)", type=int)
-    
-        if filter_choice == 2:
-            num_cpu = mp.cpu_count()-2
-        elif filter_choice == 3:
-            num_cpu = click.prompt(f"Enter the number of CPU cores ({mp.cpu_count()-2})", type=int)
-            num_cpu = min(num_cpu, mp.cpu_count()-2)
-
-    mp_manager = mp.Manager() 
-    file_names_and_min_dists = mp_manager.list()
-    
-    tasks = []     
+        num_cpu = prompt.prompt_num_cpu()
+        max_memory_mb = prompt.prompt_max_memory_mb()
+
+    # Without prompts, the thresholds are known before computing and each
+    # file is relocated as soon as its result arrives. Interactive runs ask
+    # for them after the histogram, so only error files are moved early.
+    bounds = None
+    if not is_interactive_mode:
+        dist_threshold_min = 2.6  # For testing set to 2.6
+        dist_threshold_max = 12.0
+        bounds = (dist_threshold_min, dist_threshold_max)
+    relocator = folder.FileRelocator()
+    sink = metrics.open_metrics("min_dist")
+    file_report = report.open_report("min_dist")
+    cifs_by_name = {cif.file_name: cif for cif in ensemble.cifs}
+
+    def relocate_result(result):
+        file_path = f"{cif_dir_path}{os.sep}{result[0]}"
+        destination_path = get_result_destination(
+            cif_dir_path, result, bounds, normalized_dist_threshold
+        )
+        if destination_path is not None and os.path.exists(file_path):
+            relocator.move(file_path, destination_path)
+            sink.add_relocations(1)
+
+    # Resume from the files finished by an interrupted run, including files
+    # it already relocated, so the histogram and tables cover every file
+    checkpoint_path = checkpoint.get_checkpoint_path(cif_dir_path, "min_dist")
+    file_names = {cif.file_name for cif in ensemble.cifs}
+    results = ResultStore(MIN_DIST_RESULT_COLUMNS)
+    for file_name, record in checkpoint.load_checkpoint(checkpoint_path).items():
+        set_min_dist_result(
+            results,
+            (
+                file_name,
+                record["min_dist"],
+                {
+                    pair: tuple(values)
+                    for pair, values in (record["pair_min_dists"] or {}).items()
+                },
+            ),
+        )
+    if results:
+        print(f"Resuming, {len(results)} files already processed")
+
+    # Reuse the min distances computed by a previous option in the session
+    active_session = session.get_active_session()
+    if active_session is not None:
+        reused_count = 0
+        for cif in ensemble.cifs:
+            cif_path = f"{cif_dir_path}{os.sep}{cif.file_name}"
+            value = active_session.get_feature("min_dist", cif_path)
+            if value is not None and cif.file_name not in results:
+                set_min_dist_result(results, (cif.file_name, *value))
+                reused_count += 1
+        if reused_count:
+            print(f"Reused min distances of {reused_count} files from the session")
+
+    # Summary of the min distances, updated as the results arrive
+    min_dist_summary = summary.StreamingSummary(MIN_DIST_COLUMN, MIN_DIST_BIN_WIDTH)
+    for file_name in results.iter_file_names():
+        result = get_min_dist_result(results, file_name)
+        if result[1] is not None:
+            min_dist_summary.add(result[1])
+        relocate_result(result)
+
+    tasks = []
+    task_cifs = []
     for idx, cif in enumerate(ensemble.cifs, start=1):
+        if cif.file_name in results:
+            continue
         tasks.append({'idx': idx,
-            'cif_path': f"{cif_dir_path}{os.sep}{cif.file_name}", 
-            'file_count': ensemble.file_count, 'file_names_and_min_dists': file_names_and_min_dists})
+            'cif_path': f"{cif_dir_path}{os.sep}{cif.file_name}",
+            'file_count': ensemble.file_count,
+            'max_memory_mb': max_memory_mb})
+        task_cifs.append(cif)
 
-    with mp.Pool(num_cpu) as pool:
-        pool.map(mp_aux, tasks)
-        
-    pool.close()
-    pool.join()
-    
-    file_names_and_min_dists = list(file_names_and_min_dists)
-    min_dists = [m[1] for m in file_names_and_min_dists]
-    
-    # Find files encountered error
-    processed_file_names = [f[0] for f in file_names_and_min_dists]
-    files_encountered_errors = [f"{cif_dir_path}{os.sep}{f.file_name}" for f in ensemble.cifs if f.file_name not in processed_file_names]
+    # Small files are computed together in batches
+    tasks, task_memory_mbs = workers.batch_small_tasks(
+        tasks, task_cifs, max_memory_mb
+    )
+    num_cpu = workers.resolve_worker_count(num_cpu, task_memory_mbs, len(tasks))
+
+    # Append each result to the checkpoint as soon as it is finished
+    with checkpoint.open_checkpoint(checkpoint_path) as checkpoint_file:
+        with session.open_pool(num_cpu) as pool, shared.share_structures(
+            tasks, cifs_by_name
+        ):
+            for result, profile in itertools.chain.from_iterable(
+                workers.imap_unordered_within_memory(
+                    pool, mp_aux, tasks, task_memory_mbs, num_cpu
+                )
+            ):
+                file_name, min_dist, pair_min_dists = result
+                set_min_dist_result(results, result)
+                if active_session is not None and min_dist is not None:
+                    active_session.put_feature(
+                        "min_dist",
+                        f"{cif_dir_path}{os.sep}{file_name}",
+                        (min_dist, pair_min_dists),
+                    )
+                sink.observe_file(profile["wall_time"], is_error=min_dist is None)
+                file_report.add(profile, cifs_by_name.get(file_name))
+                if min_dist is not None:
+                    min_dist_summary.add(min_dist)
+                checkpoint.append_checkpoint(
+                    checkpoint_file,
+                    {
+                        "file_name": file_name,
+                        "min_dist": min_dist,
+                        "pair_min_dists": pair_min_dists,
+                    },
+                )
+                relocate_result(result)
+
+    min_dist_table = results.to_dataframe({"min_dist": MIN_DIST_COLUMN}).dropna()
+
+    # Files encountered error
+    error_path = join(ensemble.dir_path, f"cifs_encountered_error")
+    files_encountered_errors = relocator.get_moved_file_paths(error_path)
     if files_encountered_errors:
-        ensemble.move_cif_files(files_encountered_errors, join(ensemble.dir_path, f"cifs_encountered_error"))
+        print(f"Moved {len(files_encountered_errors)} files encountered error")
 
     # Folder to save the histogram
-    plot_distance_histogram(cif_dir_path, min_dists, ensemble.file_count)
+    plot_distance_histogram(cif_dir_path, min_dist_summary, ensemble.file_count)
+    summary.save_summary_files(cif_dir_path, min_dist_summary, MIN_DIST_TABLE)
+
+    # Save the min distances next to the histogram for re-filtering
+    folder.save_results_table(cif_dir_path, min_dist_table, MIN_DIST_TABLE)
 
-    if is_interactive_mode:    
+    # Save the min distance per element pair table
+    pair_table = get_pair_min_dist_table(results)
+    folder.save_to_csv_directory(cif_dir_path, pair_table, "min_dist_per_pair")
+
+    if is_interactive_mode:
+        pairs_input = click.prompt(
+            "\nEnter the element pairs to plot histograms for, separated by a"
+            " space (Ex: 'Co-Er'), or press Enter to skip",
+            default="",
+            show_default=False,
+        ).strip()
+        pairs = pairs_input.split()
+
+    if pairs:
+        plot_pair_distance_histograms(cif_dir_path, pair_table, pairs)
+
+    if bounds is not None:
+        # Already relocated as the results arrived
+        destination_path = get_dist_destination_path(cif_dir_path, *bounds)
+        filtered_file_paths = relocator.get_moved_file_paths(destination_path)
+        prompt.print_moved_files_summary(
+            filtered_file_paths, ensemble.file_count, destination_path
+        )
+        if normalized_dist_threshold is not None:
+            destination_path = get_normalized_dist_destination_path(
+                cif_dir_path, normalized_dist_threshold
+            )
+            prompt.print_moved_files_summary(
+                relocator.get_moved_file_paths(destination_path),
+                ensemble.file_count,
+                destination_path,
+            )
+    else:
         click.echo("Note: .cif with minimum distance out of the bounds will be relocated.")
         prompt_dist_threshold_min = "\nEnter the threashold low minimum distance (unit in Å)"
         dist_threshold_min = click.prompt(prompt_dist_threshold_min, type=float)
         
         prompt_dist_threshold_max = "\nEnter the threashold high minimum distance (unit in Å)"
         dist_threshold_max = click.prompt(prompt_dist_threshold_max, type=float)
-    else:
-        dist_threshold_min = 2.6  # For testing set to 2.6
-        dist_threshold_max = 12.0
-    
-    # Filter files based on the minimum distance
-    filtered_file_paths = [f"{cif_dir_path}{os.sep}{p[0]}" \
-        for p in file_names_and_min_dists if not dist_threshold_min < p[1] < dist_threshold_max]
-    destination_path = join(ensemble.dir_path, f"dist_between_{dist_threshold_min}_{dist_threshold_max}")
 
-    # Move filtered files to a new directory
+        # Filter the files still in the folder based on the minimum distance
+        filtered_file_paths = get_file_paths_out_of_bounds(
+            cif_dir_path,
+            min_dist_table[min_dist_table["Filename"].isin(file_names)].values,
+            dist_threshold_min,
+            dist_threshold_max,
+        )
+        destination_path = get_dist_destination_path(
+            cif_dir_path, dist_threshold_min, dist_threshold_max
+        )
+
+        # Move filtered files to a new directory
+        if filtered_file_paths:
+            ensemble.move_cif_files(filtered_file_paths, destination_path)
+            sink.add_relocations(len(filtered_file_paths))
+
+        prompt.print_moved_files_summary(
+            filtered_file_paths, ensemble.file_count, destination_path
+        )
+
+        click.echo("\nQ. Do you want to relocate files by element pair distance")
+        click.echo("normalized by the CIF radius sum (Ex: 0.8)?")
+        if click.confirm("(Default: N)", default=False):
+            normalized_dist_threshold = click.prompt(
+                "Enter the threshold normalized distance", type=float
+            )
+
+        if normalized_dist_threshold is not None:
+            moved_file_paths = relocate_files_by_normalized_dist(
+                ensemble,
+                pair_table[pair_table["Filename"].isin(file_names)],
+                normalized_dist_threshold,
+                filtered_file_paths,
+            )
+            sink.add_relocations(len(moved_file_paths))
+
+    sink.close()
+    file_report.save(cif_dir_path)
+    checkpoint.remove_checkpoint(checkpoint_path)
+    prompt.print_done_with_option("min_dist_below_{dist_threshold}")
+
+
+def get_dist_destination_path(cif_dir_path, dist_threshold_min, dist_threshold_max):
+    return join(cif_dir_path, f"dist_between_{dist_threshold_min}_{dist_threshold_max}")
+
+
+def get_normalized_dist_destination_path(cif_dir_path, threshold):
+    return join(cif_dir_path, f"normalized_dist_below_{threshold}")
+
+
+def get_result_destination(
+    cif_dir_path, result, bounds, normalized_dist_threshold
+) -> str | None:
+    """
+    Return the folder a file is relocated to from its result, or None if it
+    stays. Without bounds, only files that could not be processed are moved.
+    """
+    file_name, min_dist, _ = result
+    if min_dist is None:
+        return join(cif_dir_path, f"cifs_encountered_error")
+    if bounds is None:
+        return None
+
+    dist_threshold_min, dist_threshold_max = bounds
+    if not dist_threshold_min < min_dist < dist_threshold_max:
+        return get_dist_destination_path(cif_dir_path, *bounds)
+    if normalized_dist_threshold is not None and has_pair_below_normalized_dist(
+        result[2], normalized_dist_threshold
+    ):
+        return get_normalized_dist_destination_path(
+            cif_dir_path, normalized_dist_threshold
+        )
+    return None
+
+
+def get_file_paths_out_of_bounds(
+    cif_dir_path, file_names_and_min_dists, dist_threshold_min, dist_threshold_max
+) -> list[str]:
+    """
+    Return file paths with the min distance not between the low and high bounds.
+    """
+    return [
+        f"{cif_dir_path}{os.sep}{file_name}"
+        for file_name, min_dist in file_names_and_min_dists
+        if not dist_threshold_min < min_dist < dist_threshold_max
+    ]
+
+
+def relocate_files_by_normalized_dist(
+    ensemble: CifEnsemble, pair_table: pd.DataFrame, threshold, moved_file_paths
+):
+    """
+    Move files with any element pair below the normalized distance threshold,
+    and return the moved file paths.
+    """
+    cif_dir_path = ensemble.dir_path
+    file_names = filter_pair_rows_by_normalized_dist(pair_table, threshold)
+    filtered_file_paths = [
+        f"{cif_dir_path}{os.sep}{file_name}"
+        for file_name in sorted(file_names)
+        if f"{cif_dir_path}{os.sep}{file_name}" not in moved_file_paths
+    ]
+    destination_path = get_normalized_dist_destination_path(cif_dir_path, threshold)
+
     if filtered_file_paths:
         ensemble.move_cif_files(filtered_file_paths, destination_path)
 
     prompt.print_moved_files_summary(
         filtered_file_paths, ensemble.file_count, destination_path
     )
-    prompt.print_done_with_option("min_dist_below_{dist_threshold}")
+    return filtered_file_paths
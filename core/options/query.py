@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import click
+import traceback
+from cifkit import Cif
+from cifkit.utils import folder
+from core.utils import intro, prompt, object, workers, session
+from core.utils.classify import COMPOSITION_TYPES
+
+# Relative cost of evaluating each field. Fields of cost 0 and 1 are read
+# from the parsed ensemble; fields of cost 2 need the connections computed
+# in a worker, and both min distance and CN come from the same computation.
+FIELD_COSTS = {
+    "composition": 0,
+    "elements": 0,
+    "tag": 0,
+    "mixing": 0,
+    "supercell": 1,
+    "min_dist": 2,
+    "CN": 2,
+}
+
+EXPENSIVE_COST = 2
+
+FIELD_ATTRIBUTES = {
+    "composition": "composition_type",
+    "elements": "unique_elements",
+    "tag": "tag",
+    "mixing": "site_mixing_type",
+    "supercell": "supercell_atom_count",
+    "min_dist": "shortest_distance",
+    "CN": "CN_unique_values_by_min_dist_method",
+}
+
+NUMERIC_OPERATORS = (">=", "<=", ">", "<")
+
+TERM_PATTERN = re.compile(r"^\s*(\w+)\s*(>=|<=|=|~|>|<)\s*(.+?)\s*$")
+
+
+def move_files_based_on_query(
+    cif_dir_path: str,
+    is_interactive_mode=True,
+    expression: str = None,
+    num_cpu: int = None,
+) -> None:
+    """
+    Move CIF files matching a filter expression combining several options,
+    e.g. 'composition=binary and elements~Er and CN~12 and min_dist>2.6'.
+    """
+    intro.prompt_query_intro()
+
+    if is_interactive_mode:
+        while True:
+            expression = click.prompt("Q1. Enter the filter expression", type=str)
+            try:
+                predicates = parse_expression(expression)
+                break
+            except ValueError as e:
+                click.echo(f"Invalid expression: {e}")
+    else:
+        predicates = parse_expression(expression)
+
+    ensemble = object.init_cif_ensemble(cif_dir_path)
+
+    cheap_predicates = [p for p in predicates if FIELD_COSTS[p[0]] < EXPENSIVE_COST]
+    expensive_predicates = [
+        p for p in predicates if FIELD_COSTS[p[0]] >= EXPENSIVE_COST
+    ]
+
+    if expensive_predicates and is_interactive_mode:
+        num_cpu = prompt.prompt_num_cpu()
+
+    overall_start_time = time.perf_counter()
+
+    # Stage 1. Rule out files with the cheap predicates first
+    cif_paths = [
+        cif.file_path
+        for cif in ensemble.cifs
+        if all(evaluate_predicate(p, cif) for p in cheap_predicates)
+    ]
+    click.echo(
+        f"{len(cif_paths)} out of {ensemble.file_count} files match"
+        f" {len(cheap_predicates)} cheap predicate(s)."
+    )
+
+    # Stage 2. Only the remaining files are scheduled on the pool
+    files_encountered_errors = []
+    if expensive_predicates and cif_paths:
+        filtered_file_paths, files_encountered_errors = filter_files_in_pool(
+            cif_paths, expensive_predicates, num_cpu, ensemble
+        )
+    elif expensive_predicates:
+        filtered_file_paths = []
+    else:
+        filtered_file_paths = cif_paths
+
+    folder_name = os.path.basename(cif_dir_path)
+    destination_path = os.path.join(cif_dir_path, f"{folder_name}_query")
+
+    if filtered_file_paths:
+        folder.move_files(destination_path, filtered_file_paths)
+
+    if files_encountered_errors:
+        folder.move_files(
+            os.path.join(cif_dir_path, f"{folder_name}_cifs_encountered_error"),
+            files_encountered_errors,
+        )
+
+    prompt.print_total_time(
+        time.perf_counter() - overall_start_time, ensemble.file_count
+    )
+    prompt.print_moved_files_summary(
+        filtered_file_paths, ensemble.file_count, destination_path
+    )
+    prompt.print_done_with_option("filter by query")
+
+
+def parse_expression(expression: str) -> list[tuple[str, str, list]]:
+    """
+    Parse terms joined by 'and' into (field, operator, values), ordered from
+    the cheapest to the most expensive field.
+    """
+    predicates = []
+    for term in re.split(r"\s+and\s+", expression.strip(), flags=re.IGNORECASE):
+        match = TERM_PATTERN.match(term)
+        if not match:
+            raise ValueError(f"cannot parse '{term}'")
+
+        field, operator, values_str = match.groups()
+        if field not in FIELD_COSTS:
+            raise ValueError(
+                f"unknown field '{field}', use one of {', '.join(FIELD_COSTS)}"
+            )
+
+        values = [parse_value(field, v) for v in values_str.split(",") if v.strip()]
+        if operator in NUMERIC_OPERATORS and field not in (
+            "composition",
+            "supercell",
+            "min_dist",
+        ):
+            raise ValueError(f"'{operator}' is not supported for '{field}'")
+        if operator in NUMERIC_OPERATORS and len(values) != 1:
+            raise ValueError(f"'{operator}' takes a single value in '{term}'")
+
+        predicates.append((field, operator, values))
+
+    return sorted(predicates, key=lambda p: FIELD_COSTS[p[0]])
+
+
+def parse_value(field: str, value: str):
+    """
+    Convert a value in the expression to the type of the Cif attribute.
+    """
+    value = value.strip()
+    if field == "composition":
+        composition_types = {name: n for n, name in COMPOSITION_TYPES.items()}
+        if value in composition_types:
+            return composition_types[value]
+        return int(value)
+    if field in ("supercell", "CN"):
+        return int(value)
+    if field == "min_dist":
+        return float(value)
+    return value
+
+
+def evaluate_predicate(predicate, cif: Cif) -> bool:
+    """
+    Return whether the Cif object satisfies the predicate.
+    """
+    field, operator, values = predicate
+    value = getattr(cif, FIELD_ATTRIBUTES[field])
+
+    if operator == ">":
+        return value > values[0]
+    if operator == "<":
+        return value < values[0]
+    if operator == ">=":
+        return value >= values[0]
+    if operator == "<=":
+        return value <= values[0]
+
+    # Sets such as elements and CN values
+    if isinstance(value, set):
+        if operator == "=":
+            return value == set(values)
+        return any(v in value for v in values)
+
+    return value in values
+
+
+def query_worker(idx, cif_path, file_count, predicates):
+    start_time = time.perf_counter()
+    file_name = os.path.basename(cif_path)
+
+    print(f"Processing {file_name} ({idx}/{file_count})")
+    try:
+        cif = Cif(cif_path, is_formatted=True)
+        is_match = all(evaluate_predicate(p, cif) for p in predicates)
+    except Exception:
+        print(f"Error while processing {file_name}")
+        print(traceback.format_exc())
+        is_match = None
+
+    elasped_time = time.perf_counter() - start_time
+    print(f"Processed {file_name} in {elasped_time:.2f}s")
+    return cif_path, is_match
+
+
+def mp_aux(arg):
+    return query_worker(**arg)
+
+
+def filter_files_in_pool(cif_paths, predicates, num_cpu, ensemble):
+    """
+    Evaluate the expensive predicates for each file on a pool of workers.
+    """
+    cifs = {cif.file_path: cif for cif in ensemble.cifs}
+    num_cpu = workers.resolve_worker_count(
+        num_cpu,
+        [workers.estimate_file_memory_mb(cifs[cif_path]) for cif_path in cif_paths],
+        len(cif_paths),
+    )
+    tasks = [
+        {
+            "idx": idx,
+            "cif_path": cif_path,
+            "file_count": len(cif_paths),
+            "predicates": predicates,
+        }
+        for idx, cif_path in enumerate(cif_paths, start=1)
+    ]
+
+    with session.open_pool(num_cpu) as pool:
+        results = pool.map(mp_aux, tasks)
+
+    filtered_file_paths = [path for path, is_match in results if is_match]
+    files_encountered_errors = [path for path, is_match in results if is_match is None]
+    return filtered_file_paths, files_encountered_errors
@@ -0,0 +1,174 @@
+import os
+import click
+from os.path import join, exists
+from core.utils import intro, prompt, folder
+from core.options.min_distance import (
+    MIN_DIST_TABLE,
+    MIN_DIST_COLUMN,
+    get_file_paths_out_of_bounds,
+)
+from core.options.supercell_size import SUPERCELL_SIZE_TABLE, SUPERCELL_SIZE_COLUMN
+from cifkit.utils.folder import move_files
+
+
+def refilter_files(
+    cif_dir_path: str,
+    is_interactive_mode=True,
+    table: str = None,
+    bounds: tuple[float, float] = None,
+    bands: list[tuple[float, float]] = None,
+) -> None:
+    """
+    Relocate files with new bounds from the results saved by option 2 or 3,
+    without parsing the files or computing distances again.
+    """
+    intro.prompt_refilter_intro()
+
+    if is_interactive_mode:
+        click.echo("\nQ1. Choose the saved results to re-filter:")
+        click.echo("[1] Minimum distance (option 2)")
+        click.echo("[2] Supercell atom count (option 3)")
+        table_choice = click.prompt("Enter your choice (1 or 2)", type=int)
+        table = "min_dist" if table_choice == 1 else "supercell"
+
+        click.echo("\nQ2. Now choose your option:")
+        click.echo("[1] Apply new low and high bounds")
+        click.echo("[2] Sort files into several bands at once")
+        filter_choice = click.prompt("Enter your choice (1 or 2)", type=int)
+
+        number_type = float if table == "min_dist" else int
+        if filter_choice == 1:
+            bounds = prompt_bands(
+                "Enter the low and high bounds (Ex: '2.6-12')", number_type
+            )[0]
+        else:
+            bands = prompt_bands(
+                "Enter the bands separated by a space (Ex: '2.0-2.4 2.4-2.6')",
+                number_type,
+            )
+
+    if table == "min_dist":
+        df = folder.load_results_table(cif_dir_path, MIN_DIST_TABLE)
+        column = MIN_DIST_COLUMN
+    else:
+        df = folder.load_results_table(cif_dir_path, SUPERCELL_SIZE_TABLE)
+        column = SUPERCELL_SIZE_COLUMN
+
+    if df is None:
+        prompt.print_done_with_option("re-filter, no saved results found")
+        return
+
+    # Skip files relocated since the results were saved
+    file_names_and_values = [
+        [file_name, value]
+        for file_name, value in zip(df["Filename"], df[column])
+        if exists(join(cif_dir_path, file_name))
+    ]
+
+    if bounds:
+        bands = [bounds]
+    else:
+        check_bands_do_not_overlap(bands)
+
+    for low, high in bands:
+        if table == "min_dist" and bounds:
+            # Same as option 2, files out of the bounds are relocated
+            filtered_file_paths = get_file_paths_out_of_bounds(
+                cif_dir_path, file_names_and_values, low, high
+            )
+            destination_path = join(cif_dir_path, f"dist_between_{low}_{high}")
+        elif table == "min_dist":
+            filtered_file_paths = get_file_paths_in_band(
+                cif_dir_path, file_names_and_values, low, high
+            )
+            destination_path = join(cif_dir_path, f"dist_band_{low}_{high}")
+        elif bounds:
+            # Same as option 3, files within the bounds are relocated
+            filtered_file_paths = [
+                join(cif_dir_path, file_name)
+                for file_name, value in file_names_and_values
+                if low <= value <= high
+            ]
+            destination_path = join(
+                cif_dir_path, f"supercell_above_{low}_below_{high}"
+            )
+        else:
+            filtered_file_paths = get_file_paths_in_band(
+                cif_dir_path, file_names_and_values, low, high
+            )
+            destination_path = join(
+                cif_dir_path, f"supercell_above_{low}_below_{high}"
+            )
+
+        if filtered_file_paths:
+            move_files(destination_path, filtered_file_paths)
+
+        # A file is relocated to the first band it falls into
+        moved_file_names = {os.path.basename(p) for p in filtered_file_paths}
+        file_names_and_values = [
+            p for p in file_names_and_values if p[0] not in moved_file_names
+        ]
+
+        prompt.print_moved_files_summary(
+            filtered_file_paths, len(df.index), destination_path
+        )
+
+    prompt.print_done_with_option("re-filter")
+
+
+def get_file_paths_in_band(cif_dir_path, file_names_and_values, low, high):
+    """
+    Return file paths with the value in the half-open band [low, high), so a
+    value on the edge of adjacent bands falls into the upper one.
+    """
+    return [
+        join(cif_dir_path, file_name)
+        for file_name, value in file_names_and_values
+        if low <= value < high
+    ]
+
+
+def prompt_bands(message: str, number_type=float) -> list[tuple]:
+    """
+    Prompt for bands until they can be parsed.
+    """
+    while True:
+        try:
+            return parse_bands(click.prompt(message, type=str), number_type)
+        except ValueError as e:
+            click.echo(f"Invalid bands: {e}")
+
+
+def parse_bands(bands_input: str, number_type=float) -> list[tuple]:
+    """
+    Parse bands such as '2.0-2.4 2.4-2.6' into a list of low and high bounds.
+    Raise ValueError if a band is not two numbers with low below high, or if
+    bands overlap.
+    """
+    bands = []
+    for band in bands_input.split():
+        try:
+            low, high = band.split("-")
+            low, high = number_type(low), number_type(high)
+        except ValueError:
+            raise ValueError(f"'{band}' is not a band such as '2.0-2.4'") from None
+        if low >= high:
+            raise ValueError(f"'{band}' has a low bound not below the high bound")
+        bands.append((low, high))
+    if not bands:
+        raise ValueError("no band was entered")
+    check_bands_do_not_overlap(bands)
+    return bands
+
+
+def check_bands_do_not_overlap(bands) -> None:
+    """
+    Raise ValueError if two bands overlap. Bands may share an edge, which
+    belongs to the upper band.
+    """
+    sorted_bands = sorted(bands)
+    for (low, high), (next_low, next_high) in zip(sorted_bands, sorted_bands[1:]):
+        if next_low < high:
+            raise ValueError(
+                f"'{low}-{high}' and '{next_low}-{next_high}' overlap"
+            )
@@ -0,0 +1,155 @@
+import os
+import json
+import click
+import tempfile
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from cifkit.utils.folder import get_file_paths
+from core import api
+from core.utils import intro, prompt, workers, session
+
+# Endpoints and the fields returned per file
+ROUTES = ("info", "min_dist", "CN")
+
+
+def start_service(
+    is_interactive_mode=True,
+    host: str = "127.0.0.1",
+    port: int = 8765,
+    socket_path: str = None,
+    num_cpu: int = None,
+) -> None:
+    """
+    Serve info, min distance and CN values as JSON over local HTTP or a Unix
+    socket, with a pool of workers kept warm between requests.
+    """
+    intro.prompt_serve_intro()
+
+    if is_interactive_mode:
+        socket_path = click.prompt(
+            "Q1. Enter a Unix socket path, or press Enter to use a TCP port",
+            default="",
+            show_default=False,
+        ).strip()
+        if not socket_path:
+            port = click.prompt("Q2. Enter the port", type=int, default=port)
+        num_cpu = prompt.prompt_num_cpu()
+
+    num_cpu = workers.resolve_worker_count(num_cpu)
+    with session.open_pool(num_cpu) as pool:
+        server = make_server(pool, host, port, socket_path)
+        address = socket_path if socket_path else f"http://{host}:{server.server_port}"
+        click.echo(f"Listening on {address}, press Ctrl-C to stop.")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            click.echo("\nStopped the service.")
+        finally:
+            server.server_close()
+            if socket_path and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    prompt.print_done_with_option("service")
+
+
+def make_server(pool, host="127.0.0.1", port=8765, socket_path=None):
+    """
+    Return an HTTP server on a TCP port or a Unix socket sharing the pool.
+    """
+    if socket_path:
+        server = UnixHTTPServer(socket_path, CifRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), CifRequestHandler)
+    server.pool = pool
+    return server
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CifRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /info, /min_dist or /CN with either a JSON body {"path": ...} for a
+    folder or a .cif file, or the .cif file content as the body.
+    """
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        route = url.path.strip("/")
+        if route not in ROUTES:
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                request = json.loads(body)
+                if not isinstance(request, dict) or not isinstance(
+                    request.get("path"), str
+                ):
+                    raise ValueError('expected a JSON object {"path": ...}')
+                path = request["path"]
+                file_paths = get_file_paths(path) if os.path.isdir(path) else [path]
+                results = self.server.pool.starmap(
+                    service_worker, [(p, route) for p in file_paths]
+                )
+            else:
+                file_name = parse_qs(url.query).get("name", ["upload.cif"])[0]
+                results = [self._compute_uploaded_file(body, file_name, route)]
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        self._send_json(200, {"results": results})
+
+    def _compute_uploaded_file(self, body, file_name, route):
+        with tempfile.TemporaryDirectory() as tmp_dir_path:
+            file_path = os.path.join(tmp_dir_path, os.path.basename(file_name))
+            with open(file_path, "wb") as f:
+                f.write(body)
+            return self.server.pool.apply(service_worker, (file_path, route))
+
+    def _send_json(self, status, data):
+        content = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format, *args):
+        pass
+
+
+def service_worker(cif_path, route) -> dict:
+    """
+    Return the fields of the route for a file, or the error message.
+    """
+    result = api.get_result(cif_path, fields=(route,))
+    if result.error:
+        return {"file_name": result.file_name, "error": result.error}
+    if route == "info":
+        return {
+            "file_name": result.file_name,
+            "formula": result.formula,
+            "structure": result.structure,
+            "tag": result.tag,
+            "supercell_atom_count": result.supercell_atom_count,
+            "site_mixing_type": result.site_mixing_type,
+            "composition_type": result.composition_type,
+        }
+    if route == "min_dist":
+        return {"file_name": result.file_name, "min_dist": result.min_dist}
+    return {"file_name": result.file_name, "CN": sorted(result.CN_values)}
@@ -1,7 +1,12 @@
 import click
 from os.path import join
-from core.utils import prompt, intro, object
+from core.utils import prompt, intro, object, folder, summary
 from core.utils.histogram import plot_supercell_size_histogram
+from core.utils.results import ResultStore
+
+# Saved next to plot/histogram-supercell-size.png for re-filtering
+SUPERCELL_SIZE_TABLE = "supercell-size"
+SUPERCELL_SIZE_COLUMN = "Supercell atom count"
 
 
 def move_files_based_on_supercell_size(
@@ -13,11 +18,23 @@ def move_files_based_on_supercell_size(
     intro.prompt_suppercell_size_intro()
     ensemble = object.init_cif_ensemble(cif_dir_path)
     # Generate all supercell in the file and plot histogram
-    atom_counts = []
+    atom_count_summary = summary.StreamingSummary(SUPERCELL_SIZE_COLUMN, 1)
+    atom_counts = ResultStore({"supercell_atom_count": "int64"})
     for idx, cif in enumerate(ensemble.cifs, start=1):
-        atom_counts.append(cif.supercell_atom_count)
+        atom_count_summary.add(cif.supercell_atom_count)
+        atom_counts.set(cif.file_name, supercell_atom_count=cif.supercell_atom_count)
+
+    plot_supercell_size_histogram(
+        cif_dir_path, atom_count_summary, ensemble.file_count
+    )
+    summary.save_summary_files(cif_dir_path, atom_count_summary, SUPERCELL_SIZE_TABLE)
 
-    plot_supercell_size_histogram(cif_dir_path, atom_counts, ensemble.file_count)
+    # Save the atom counts next to the histogram for re-filtering
+    folder.save_results_table(
+        cif_dir_path,
+        atom_counts.to_dataframe({"supercell_atom_count": SUPERCELL_SIZE_COLUMN}),
+        SUPERCELL_SIZE_TABLE,
+    )
 
     if is_interactive_mode:
         min_atom_count = click.prompt(
@@ -0,0 +1,206 @@
+import os
+import time
+import click
+import shutil
+import traceback
+from cifkit import Cif
+from core.utils import intro, prompt, metrics, workers, session, report
+from core.utils.watcher import FolderWatcher
+from core.utils.classify import (
+    DIMENSIONS,
+    get_dimension_values,
+    get_destination_path,
+)
+from core.options.query import parse_expression, evaluate_predicate
+
+
+def watch_folder(
+    cif_dir_path: str,
+    is_interactive_mode=True,
+    dimensions: list[str] = None,
+    expression: str = None,
+    num_cpu: int = None,
+    poll_interval: float = 1.0,
+    status_interval: float = 10.0,
+    idle_timeout: float = None,
+    use_inotify=True,
+    task_timeout: float = 300.0,
+) -> None:
+    """
+    Classify .cif files as they arrive in a folder, until Ctrl-C or until no
+    file has arrived for idle_timeout seconds.
+
+    Each file is sent through the filter expression (see option 11) and then
+    classified by the dimensions on a pool of workers kept warm for the run.
+    At most one file per worker is submitted at a time, so a file not
+    finished within task_timeout seconds of being submitted, e.g. because
+    its worker was killed, is moved to the error folder.
+    """
+    intro.prompt_watch_intro()
+
+    if is_interactive_mode:
+        dimensions = click.prompt(
+            "Q1. Enter the options to classify by, separated by a space"
+            f" ({' '.join(DIMENSIONS)})",
+            type=str,
+        ).split()
+        expression = click.prompt(
+            "Q2. Enter a filter expression, or press Enter to skip",
+            default="",
+            show_default=False,
+        ).strip()
+        num_cpu = prompt.prompt_num_cpu()
+
+    predicates = parse_expression(expression) if expression else []
+    dimensions = dimensions or []
+    for dimension in dimensions:
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown option to classify by: {dimension}")
+
+    num_cpu = workers.resolve_worker_count(num_cpu)
+    watcher = FolderWatcher(cif_dir_path, poll_interval, use_inotify)
+    click.echo(f"Watching {cif_dir_path} ({watcher.mode}), press Ctrl-C to stop.")
+
+    # Files waiting for a worker, and files submitted to the pool and not
+    # relocated yet, with their deadline
+    waiting = {}
+    pending = {}
+    processed_count = 0
+    error_count = 0
+    start_time = time.perf_counter()
+    last_status_time = start_time
+    last_activity_time = start_time
+    sink = metrics.open_metrics("watch")
+    file_report = report.open_report("watch")
+
+    with session.open_pool(num_cpu) as pool:
+        try:
+            new_file_paths = watcher.list_files()
+            while True:
+                for file_path in new_file_paths:
+                    if file_path not in pending:
+                        waiting[file_path] = None
+
+                while waiting and len(pending) < num_cpu:
+                    file_path = next(iter(waiting))
+                    del waiting[file_path]
+                    if os.path.exists(file_path):
+                        last_activity_time = time.perf_counter()
+                        pending[file_path] = (
+                            pool.apply_async(
+                                watch_worker, (file_path, dimensions, predicates)
+                            ),
+                            last_activity_time + task_timeout,
+                        )
+
+                # Files whose worker was lost never finish
+                now = time.perf_counter()
+                for file_path in [p for p, (_, d) in pending.items() if d <= now]:
+                    del pending[file_path]
+                    print(
+                        f"{os.path.basename(file_path)} did not finish within"
+                        f" {task_timeout:g} s"
+                    )
+                    relocate_file(cif_dir_path, file_path, [], None)
+                    sink.observe_file(task_timeout, is_error=True)
+                    processed_count += 1
+                    error_count += 1
+                    last_activity_time = now
+
+                # Relocate the files finished by the workers
+                for file_path in [p for p, (r, _) in pending.items() if r.ready()]:
+                    values, is_match, profile = pending.pop(file_path)[0].get()
+                    is_relocated = relocate_file(
+                        cif_dir_path, file_path, values, is_match
+                    )
+                    is_error = is_match is None or not is_relocated
+                    sink.observe_file(profile["wall_time"], is_error=is_error)
+                    file_report.add(profile)
+                    sink.add_relocations(int(is_relocated))
+                    processed_count += 1
+                    error_count += is_error
+                    last_activity_time = time.perf_counter()
+
+                now = time.perf_counter()
+                if now - last_status_time >= status_interval:
+                    prompt.print_watch_status(
+                        processed_count,
+                        error_count,
+                        len(waiting) + len(pending),
+                        now - start_time,
+                    )
+                    last_status_time = now
+
+                if (
+                    idle_timeout is not None
+                    and not waiting
+                    and not pending
+                    and now - last_activity_time >= idle_timeout
+                ):
+                    break
+
+                timeout = 0.05 if pending else poll_interval
+                new_file_paths = watcher.wait_for_files(timeout)
+
+        except KeyboardInterrupt:
+            click.echo("\nStopped watching.")
+        finally:
+            watcher.close()
+            sink.close()
+            file_report.save(cif_dir_path)
+
+    prompt.print_watch_status(
+        processed_count,
+        error_count,
+        len(waiting) + len(pending),
+        time.perf_counter() - start_time,
+    )
+    prompt.print_done_with_option("watch folder")
+
+
+def watch_worker(cif_path, dimensions, predicates):
+    """
+    Return the dimension values of a file, whether it matches the predicates,
+    or None if the file could not be processed, and its profile (see
+    core.utils.report).
+    """
+    profile_start = report.start_profile()
+    file_name = os.path.basename(cif_path)
+    try:
+        cif = Cif(cif_path, is_formatted=True)
+        if not all(evaluate_predicate(p, cif) for p in predicates):
+            return [], False, report.get_profile(profile_start, file_name, cif=cif)
+        values = get_dimension_values(cif, dimensions)
+        return values, True, report.get_profile(profile_start, file_name, cif=cif)
+    except Exception:
+        print(f"Error while processing {file_name}")
+        print(traceback.format_exc())
+        return [], None, report.get_profile(profile_start, file_name)
+
+
+def relocate_file(cif_dir_path, file_path, values, is_match) -> bool:
+    """
+    Move a processed file to the folder of its dimension values. Return False
+    if the file was removed from the folder before it could be moved.
+    """
+    folder_name = os.path.basename(cif_dir_path)
+    if is_match is None:
+        destination_path = os.path.join(
+            cif_dir_path, f"{folder_name}_cifs_encountered_error"
+        )
+    elif not is_match:
+        destination_path = os.path.join(cif_dir_path, f"{folder_name}_unmatched")
+    elif values:
+        destination_path = get_destination_path(cif_dir_path, values)
+    else:
+        destination_path = os.path.join(cif_dir_path, f"{folder_name}_query")
+
+    os.makedirs(destination_path, exist_ok=True)
+    try:
+        shutil.move(
+            file_path, os.path.join(destination_path, os.path.basename(file_path))
+        )
+    except FileNotFoundError:
+        print(f"{os.path.basename(file_path)} was removed before it was moved")
+        return False
+    return True
@@ -0,0 +1,181 @@
+"""
+Optional cache of parsed structures, so files unchanged since a previous run
+are not parsed again by cifkit.
+
+Set CIF_CLEANER_CACHE_DIR to a folder before starting. The workers of
+options 2 and 7 then store the cell, the symmetry-expanded unit cell points
+and the supercell points of each file they parse, and load them from the
+cache on later runs. Without the variable, nothing is cached.
+
+Each file is stored as <hash>.npy, with the coordinates and label index of
+every point, memory-mapped when loaded, and <hash>.json with the cell and the
+labels. The hash is taken over the file contents, in a sub-folder per cifkit
+version, so an edited file or another cifkit version is parsed again.
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+from importlib.metadata import version
+from cifkit import Cif
+
+CACHE_DIR_ENV = "CIF_CLEANER_CACHE_DIR"
+
+
+class CachedStructure:
+    """
+    Cell and points of a file loaded from the cache, with the attributes of
+    the Cif object used to compute the connections in core.utils.neighbor.
+
+    The coordinates and label ids are views of the points, e.g. of the
+    memory-mapped cache file. The unitcell_points and supercell_points tuples
+    of the Cif object are built on access, copying every point.
+    """
+
+    def __init__(self, file_path, points: np.ndarray, metadata: dict):
+        self.file_path = file_path
+        self.file_name = os.path.basename(file_path)
+        self.unitcell_lengths = metadata["unitcell_lengths"]
+        self.unitcell_angles = metadata["unitcell_angles"]
+        self.unique_elements = set(metadata["unique_elements"])
+        self.labels = metadata["labels"]
+        self.unitcell_point_count = metadata["unitcell_point_count"]
+        self.points = points
+
+    @property
+    def unitcell_frac(self) -> np.ndarray:
+        return self.points[: self.unitcell_point_count, :3]
+
+    @property
+    def unitcell_label_ids(self) -> np.ndarray:
+        return self.points[: self.unitcell_point_count, 3]
+
+    @property
+    def supercell_frac(self) -> np.ndarray:
+        return self.points[self.unitcell_point_count :, :3]
+
+    @property
+    def supercell_label_ids(self) -> np.ndarray:
+        return self.points[self.unitcell_point_count :, 3]
+
+    @property
+    def unitcell_points(self) -> list[tuple]:
+        return self.to_point_tuples(self.points[: self.unitcell_point_count])
+
+    @property
+    def supercell_points(self) -> list[tuple]:
+        return self.to_point_tuples(self.points[self.unitcell_point_count :])
+
+    @property
+    def supercell_atom_count(self) -> int:
+        return len(self.points) - self.unitcell_point_count
+
+    def to_point_tuples(self, points) -> list[tuple]:
+        return [(x, y, z, self.labels[int(i)]) for x, y, z, i in points.tolist()]
+
+
+def get_point_arrays(cif) -> tuple:
+    """
+    Return the unit cell and supercell points as (fractional coordinates,
+    label ids) arrays and the labels indexed by the ids, as taken by
+    core.utils.neighbor. The arrays of a CachedStructure are views of its
+    points, while the points of a Cif object are packed into a new array.
+    """
+    if not isinstance(cif, CachedStructure):
+        cif = CachedStructure(cif.file_path, *pack_structure(cif))
+    return (
+        (cif.unitcell_frac, cif.unitcell_label_ids),
+        (cif.supercell_frac, cif.supercell_label_ids),
+        cif.labels,
+    )
+
+
+def get_cache_dir() -> str | None:
+    """
+    Return the cache folder of the installed cifkit version, or None if
+    CIF_CLEANER_CACHE_DIR is not set.
+    """
+    dir_path = os.environ.get(CACHE_DIR_ENV)
+    if not dir_path:
+        return None
+    return os.path.join(dir_path, f"cifkit-{version('cifkit')}")
+
+
+def get_file_hash(file_path) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_cif(file_path, cache_dir=None):
+    """
+    Return the structure of the file from the cache, or the Cif object parsed
+    from the file, which is then added to the cache. Without a cache folder,
+    return the parsed Cif object.
+    """
+    cache_dir = cache_dir or get_cache_dir()
+    if cache_dir is None:
+        return Cif(file_path, is_formatted=True)
+
+    entry_path = os.path.join(cache_dir, get_file_hash(file_path))
+    structure = load_structure(file_path, entry_path)
+    if structure is not None:
+        return structure
+
+    cif = Cif(file_path, is_formatted=True)
+    save_structure(cif, entry_path)
+    return cif
+
+
+def load_structure(file_path, entry_path) -> CachedStructure | None:
+    """
+    Return the cached structure, or None if it is not in the cache.
+    """
+    try:
+        with open(f"{entry_path}.json") as f:
+            metadata = json.load(f)
+        points = np.load(f"{entry_path}.npy", mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    return CachedStructure(file_path, points, metadata)
+
+
+def save_structure(cif, entry_path) -> None:
+    """
+    Save the cell and points of the Cif object. The points are written
+    before the metadata, each to a temporary file renamed when complete, so
+    a worker never loads a partial entry.
+    """
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    array, metadata = pack_structure(cif)
+
+    temp_suffix = f".{os.getpid()}.tmp"
+    with open(f"{entry_path}.npy{temp_suffix}", "wb") as f:
+        np.save(f, array)
+    os.replace(f"{entry_path}.npy{temp_suffix}", f"{entry_path}.npy")
+
+    with open(f"{entry_path}.json{temp_suffix}", "w") as f:
+        json.dump(metadata, f)
+    os.replace(f"{entry_path}.json{temp_suffix}", f"{entry_path}.json")
+
+
+def pack_structure(cif) -> tuple[np.ndarray, dict]:
+    """
+    Return the unit cell and supercell points of the Cif object as an array
+    of coordinates and label index, and the metadata of a CachedStructure.
+    """
+    points = cif.unitcell_points + cif.supercell_points
+    labels = sorted({point[3] for point in points})
+    label_ids = {label: i for i, label in enumerate(labels)}
+    array = np.array(
+        [(*point[:3], label_ids[point[3]]) for point in points], dtype=float
+    ).reshape(-1, 4)
+
+    metadata = {
+        "unitcell_lengths": [float(length) for length in cif.unitcell_lengths],
+        "unitcell_angles": [float(angle) for angle in cif.unitcell_angles],
+        "unique_elements": sorted(cif.unique_elements),
+        "labels": labels,
+        "unitcell_point_count": len(cif.unitcell_points),
+    }
+    return array, metadata
@@ -0,0 +1,82 @@
+import os
+import json
+from os.path import join, exists
+
+
+def get_checkpoint_path(dir_path, name):
+    """
+    Return the checkpoint file path inside a 'checkpoint' sub-directory.
+    """
+    checkpoint_directory = join(dir_path, "checkpoint")
+    os.makedirs(checkpoint_directory, exist_ok=True)
+    return join(checkpoint_directory, f"{name}.jsonl")
+
+
+def load_checkpoint(checkpoint_path) -> dict[str, dict]:
+    """
+    Load the records of finished files, keyed by file name. A line cut short
+    by a crash is ignored, so the file is processed again.
+    """
+    records = {}
+    if not exists(checkpoint_path):
+        return records
+
+    with open(checkpoint_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record["file_name"]] = record
+    return records
+
+
+def open_checkpoint(checkpoint_path):
+    """
+    Open the checkpoint to append one JSON line per finished file. Lines are
+    written to the OS as they are added, without a sync to disk, so the cost
+    per file is a single small write.
+    """
+    truncate_partial_line(checkpoint_path)
+    return open(checkpoint_path, "a", buffering=1)
+
+
+def truncate_partial_line(checkpoint_path, block_size=4096) -> None:
+    """
+    Remove a last line cut short by a crash, so the next record is not
+    appended onto it. The file is read backwards from the end until the
+    last complete line.
+    """
+    if not exists(checkpoint_path):
+        return
+
+    with open(checkpoint_path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            newline_index = f.read(position - start).rfind(b"\n")
+            if newline_index != -1:
+                position = start + newline_index + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+
+def append_checkpoint(checkpoint_file, record: dict) -> None:
+    checkpoint_file.write(json.dumps(record) + "\n")
+
+
+def remove_checkpoint(checkpoint_path) -> None:
+    """
+    Remove the checkpoint once the run is complete, and the 'checkpoint'
+    sub-directory if no other checkpoint is left.
+    """
+    if exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    checkpoint_directory = os.path.dirname(checkpoint_path)
+    if exists(checkpoint_directory) and not os.listdir(checkpoint_directory):
+        os.rmdir(checkpoint_directory)
@@ -0,0 +1,50 @@
+import os
+
+# Define the composition type naming conventions
+COMPOSITION_TYPES = {
+    1: "unary",
+    2: "binary",
+    3: "ternary",
+    4: "quaternary",
+    5: "quinary",
+}
+
+
+def get_composition_type_name(cif) -> str:
+    # Use 'other' for any composition type beyond 5
+    return COMPOSITION_TYPES.get(cif.composition_type, "other")
+
+
+def get_tag_name(cif) -> str:
+    return cif.tag if cif.tag else "no_tag"
+
+
+def get_site_mixing_type_name(cif) -> str:
+    return cif.site_mixing_type
+
+
+# Dimensions a file can be classified by, read from a parsed Cif object
+DIMENSIONS = {
+    "composition": get_composition_type_name,
+    "tag": get_tag_name,
+    "mixing": get_site_mixing_type_name,
+}
+
+
+def get_dimension_values(cif, dimensions: list[str]) -> list[str]:
+    """
+    Return the folder name of each dimension for a Cif object.
+    """
+    return [DIMENSIONS[dimension](cif) for dimension in dimensions]
+
+
+def get_destination_path(cif_dir_path: str, values: list[str], nested=True) -> str:
+    """
+    Return the folder for the dimension values, either nested such as
+    'folder_binary/rt/full_occupancy' or combined such as
+    'folder_binary_rt_full_occupancy'.
+    """
+    folder_name = os.path.basename(cif_dir_path)
+    if nested:
+        return os.path.join(cif_dir_path, f"{folder_name}_{values[0]}", *values[1:])
+    return os.path.join(cif_dir_path, f"{folder_name}_{'_'.join(values)}")
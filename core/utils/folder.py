@@ -1,6 +1,8 @@
 import os
 from os.path import join, exists
 import glob
+import shutil
+import pandas as pd
 
 
 def choose_dir(script_directory):
@@ -56,3 +58,47 @@ def save_to_csv_directory(dir_path, df, base_filename):
     df.to_csv(join(csv_directory, csv_filename), index=False)
 
     print(csv_filename, "saved")
+
+
+def save_results_table(dir_path, df, table_name):
+    """
+    Saves computed per-file results as a CSV inside the 'plot' sub-directory,
+    next to the histogram built from them.
+    """
+    plot_directory = join(dir_path, "plot")
+    os.makedirs(plot_directory, exist_ok=True)
+
+    table_path = join(plot_directory, f"{table_name}.csv")
+    df.to_csv(table_path, index=False)
+
+    print(f"{table_name}.csv saved")
+
+
+def load_results_table(dir_path, table_name):
+    """
+    Loads the per-file results saved by a previous run, or None if not found.
+    """
+    table_path = join(dir_path, "plot", f"{table_name}.csv")
+    if not exists(table_path):
+        return None
+    return pd.read_csv(table_path)
+
+
+class FileRelocator:
+    """
+    Moves files one at a time as their results arrive. Each destination
+    folder is created once, before the first file is moved to it.
+    """
+
+    def __init__(self):
+        self.moved_file_paths = {}
+
+    def move(self, file_path, destination_path) -> None:
+        if destination_path not in self.moved_file_paths:
+            os.makedirs(destination_path, exist_ok=True)
+            self.moved_file_paths[destination_path] = []
+        shutil.move(file_path, join(destination_path, os.path.basename(file_path)))
+        self.moved_file_paths[destination_path].append(file_path)
+
+    def get_moved_file_paths(self, destination_path) -> list[str]:
+        return self.moved_file_paths.get(destination_path, [])
@@ -1,5 +1,17 @@
 import os
-import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from core.utils.summary import StreamingSummary
+
+# Image format of the histograms, "png" or "svg", and the DPI of PNG images
+PLOT_FORMAT_ENV = "CIF_CLEANER_PLOT_FORMAT"
+PLOT_DPI_ENV = "CIF_CLEANER_PLOT_DPI"
+DEFAULT_PLOT_FORMAT = "png"
+DEFAULT_PLOT_DPI = 300
+
+BIN_COLUMNS = ["Bin start", "Bin end", "Count"]
 
 
 def create_plot_directory(folder_path):
@@ -12,30 +24,98 @@ def create_plot_directory(folder_path):
     return plot_directory
 
 
-def save_histogram(data, bins, title, xlabel, ylabel, file_path):
+def get_plot_format() -> str:
+    plot_format = os.environ.get(PLOT_FORMAT_ENV, DEFAULT_PLOT_FORMAT).lower()
+    if plot_format not in ("png", "svg"):
+        raise ValueError(f"{PLOT_FORMAT_ENV} must be png or svg, not {plot_format}")
+    return plot_format
+
+
+def get_plot_dpi() -> int:
+    return int(os.environ.get(PLOT_DPI_ENV, DEFAULT_PLOT_DPI))
+
+
+def get_histogram_path(plot_directory, name):
+    """
+    Return the path of the histogram image in the configured format, e.g.
+    plot/histogram-min-dist.png.
     """
-    Save histogram plot to a file.
+    return os.path.join(plot_directory, f"{name}.{get_plot_format()}")
+
+
+def get_bins_path(file_path):
+    """
+    Return the path of the binned data saved next to a histogram image.
+    """
+    return f"{os.path.splitext(file_path)[0]}.csv"
+
+
+def save_histogram(data, bins, title, xlabel, ylabel, file_path, weights=None):
+    """
+    Save histogram plot to a file. With weights, each value in data is
+    counted as many times as its weight.
+    """
+    counts, edges = np.histogram(data, bins=bins, weights=weights)
+    save_binned_histogram(counts, edges, title, xlabel, ylabel, file_path)
+
+
+def save_binned_histogram(counts, edges, title, xlabel, ylabel, file_path):
     """
-    plt.figure(figsize=(10, 6))
-    plt.hist(data, bins=bins, color="blue", edgecolor="black")
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.grid(True, which="both", linestyle="--", linewidth=0.5)
-    plt.savefig(file_path, dpi=300)
-    plt.close()  # Close the plot to free up memory
+    Save the histogram of counts binned by NumPy, and the bins as CSV next to
+    the image, so the plot can be redrawn with load_histogram_bins.
+    """
+    pd.DataFrame(
+        {
+            BIN_COLUMNS[0]: edges[:-1],
+            BIN_COLUMNS[1]: edges[1:],
+            BIN_COLUMNS[2]: np.rint(counts).astype(int),
+        }
+    ).to_csv(get_bins_path(file_path), index=False)
+
+    # Drawn on a figure of its own, without the global state of pyplot
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
+    ax.hist(edges[:-1], bins=edges, weights=counts, color="blue", edgecolor="black")
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, which="both", linestyle="--", linewidth=0.5)
+    figure.savefig(file_path, dpi=get_plot_dpi())
     print(f"\nHistogram saved at {file_path}")
 
 
-def plot_distance_histogram(cif_dir, distances, num_of_files):
+def load_histogram_bins(file_path) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return the counts and bin edges saved next to a histogram image.
+    """
+    bins = pd.read_csv(get_bins_path(file_path))
+    edges = np.append(bins[BIN_COLUMNS[0]].values, bins[BIN_COLUMNS[1]].values[-1])
+    return bins[BIN_COLUMNS[2]].values, edges
+
+
+def save_summary_histogram(
+    summary: StreamingSummary, bins, title, xlabel, ylabel, file_path
+):
+    """
+    Save the histogram of a streaming summary, the same as the histogram of
+    the values it was built from.
+    """
+    values, counts = summary.get_bin_values_and_counts()
+    save_histogram(values, bins, title, xlabel, ylabel, file_path, weights=counts)
+
+
+def plot_distance_histogram(
+    cif_dir, distance_summary: StreamingSummary, num_of_files
+):
     """
     Plot the histogram of the min distances in CIF files.
     """
     plot_directory = create_plot_directory(cif_dir)
-    histogram_path = os.path.join(plot_directory, "histogram-min-dist.png")
+    histogram_path = get_histogram_path(plot_directory, "histogram-min-dist")
     title = f"Histogram of Shortest Distances of {num_of_files} files"
-    save_histogram(
-        distances,
+    save_summary_histogram(
+        distance_summary,
         50,
         title,
         "Distance (Å)",
@@ -44,18 +124,49 @@ def plot_distance_histogram(cif_dir, distances, num_of_files):
     )
 
 
-def plot_supercell_size_histogram(cif_dir, supercell_atom_counts, num_of_files):
+def plot_supercell_size_histogram(
+    cif_dir, atom_count_summary: StreamingSummary, num_of_files
+):
     """
     Plot the histogram of the supercell atom count in CIF files.
     """
     plot_directory = create_plot_directory(cif_dir)
-    histogram_path = os.path.join(plot_directory, "histogram-supercell-size.png")
+    histogram_path = get_histogram_path(plot_directory, "histogram-supercell-size")
     title = f"Histogram of Supercell Atom Count of {num_of_files} files"
-    save_histogram(
-        supercell_atom_counts,
+    save_summary_histogram(
+        atom_count_summary,
         50,
         title,
         "Number of atoms",
         "Number of CIF Files",
         histogram_path,
     )
+
+
+def plot_pair_distance_histograms(cif_dir, pair_table: pd.DataFrame, pairs):
+    """
+    Plot the histogram of the min distances per element pair in CIF files.
+    """
+    plot_directory = create_plot_directory(cif_dir)
+    for pair in pairs:
+        # Accept either element order, e.g. Er-Co for Co-Er
+        pair_key = "-".join(sorted(pair.split("-")))
+        distances = pair_table.loc[
+            pair_table["Pair"] == pair_key, "Min distance (Å)"
+        ].values
+        if not len(distances):
+            print(f"\nNo {pair} pair found, skipping histogram")
+            continue
+
+        histogram_path = get_histogram_path(
+            plot_directory, f"histogram-min-dist-{pair_key}"
+        )
+        title = f"Histogram of Shortest {pair_key} Distances of {len(distances)} files"
+        save_histogram(
+            distances,
+            50,
+            title,
+            "Distance (Å)",
+            "Number of CIF Files",
+            histogram_path,
+        )
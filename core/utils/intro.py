@@ -138,3 +138,108 @@ def prompt_info_intro():
     """
     )
     print(intro_prompt)
+
+
+def prompt_refilter_intro():
+    intro_prompt = textwrap.dedent(
+        """\
+    ==========================RE-FILTER=============================
+    Process for this option:
+
+    [1] Load the min distances or supercell atom counts saved in plot/
+    [2] Enter new low and high bounds, or several bands at once
+    [3] Move files to separate folders without recomputing
+
+    Note: run option 2 or 3 first to save the results
+    ============================================================
+    """
+    )
+    print(intro_prompt)
+
+
+def prompt_query_intro():
+    intro_prompt = textwrap.dedent(
+        """\
+    ==========================QUERY=============================
+    Process for this option:
+
+    [1] Enter a filter expression with terms joined by 'and'
+        Ex: composition=binary and elements~Er and CN~12 and min_dist>2.6
+    [2] Fields: composition, elements, tag, mixing, supercell, min_dist, CN
+        Operators: = (exact), ~ (contains any), >, <, >=, <=
+    [3] Cheap fields are checked first, then min_dist and CN are computed
+        in parallel only for the remaining files
+    [4] Move files matching all terms to a separate folder
+    ============================================================
+    """
+    )
+    print(intro_prompt)
+
+
+def prompt_watch_intro():
+    intro_prompt = textwrap.dedent(
+        """\
+    ==========================WATCH=============================
+    Process for this option:
+
+    [1] Enter the options to classify by (composition, tag, mixing)
+    [2] Optionally enter a filter expression (see option 11)
+    [3] Files arriving in the folder are processed by a warm pool and
+        moved to nested folders, e.g. folder_binary/rt
+    [4] Throughput and backlog are printed while running, Ctrl-C to stop
+    ============================================================
+    """
+    )
+    print(intro_prompt)
+
+
+def prompt_classify_intro():
+    intro_prompt = textwrap.dedent(
+        """\
+    ==========================CLASSIFY============================
+    Process for this option:
+
+    [1] Enter the options to classify by in order
+        (composition, tag, mixing)
+    [2] Choose nested folders, e.g. folder_binary/rt/full_occupancy,
+        or combined folders, e.g. folder_binary_rt_full_occupancy
+    [3] Each file is parsed once and moved to the folder of its values
+    ============================================================
+    """
+    )
+    print(intro_prompt)
+
+
+def prompt_serve_intro():
+    intro_prompt = textwrap.dedent(
+        """\
+    ==========================SERVICE=============================
+    Process for this option:
+
+    [1] Enter a Unix socket path or a local TCP port
+    [2] POST /info, /min_dist or /CN with {"path": "<folder or .cif>"}
+        as JSON, or with the .cif file content as the body
+    [3] Results are returned as JSON by a pool kept warm between requests
+    ============================================================
+    """
+    )
+    print(intro_prompt)
+
+
+def prompt_compare_intro():
+    intro_prompt = textwrap.dedent(
+        """\
+    ==========================COMPARE=============================
+    Process for this option:
+
+    [1] Choose the folder to compare with, e.g. PCD with ICSD
+    [2] Each file is keyed by its reduced formula, structure type and
+        cell rounded to 0.01 Å and 0.1°
+    [3] Files with the same key overlap, files with the same formula and
+        structure and a cell within the tolerance are near matches
+    [4] The matches are saved to csv/<folder>_compare_<other folder>.csv,
+        no file is moved
+    ============================================================
+    """
+    )
+    print(intro_prompt)
@@ -0,0 +1,133 @@
+"""
+Optional metrics written to a Prometheus textfile while an option runs.
+
+Set CIF_CLEANER_METRICS_DIR to a folder, e.g. the textfile collector folder
+of node_exporter, to write cif_cleaner_<option>.prom there. Set
+CIF_CLEANER_METRICS_FORMAT=openmetrics to write cif_cleaner_<option>.om in
+the OpenMetrics format instead. Without the variable, nothing is written.
+"""
+
+import os
+import time
+
+METRICS_DIR_ENV = "CIF_CLEANER_METRICS_DIR"
+METRICS_FORMAT_ENV = "CIF_CLEANER_METRICS_FORMAT"
+
+# Upper bounds of the per-file latency histogram (unit in seconds)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class MetricsSink:
+    """
+    Counters and a per-file latency histogram for one option, rewritten to
+    the file at most every write_interval seconds and when closed.
+    """
+
+    def __init__(self, option, dir_path=None, openmetrics=False, write_interval=5.0):
+        self.option = option
+        self.openmetrics = openmetrics
+        self.write_interval = write_interval
+        self.file_path = None
+        if dir_path:
+            extension = "om" if openmetrics else "prom"
+            self.file_path = os.path.join(dir_path, f"cif_cleaner_{option}.{extension}")
+
+        self.start_time = time.time()
+        self.processed_count = 0
+        self.error_count = 0
+        self.relocated_count = 0
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.last_write_time = 0.0
+
+    def observe_file(self, elapsed_time, is_error=False) -> None:
+        self.processed_count += 1
+        self.error_count += is_error
+        self.latency_sum += elapsed_time
+        for i, upper_bound in enumerate(LATENCY_BUCKETS):
+            if elapsed_time <= upper_bound:
+                self.bucket_counts[i] += 1
+        self._write_if_due()
+
+    def add_relocations(self, count) -> None:
+        self.relocated_count += count
+        self._write_if_due()
+
+    def close(self) -> None:
+        self.write()
+
+    def _write_if_due(self):
+        if time.monotonic() - self.last_write_time >= self.write_interval:
+            self.write()
+
+    def write(self) -> None:
+        """
+        Replace the file with the current values, through a temporary file so
+        a collector never reads a partial file.
+        """
+        if self.file_path is None:
+            return
+        self.last_write_time = time.monotonic()
+
+        temp_file_path = f"{self.file_path}.tmp"
+        with open(temp_file_path, "w") as f:
+            f.write(self.format())
+        os.replace(temp_file_path, self.file_path)
+
+    def format(self) -> str:
+        label = f'option="{self.option}"'
+        elapsed_time = time.time() - self.start_time
+        throughput = self.processed_count / elapsed_time if elapsed_time else 0.0
+
+        lines = []
+        for name, help_text, value in [
+            ("files_processed", "Files processed.", self.processed_count),
+            ("errors", "Files that could not be processed.", self.error_count),
+            ("relocations", "Files moved to another folder.", self.relocated_count),
+        ]:
+            # OpenMetrics names the counter family without the _total suffix
+            family = f"cif_cleaner_{name}"
+            if not self.openmetrics:
+                family += "_total"
+            lines += [
+                f"# HELP {family} {help_text}",
+                f"# TYPE {family} counter",
+                f"cif_cleaner_{name}_total{{{label}}} {value}",
+            ]
+
+        lines += [
+            "# HELP cif_cleaner_throughput_files_per_second Files processed per second"
+            " since the start of the run.",
+            "# TYPE cif_cleaner_throughput_files_per_second gauge",
+            f"cif_cleaner_throughput_files_per_second{{{label}}} {throughput:.6f}",
+            "# HELP cif_cleaner_run_start_time_seconds Start of the run as a Unix time.",
+            "# TYPE cif_cleaner_run_start_time_seconds gauge",
+            f"cif_cleaner_run_start_time_seconds{{{label}}} {self.start_time:.3f}",
+            "# HELP cif_cleaner_file_seconds Time to process a file.",
+            "# TYPE cif_cleaner_file_seconds histogram",
+        ]
+        for upper_bound, count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            lines.append(
+                f'cif_cleaner_file_seconds_bucket{{{label},le="{upper_bound}"}} {count}'
+            )
+        lines += [
+            f'cif_cleaner_file_seconds_bucket{{{label},le="+Inf"}}'
+            f" {self.processed_count}",
+            f"cif_cleaner_file_seconds_sum{{{label}}} {self.latency_sum:.6f}",
+            f"cif_cleaner_file_seconds_count{{{label}}} {self.processed_count}",
+        ]
+        if self.openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def open_metrics(option) -> MetricsSink:
+    """
+    Return the metrics sink of an option, writing to the folder set by
+    CIF_CLEANER_METRICS_DIR, or nothing if it is not set.
+    """
+    dir_path = os.environ.get(METRICS_DIR_ENV)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+    openmetrics = os.environ.get(METRICS_FORMAT_ENV, "").lower() == "openmetrics"
+    return MetricsSink(option, dir_path, openmetrics)
@@ -0,0 +1,628 @@
+import numpy as np
+from cifkit.data.radius import get_radius_data
+from cifkit.utils.string_parser import get_atom_type_from_label
+
+# Same parameters as the connections computed by cifkit
+CUTOFF_RADIUS = 10.0
+MIN_PAIR_DIST = 0.1
+SHORTEST_UNIQUE_DIST_COUNT = 50
+CN_NEIGHBOR_COUNT = 20
+
+# Memory ceiling per worker when none is given
+DEFAULT_MAX_MEMORY_MB = 256
+
+# Nearest neighbours kept per reference point, after removing the supercell
+# points with the same coordinates as a nearer neighbour
+CANDIDATE_COUNT = 64
+
+# Bytes per reference point and supercell point held while reducing a chunk:
+# coordinate differences, distances, keys and masks
+BYTES_PER_PAIR = 80
+
+# Files with at most this many unit cell and supercell point pairs are
+# computed together in padded batches, larger files one at a time
+BATCH_MAX_PAIR_COUNT = 50_000
+
+# Bytes per padded pair of a batch, which also holds the sorted distances
+BATCH_BYTES_PER_PAIR = 160
+
+
+def get_fractional_to_cartesian_matrix(lengths, angles_rad) -> np.ndarray:
+    """
+    Return the matrix converting fractional to Cartesian coordinates.
+    """
+    a, b, c = lengths
+    alpha, beta, gamma = angles_rad
+    cos_alpha, cos_beta, cos_gamma = np.cos(alpha), np.cos(beta), np.cos(gamma)
+    sin_gamma = np.sin(gamma)
+    volume = (
+        a
+        * b
+        * c
+        * np.sqrt(
+            1
+            - cos_alpha**2
+            - cos_beta**2
+            - cos_gamma**2
+            + 2 * cos_alpha * cos_beta * cos_gamma
+        )
+    )
+    return np.array(
+        [
+            [a, b * cos_gamma, c * cos_beta],
+            [0, b * sin_gamma, c * (cos_alpha - cos_beta * cos_gamma) / sin_gamma],
+            [0, 0, volume / (a * b * sin_gamma)],
+        ]
+    )
+
+
+def to_cartesian(matrix, frac) -> np.ndarray:
+    """
+    Convert fractional coordinates with a batched product per point, which
+    rounds the same as the per-point conversion in cifkit.
+    """
+    return (matrix[None] @ frac[:, :, None])[..., 0]
+
+
+def get_central_indexes(matrix, frac) -> list[int]:
+    """
+    Return, for each group of points that are lattice translations of each
+    other, the index of the one nearest the centre of the unit cell.
+    """
+    centre = to_cartesian(matrix, np.full((1, 3), 0.5))
+    centre_dists = ((to_cartesian(matrix, frac) - centre) ** 2).sum(axis=1)
+    wrapped = np.round(np.mod(np.round(frac, 4), 1.0), 4) % 1.0
+
+    central_indexes = {}
+    for i, key in enumerate(map(tuple, wrapped)):
+        j = central_indexes.get(key)
+        if j is None or centre_dists[i] < centre_dists[j]:
+            central_indexes[key] = i
+    return sorted(central_indexes.values())
+
+
+def get_chunk_size(reference_count: int, max_memory_mb: float) -> int:
+    """
+    Return the number of supercell points reduced at once within the budget.
+    """
+    budget = max_memory_mb * 1024**2
+    return max(1, int(budget // (reference_count * BYTES_PER_PAIR)))
+
+
+def compute_site_neighbors(
+    unitcell,
+    supercell,
+    labels,
+    lengths,
+    angles_rad,
+    max_memory_mb: float = DEFAULT_MAX_MEMORY_MB,
+    skip_translated_points=False,
+):
+    """
+    Return, per site label, the nearest neighbours of the most connected
+    reference point as (label, distance) sorted by distance, and the min
+    distance from that point to each site label.
+
+    The unit cell and supercell points are given as (fractional coordinates,
+    label ids) arrays, with the label ids indexing labels (see
+    core.utils.cache.get_point_arrays). The arrays are only read, so views of
+    a memory-mapped or shared block are not copied.
+
+    The supercell is reduced in chunks so the distances held at once stay
+    within max_memory_mb, instead of storing every pair within the cutoff.
+
+    The unit cell points are not wrapped into [0, 1), so a site position can
+    appear in more than one cell. With skip_translated_points, only the copy
+    nearest the cell centre is computed, which is the least likely to have
+    neighbours cut off by the supercell edge. Equivalent points only differ by
+    the rounding of coordinates in the file, which can still move the largest
+    gap, so the CN may differ from cifkit on such structures.
+    """
+    matrix = get_fractional_to_cartesian_matrix(lengths, angles_rad)
+    unitcell_frac, unitcell_label_ids = unitcell
+    supercell_frac, supercell_label_ids = supercell
+    supercell_cart = to_cartesian(matrix, supercell_frac)
+    point_count = len(supercell_frac)
+    point_group_ids = get_point_group_ids(supercell_cart)
+
+    site_neighbors = {}
+    site_pair_dists = {}
+    for site_label_id in get_site_label_ids(unitcell_label_ids):
+        site_label = labels[site_label_id]
+        reference_frac = unitcell_frac[unitcell_label_ids == site_label_id]
+        if skip_translated_points:
+            reference_frac = reference_frac[get_central_indexes(matrix, reference_frac)]
+        reference = (
+            reference_frac,
+            to_cartesian(matrix, reference_frac),
+            site_label_id,
+        )
+        chunk_size = get_chunk_size(len(reference_frac), max_memory_mb)
+        supercell = (supercell_frac, supercell_cart, supercell_label_ids)
+
+        # Pass 1. Find the shortest unique distances from the site
+        shortest_dists = np.empty(0)
+        for _, dists, is_other_point in iter_chunk_dists(
+            reference, supercell, chunk_size
+        ):
+            shortest_dists = np.unique(
+                np.concatenate([shortest_dists, dists[is_other_point]])
+            )[:SHORTEST_UNIQUE_DIST_COUNT]
+        if not len(shortest_dists):
+            continue
+        shortest_dists_max = shortest_dists[-1]
+
+        # Pass 2. Count connections within the shortest distances and keep
+        # the nearest candidates per reference point
+        reference_count = len(reference_frac)
+        counts = np.zeros(reference_count, dtype=int)
+        pair_dists = np.full((reference_count, len(labels)), np.inf)
+        candidates = np.full((reference_count, 0), np.iinfo(np.int64).max)
+        for start, dists, is_other_point in iter_chunk_dists(
+            reference, supercell, chunk_size
+        ):
+            is_connected = (
+                is_other_point & (dists > MIN_PAIR_DIST) & (dists < CUTOFF_RADIUS)
+            )
+            counts += (is_connected & (dists <= shortest_dists_max)).sum(axis=1)
+
+            chunk_label_ids = supercell_label_ids[start : start + dists.shape[1]]
+            connected_dists = np.where(is_connected, dists, np.inf)
+            for label_id in np.unique(chunk_label_ids).astype(int):
+                pair_dists[:, label_id] = np.minimum(
+                    pair_dists[:, label_id],
+                    connected_dists[:, chunk_label_ids == label_id].min(axis=1),
+                )
+
+            candidates = merge_candidates(
+                candidates, connected_dists, start, point_count, point_group_ids
+            )
+
+        if not counts.max():
+            continue
+
+        # The first reference point with the most connections, as in cifkit
+        reference_index = int(np.argmax(counts))
+        site_neighbors[site_label] = decode_candidates(
+            candidates[reference_index],
+            supercell_cart,
+            supercell_label_ids,
+            labels,
+            point_count,
+        )
+        site_pair_dists[site_label] = {
+            label: float(pair_dists[reference_index, label_id])
+            for label_id, label in enumerate(labels)
+            if np.isfinite(pair_dists[reference_index, label_id])
+        }
+
+    return site_neighbors, site_pair_dists
+
+
+def get_site_label_ids(unitcell_label_ids) -> list[int]:
+    """
+    Return the label ids of the sites in the order of the unit cell points.
+    """
+    _, first_indexes = np.unique(unitcell_label_ids, return_index=True)
+    return [int(unitcell_label_ids[i]) for i in sorted(first_indexes)]
+
+
+def iter_chunk_dists(reference, supercell, chunk_size):
+    """
+    Yield the start index, the distances rounded to 3 decimals from each
+    reference point to a chunk of the supercell, and whether each supercell
+    point is a different point from the reference point.
+    """
+    reference_frac, reference_cart, reference_label_id = reference
+    supercell_frac, supercell_cart, supercell_label_ids = supercell
+
+    for start in range(0, len(supercell_frac), chunk_size):
+        end = start + chunk_size
+        diffs = supercell_cart[None, start:end, :] - reference_cart[:, None, :]
+        dists = np.round(
+            np.sqrt((diffs[..., None, :] @ diffs[..., :, None])[..., 0, 0]), 3
+        )
+        is_same_point = np.all(
+            supercell_frac[None, start:end, :] == reference_frac[:, None, :], axis=2
+        ) & (supercell_label_ids[None, start:end] == reference_label_id)
+        yield start, dists, ~is_same_point
+
+
+def get_point_group_ids(supercell_cart) -> np.ndarray:
+    """
+    Return an id per supercell point shared by the points with the same
+    Cartesian coordinates rounded to 3 decimals, as compared by cifkit when
+    removing duplicate connections.
+    """
+    if not len(supercell_cart):
+        return np.zeros(0, dtype=int)
+    _, group_ids = np.unique(
+        np.round(supercell_cart, 3), axis=0, return_inverse=True
+    )
+    return group_ids.reshape(-1)
+
+
+def merge_candidates(candidates, connected_dists, start, point_count, point_group_ids):
+    """
+    Keep the nearest candidates per reference point, encoded as a single
+    integer sorting by distance and then by supercell point index.
+
+    Only the nearest of the points with the same coordinates is kept before
+    the candidates are cut to CANDIDATE_COUNT, so duplicate points of a
+    high-symmetry cell cannot push out the farther neighbours. The group ids
+    are given per supercell point, or per row and supercell point.
+    """
+    point_indexes = np.arange(start, start + connected_dists.shape[1])
+    keys = np.where(
+        np.isfinite(connected_dists),
+        np.rint(np.where(np.isfinite(connected_dists), connected_dists, 0) * 1000)
+        .astype(np.int64)
+        * point_count
+        + point_indexes[None, :],
+        np.iinfo(np.int64).max,
+    )
+    keys = np.concatenate([candidates, keys], axis=1)
+
+    # With at most group_size points per group, the nearest CANDIDATE_COUNT
+    # groups are among the nearest CANDIDATE_COUNT * group_size keys
+    group_size = max(np.bincount(ids).max() for ids in np.atleast_2d(point_group_ids))
+    keep_count = CANDIDATE_COUNT * group_size
+    if keys.shape[1] > keep_count:
+        keys = np.partition(keys, keep_count - 1, axis=1)[:, :keep_count]
+    keys = remove_duplicate_candidates(keys, point_count, point_group_ids)
+    if keys.shape[1] > CANDIDATE_COUNT:
+        keys = np.partition(keys, CANDIDATE_COUNT - 1, axis=1)[:, :CANDIDATE_COUNT]
+    return np.sort(keys, axis=1)
+
+
+def remove_duplicate_candidates(keys, point_count, point_group_ids) -> np.ndarray:
+    """
+    Return the keys with every key but the smallest of each point group in
+    a row replaced by the missing key.
+    """
+    missing_key = np.iinfo(np.int64).max
+    is_missing = keys == missing_key
+    # Rows of missing keys only, e.g. beyond the cutoff, are left as they are
+    rows = np.flatnonzero(~is_missing.all(axis=1))
+    if not len(rows):
+        return keys
+    row_keys = keys[rows]
+    point_indexes = np.where(is_missing[rows], 0, row_keys % point_count)
+    point_group_ids = np.atleast_2d(point_group_ids)
+    if len(point_group_ids) > 1:
+        point_group_ids = point_group_ids[rows]
+    group_ids = np.where(
+        is_missing[rows],
+        -1,
+        np.take_along_axis(
+            np.broadcast_to(point_group_ids, (len(rows), point_group_ids.shape[1])),
+            point_indexes,
+            axis=1,
+        ),
+    )
+
+    # Sort by group and then by key, so the first key of a group is kept
+    order = np.lexsort((row_keys, group_ids), axis=1)
+    sorted_group_ids = np.take_along_axis(group_ids, order, axis=1)
+    is_duplicate = np.zeros(row_keys.shape, dtype=bool)
+    is_duplicate[:, 1:] = (sorted_group_ids[:, 1:] == sorted_group_ids[:, :-1]) & (
+        sorted_group_ids[:, 1:] >= 0
+    )
+    sorted_keys = np.take_along_axis(row_keys, order, axis=1)
+    keys = keys.copy()
+    keys[rows] = np.where(is_duplicate, missing_key, sorted_keys)
+    return keys
+
+
+def decode_candidates(keys, supercell_cart, supercell_label_ids, labels, point_count):
+    """
+    Return the (label, distance) of the candidates, skipping points with the
+    same Cartesian coordinates as a nearer candidate.
+    """
+    neighbors = []
+    seen_coordinates = set()
+    for key in keys:
+        if key == np.iinfo(np.int64).max:
+            break
+        dist, point_index = divmod(int(key), point_count)
+        coordinates = tuple(np.round(supercell_cart[point_index], 3))
+        if coordinates in seen_coordinates:
+            continue
+        seen_coordinates.add(coordinates)
+        label = labels[int(supercell_label_ids[point_index])]
+        neighbors.append((label, dist / 1000))
+    return neighbors
+
+
+def get_shortest_distance(site_neighbors) -> float:
+    """
+    Return the shortest distance between any two sites.
+    """
+    return min(neighbors[0][1] for neighbors in site_neighbors.values())
+
+
+def get_shortest_bond_pair_distance(site_pair_dists) -> dict[tuple[str, str], float]:
+    """
+    Return the min distance per element pair, sorted alphabetically.
+    """
+    pair_dists = {}
+    for site_label, dists in site_pair_dists.items():
+        element = get_atom_type_from_label(site_label)
+        for other_label, dist in dists.items():
+            pair = tuple(sorted((element, get_atom_type_from_label(other_label))))
+            pair_dists[pair] = min(dist, pair_dists.get(pair, dist))
+    return pair_dists
+
+
+def get_CIF_radius_sum(elements) -> dict[str, float] | None:
+    """
+    Return the sum of CIF radii per element pair, e.g. {"Co-Er": 3.1}, or
+    None if the radius is not available for every element.
+    """
+    radius_data = get_radius_data()
+    if not all("CIF_radius" in radius_data.get(e, {}) for e in elements):
+        return None
+
+    elements = sorted(elements)
+    return {
+        f"{element_1}-{element_2}": round(
+            radius_data[element_1]["CIF_radius"] + radius_data[element_2]["CIF_radius"],
+            3,
+        )
+        for i, element_1 in enumerate(elements)
+        for element_2 in elements[i:]
+    }
+
+
+def get_CN_unique_values_by_min_dist_method(site_neighbors) -> set[int]:
+    """
+    Return the unique CN values with the polyhedron cut at the largest gap of
+    the 20 nearest distances normalized by the shortest distance.
+    """
+    CN_values = set()
+    for neighbors in site_neighbors.values():
+        neighbors = neighbors[:CN_NEIGHBOR_COUNT]
+        shortest_dist = neighbors[0][1]
+        max_gap = 0
+        CN = -1
+        previous_value = 0.0
+        for i, (_, dist) in enumerate(neighbors):
+            normalized_dist = round(dist / shortest_dist, 5)
+            if previous_value:
+                gap = round(abs(normalized_dist - previous_value), 3)
+                if gap > max_gap:
+                    max_gap = gap
+                    CN = i
+            previous_value = normalized_dist
+        CN_values.add(len(neighbors[:CN]))
+    return CN_values
+
+
+def split_batches(
+    point_counts, max_memory_mb: float = DEFAULT_MAX_MEMORY_MB
+) -> tuple[list[list[int]], list[int]]:
+    """
+    Return the indexes of the structures grouped into batches, and the
+    indexes of the structures computed one at a time. Point counts are given
+    as (unit cell point count, supercell point count).
+
+    Structures are sorted by size before grouping, so each batch is padded to
+    similar sizes, and a batch grows while its padded arrays fit within
+    max_memory_mb.
+    """
+    budget = max_memory_mb * 1024**2 / BATCH_BYTES_PER_PAIR
+    small_indexes = []
+    single_indexes = []
+    for i, (reference_count, point_count) in enumerate(point_counts):
+        if reference_count * point_count <= min(BATCH_MAX_PAIR_COUNT, budget):
+            small_indexes.append(i)
+        else:
+            single_indexes.append(i)
+    small_indexes.sort(key=lambda i: (point_counts[i][1], point_counts[i][0]))
+
+    batches = []
+    batch = []
+    max_reference_count = max_point_count = 0
+    for i in small_indexes:
+        reference_count, point_count = point_counts[i]
+        padded_pair_count = (
+            (len(batch) + 1)
+            * max(max_reference_count, reference_count)
+            * max(max_point_count, point_count)
+        )
+        if batch and padded_pair_count > budget:
+            batches.append(batch)
+            batch = []
+            max_reference_count = max_point_count = 0
+        batch.append(i)
+        max_reference_count = max(max_reference_count, reference_count)
+        max_point_count = max(max_point_count, point_count)
+    if batch:
+        batches.append(batch)
+
+    # A batch of one structure has nothing to share
+    single_indexes.extend(batch[0] for batch in batches if len(batch) == 1)
+    return [batch for batch in batches if len(batch) > 1], sorted(single_indexes)
+
+
+def compute_batch_site_neighbors(structures, skip_translated_points=False):
+    """
+    Return the site neighbours and the min distance per site label of each
+    structure, as compute_site_neighbors, for structures given as (unit cell
+    points, supercell points, labels, lengths, angles).
+
+    The structures are padded to the same number of points, so the distances,
+    the shortest unique distances and the most connected reference point of
+    every site of the batch are found in a few NumPy calls instead of a
+    Python loop per file and site. Meant for small structures, with the
+    padded arrays held in memory at once (see split_batches).
+    """
+    packed = [pack_structure(*structure, skip_translated_points) for structure in structures]
+    batch_size = len(packed)
+    reference_count = max(len(p["reference_frac"]) for p in packed)
+    point_count = max(len(p["supercell_frac"]) for p in packed)
+    site_count = max(len(p["site_labels"]) for p in packed)
+    label_count = max(len(p["labels"]) for p in packed)
+
+    def pad(key, size, fill):
+        arrays = [p[key] for p in packed]
+        shape = (batch_size, size) + arrays[0].shape[1:]
+        padded = np.full(shape, fill, dtype=arrays[0].dtype)
+        for b, array in enumerate(arrays):
+            padded[b, : len(array)] = array
+        return padded
+
+    reference_frac = pad("reference_frac", reference_count, 0.0)
+    reference_cart = pad("reference_cart", reference_count, 0.0)
+    reference_site_ids = pad("reference_site_ids", reference_count, -1)
+    reference_label_ids = pad("reference_label_ids", reference_count, -1)
+    supercell_frac = pad("supercell_frac", point_count, 0.0)
+    supercell_cart = pad("supercell_cart", point_count, 0.0)
+    supercell_label_ids = pad("supercell_label_ids", point_count, -1)
+
+    # Distances rounded to 3 decimals, as in iter_chunk_dists
+    diffs = supercell_cart[:, None, :, :] - reference_cart[:, :, None, :]
+    dists = np.round(
+        np.sqrt((diffs[..., None, :] @ diffs[..., :, None])[..., 0, 0]), 3
+    )
+    del diffs
+    is_same_point = np.all(
+        supercell_frac[:, None, :, :] == reference_frac[:, :, None, :], axis=3
+    ) & (supercell_label_ids[:, None, :] == reference_label_ids[:, :, None])
+    is_other_point = (
+        (reference_site_ids[:, :, None] >= 0)
+        & (supercell_label_ids[:, None, :] >= 0)
+        & ~is_same_point
+    )
+    is_connected = (
+        is_other_point & (dists > MIN_PAIR_DIST) & (dists < CUTOFF_RADIUS)
+    )
+
+    # Pass 1. The shortest unique distances of a site are among the shortest
+    # unique distances of each of its reference points
+    row_dists = get_shortest_unique_dists(np.where(is_other_point, dists, np.inf))
+    site_ids = np.arange(site_count)
+    is_site_row = reference_site_ids[:, None, :] == site_ids[None, :, None]
+    site_dists = get_shortest_unique_dists(
+        np.where(is_site_row[..., None], row_dists[:, None], np.inf).reshape(
+            batch_size, site_count, -1
+        )
+    )
+    shortest_dists_max = np.where(
+        np.isfinite(site_dists), site_dists, -np.inf
+    ).max(axis=2)
+
+    # Pass 2. Count connections within the shortest distances and pick the
+    # first reference point with the most connections per site, as in cifkit
+    row_dists_max = np.take_along_axis(
+        shortest_dists_max, np.maximum(reference_site_ids, 0), axis=1
+    )
+    counts = (is_connected & (dists <= row_dists_max[..., None])).sum(axis=2)
+    site_counts = np.where(is_site_row, counts[:, None, :], -1)
+    reference_indexes = site_counts.argmax(axis=2)
+    has_neighbors = site_counts.max(axis=2) > 0
+
+    connected_dists = np.where(is_connected, dists, np.inf)
+    site_connected_dists = np.take_along_axis(
+        connected_dists, reference_indexes[..., None], axis=1
+    )
+    pair_dists = np.stack(
+        [
+            np.where(
+                supercell_label_ids[:, None, :] == label_id,
+                site_connected_dists,
+                np.inf,
+            ).min(axis=2)
+            for label_id in range(label_count)
+        ],
+        axis=2,
+    )
+    point_group_ids = np.stack(
+        [
+            np.pad(
+                get_point_group_ids(p["supercell_cart"]),
+                (0, point_count - len(p["supercell_cart"])),
+            )
+            for p in packed
+        ]
+    )
+    candidates = merge_candidates(
+        np.full((batch_size * site_count, 0), np.iinfo(np.int64).max),
+        site_connected_dists.reshape(batch_size * site_count, point_count),
+        0,
+        point_count,
+        np.repeat(point_group_ids, site_count, axis=0),
+    ).reshape(batch_size, site_count, -1)
+
+    results = []
+    for b, p in enumerate(packed):
+        site_neighbors = {}
+        site_pair_dists = {}
+        for k, site_label in enumerate(p["site_labels"]):
+            if not has_neighbors[b, k]:
+                continue
+            site_neighbors[site_label] = decode_candidates(
+                candidates[b, k],
+                supercell_cart[b],
+                supercell_label_ids[b],
+                p["labels"],
+                point_count,
+            )
+            site_pair_dists[site_label] = {
+                label: float(pair_dists[b, k, label_id])
+                for label_id, label in enumerate(p["labels"])
+                if np.isfinite(pair_dists[b, k, label_id])
+            }
+        results.append((site_neighbors, site_pair_dists))
+    return results
+
+
+def pack_structure(
+    unitcell, supercell, labels, lengths, angles_rad, skip_translated_points
+) -> dict:
+    """
+    Return the coordinates and label ids of the reference points, grouped by
+    site in the order of the unit cell, and of the supercell points.
+    """
+    matrix = get_fractional_to_cartesian_matrix(lengths, angles_rad)
+    unitcell_frac, unitcell_label_ids = unitcell
+    supercell_frac, supercell_label_ids = supercell
+
+    site_label_ids = get_site_label_ids(unitcell_label_ids)
+    reference_fracs = []
+    reference_site_ids = []
+    for k, site_label_id in enumerate(site_label_ids):
+        site_frac = unitcell_frac[unitcell_label_ids == site_label_id]
+        if skip_translated_points:
+            site_frac = site_frac[get_central_indexes(matrix, site_frac)]
+        reference_fracs.append(site_frac)
+        reference_site_ids.extend([k] * len(site_frac))
+    reference_frac = np.concatenate(reference_fracs)
+    reference_site_ids = np.array(reference_site_ids)
+
+    return {
+        "site_labels": [labels[label_id] for label_id in site_label_ids],
+        "labels": labels,
+        "reference_frac": reference_frac,
+        "reference_cart": to_cartesian(matrix, reference_frac),
+        "reference_site_ids": reference_site_ids,
+        "reference_label_ids": np.array(site_label_ids)[reference_site_ids],
+        "supercell_frac": supercell_frac,
+        "supercell_cart": to_cartesian(matrix, supercell_frac),
+        "supercell_label_ids": np.asarray(supercell_label_ids, dtype=int),
+    }
+
+
+def get_shortest_unique_dists(dists) -> np.ndarray:
+    """
+    Return the shortest unique distances along the last axis, sorted and
+    padded with inf, at most SHORTEST_UNIQUE_DIST_COUNT per row.
+    """
+    sorted_dists = np.sort(dists, axis=-1)
+    is_unique = np.isfinite(sorted_dists)
+    is_unique[..., 1:] &= sorted_dists[..., 1:] != sorted_dists[..., :-1]
+    is_shortest = is_unique & (
+        np.cumsum(is_unique, axis=-1) <= SHORTEST_UNIQUE_DIST_COUNT
+    )
+    shortest_dists = np.sort(np.where(is_shortest, sorted_dists, np.inf), axis=-1)
+    return shortest_dists[..., :SHORTEST_UNIQUE_DIST_COUNT]
@@ -1,15 +1,218 @@
+import os
 import time
+import functools
+import numpy as np
 from click import secho
-from cifkit import CifEnsemble
+from cifkit import Cif, CifEnsemble
+from cifkit.utils.folder import get_file_paths
+from core.utils import workers, session, report, validate
 
+# Below this number of files, starting a pool costs more than it saves. A
+# file takes about 7 ms to parse and the pool about 0.3 s to start and to
+# send the objects back for 250 files (benchmarks/init_ensemble.py)
+PARALLEL_MIN_FILE_COUNT = 200
 
-def init_cif_ensemble(cif_dir_path) -> CifEnsemble:
+# Sent back from the workers as arrays, pickling each float is slow
+POINT_ATTRIBUTES = ("unitcell_points", "supercell_points")
+
+# Parsed CIF block kept by Cif objects of cifkit 1.0.8, pinned in
+# requirements.txt, which cannot be pickled and is dropped by the workers
+PARSER_ATTRIBUTES = ("_block", "_loop_values")
+
+
+def init_cif_ensemble(
+    cif_dir_path, num_cpu: int = None, relocate_invalid=False
+) -> CifEnsemble:
+    """
+    Initialize the ensemble, parsing the files across a pool of num_cpu
+    processes, by default the automatic worker count, for folders with at
+    least PARALLEL_MIN_FILE_COUNT files (see get_parse_worker_count).
+
+    With relocate_invalid, the files that cifkit cannot parse are moved to a
+    folder per reason code (see core.utils.validate) and left out of the
+    ensemble, so each file is parsed once.
+
+    In a session, the files parsed by a previous option are reused and only
+    the new or modified files are parsed.
+
+    With the file report enabled (see core.utils.report), the files taking
+    the longest or the most memory to parse are saved as the "parse" report.
+    """
     start_time = set_initial_time()
-    ensemble = CifEnsemble(cif_dir_path, preprocess=False)
+    file_paths = get_file_paths(cif_dir_path)
+    active_session = session.get_active_session()
+    file_report = report.open_report("parse")
+
+    parsed_cifs = {}
+    if active_session is not None:
+        for file_path in file_paths:
+            cif = active_session.get_cif(file_path)
+            if cif is not None:
+                parsed_cifs[file_path] = cif
+        if parsed_cifs:
+            print(f"Reused {len(parsed_cifs)} parsed files from the session")
+
+    new_file_paths = [p for p in file_paths if p not in parsed_cifs]
+    num_cpu = get_parse_worker_count(num_cpu, len(new_file_paths))
+
+    if (
+        active_session is None
+        and num_cpu == 1
+        and not file_report.is_enabled
+        and not relocate_invalid
+    ):
+        ensemble = CifEnsemble(cif_dir_path, preprocess=False)
+    else:
+        if num_cpu == 1:
+            results = [
+                parse_cif(file_path, file_report, relocate_invalid)
+                for file_path in new_file_paths
+            ]
+        else:
+            results = load_cifs_in_pool(
+                new_file_paths, num_cpu, file_report, relocate_invalid
+            )
+
+        invalid_file_paths = {}
+        for file_path, (cif, reason) in zip(new_file_paths, results):
+            if cif is None:
+                invalid_file_paths.setdefault(reason, []).append(file_path)
+            else:
+                parsed_cifs[file_path] = cif
+        validate.move_invalid_files(cif_dir_path, invalid_file_paths)
+
+        file_paths = [p for p in file_paths if p in parsed_cifs]
+        ensemble = build_cif_ensemble(
+            cif_dir_path, file_paths, [parsed_cifs[p] for p in file_paths]
+        )
+
+    if active_session is not None:
+        for file_path, cif in zip(file_paths, ensemble.cifs):
+            active_session.put_cif(file_path, cif)
+    file_report.save(cif_dir_path)
     print_elasped_time(start_time)
     return ensemble
 
 
+def get_parse_worker_count(num_cpu, file_count: int) -> int:
+    """
+    Return the number of processes parsing the files, num_cpu or the
+    automatic worker count, limited to the available cores. Parsing is bound
+    by the CPU, so more processes than cores, or a pool for fewer than
+    PARALLEL_MIN_FILE_COUNT files, only add the cost of sending the Cif
+    objects back.
+    """
+    if file_count < PARALLEL_MIN_FILE_COUNT:
+        return 1
+    if num_cpu is None:
+        num_cpu = workers.get_auto_worker_count(task_count=file_count)
+    return max(min(num_cpu, workers.get_available_cpu_count()), 1)
+
+
+def load_cifs_in_pool(
+    file_paths, num_cpu, file_report: report.FileReport = None, catch_errors=False
+) -> list[tuple[Cif | None, str | None]]:
+    """
+    Parse the Cif objects across a pool of processes, in order, adding the
+    profile of each file to the report. Return (Cif, None) per file, or
+    (None, reason code) with catch_errors if the file cannot be parsed.
+    """
+    print(f"Initializing {len(file_paths)} Cif objects with {num_cpu} processes...")
+    results = []
+    with session.open_pool(num_cpu) as pool:
+        chunksize = max(1, len(file_paths) // (num_cpu * 4))
+        for cif, points, profile, reason in pool.imap(
+            functools.partial(load_cif, catch_errors=catch_errors),
+            file_paths,
+            chunksize=chunksize,
+        ):
+            results.append((unpack_points(cif, points) if cif else None, reason))
+            if file_report is not None:
+                file_report.add(profile)
+    print("Finished initialization!")
+    return results
+
+
+def parse_cif(
+    file_path, file_report: report.FileReport = None, catch_errors=False
+) -> tuple[Cif | None, str | None]:
+    """
+    Parse a Cif object, returned as (Cif, None), or as (None, reason code)
+    with catch_errors if the file cannot be parsed. With the report enabled,
+    the supercell is built while profiling and the profile of the file is
+    added to the report.
+    """
+    is_profiled = file_report is not None and file_report.is_enabled
+    profile_start = report.start_profile() if is_profiled else None
+    try:
+        cif = Cif(file_path, is_formatted=True)
+    except Exception as e:
+        if not catch_errors:
+            raise
+        if is_profiled:
+            file_name = os.path.basename(file_path)
+            file_report.add(report.get_profile(profile_start, file_name))
+        return None, validate.get_error_reason(str(e))
+    if is_profiled:
+        file_report.add(report.get_profile(profile_start, cif.file_name, cif=cif))
+    return cif, None
+
+
+def build_cif_ensemble(cif_dir_path, file_paths, cifs) -> CifEnsemble:
+    """
+    Return a CifEnsemble of Cif objects parsed beforehand, with the
+    attributes set by CifEnsemble(cif_dir_path, preprocess=False) in cifkit
+    1.0.8, whose constructor always parses the files itself.
+    """
+    ensemble = CifEnsemble.__new__(CifEnsemble)
+    ensemble.logging_enabled = False
+    ensemble.dir_path = cif_dir_path
+    ensemble.file_paths = file_paths
+    ensemble.file_count = len(file_paths)
+    ensemble.cifs = cifs
+    return ensemble
+
+
+def load_cif(file_path, catch_errors=False) -> tuple[Cif, dict, dict, str | None]:
+    """
+    Parse a Cif object to send back from a worker, with its points packed
+    into arrays, its profile (see core.utils.report) and None. The parsed
+    CIF block is only used during initialization and cannot be pickled, so
+    it is dropped. With catch_errors, a file that cannot be parsed is sent
+    back as None, None, its profile and the reason code of the error.
+    """
+    profile_start = report.start_profile()
+    try:
+        cif = Cif(file_path, is_formatted=True)
+    except Exception as e:
+        if not catch_errors:
+            raise
+        profile = report.get_profile(profile_start, os.path.basename(file_path))
+        return None, None, profile, validate.get_error_reason(str(e))
+    profile = report.get_profile(profile_start, cif.file_name, cif=cif)
+    for attribute in PARSER_ATTRIBUTES:
+        delattr(cif, attribute)
+
+    points = {}
+    for attribute in POINT_ATTRIBUTES:
+        values = getattr(cif, attribute)
+        points[attribute] = (
+            np.array([p[:3] for p in values], dtype=float),
+            [p[3] for p in values],
+        )
+        setattr(cif, attribute, None)
+    return cif, points, profile, None
+
+
+def unpack_points(cif: Cif, points: dict) -> Cif:
+    """
+    Restore the points as (x, y, z, label) tuples, as set by cifkit.
+    """
+    for attribute, (coordinates, labels) in points.items():
+        setattr(cif, attribute, list(zip(*coordinates.T, labels)))
+    return cif
+
+
 def set_initial_time() -> float:
     """
     Set the initial time of the system.
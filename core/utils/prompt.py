@@ -1,3 +1,5 @@
+import click
+import multiprocessing as mp
 from click import echo, style
 
 
@@ -44,3 +46,63 @@ def print_moved_files_summary(filtered_file_paths, file_count, destination_path=
         )
     else:
         echo(style(f"Moved {len(filtered_file_paths)} out of {file_count} files."))
+
+
+def prompt_num_cpu():
+    """
+    Ask for the number of CPU cores used for parallel/serial processing, or
+    return None to pick it from the available cores and memory.
+    """
+    max_num_cpu = max(mp.cpu_count() - 2, 1)
+    click.echo("\nSelect the number of core(s) for parallel/serial processing.")
+    click.echo("[1] Serial process (uses one CPU core).")
+    click.echo(
+        f"[2] Parallel process with maximum ({max_num_cpu}) CPU cores"
+        " (for 1000s of cifs)."
+    )
+    click.echo(
+        f"[3] Enter the number of CPU cores (<={max_num_cpu}) manually"
+        " for parallel processing."
+    )
+    click.echo(
+        "[4] Automatic, from the available CPU cores and memory and the size"
+        " of the files."
+    )
+    filter_choice = click.prompt("Enter your choice (1, 2, 3, or 4)", type=int)
+
+    num_cpu = 1
+    if filter_choice == 2:
+        num_cpu = max_num_cpu
+    elif filter_choice == 3:
+        num_cpu = click.prompt(
+            f"Enter the number of CPU cores ({max_num_cpu})", type=int
+        )
+        num_cpu = min(num_cpu, max_num_cpu)
+    elif filter_choice == 4:
+        num_cpu = None
+    return num_cpu
+
+
+def prompt_max_memory_mb():
+    """
+    Ask for the memory ceiling per worker, or None to compute the distances
+    with cifkit directly.
+    """
+    click.echo("\nQ. Do you want to cap the memory used per file?")
+    click.echo("Recommended for supercells with 10,000s of atoms.")
+    if not click.confirm("(Default: N)", default=False):
+        return None
+    return click.prompt(
+        "Enter the memory ceiling per worker (unit in MB)", type=float, default=256
+    )
+
+
+def print_watch_status(processed_count, error_count, backlog_count, elapsed_time):
+    throughput = processed_count / elapsed_time if elapsed_time else 0
+    echo(
+        style(
+            f"Processed {processed_count} files ({error_count} errors) at "
+            f"{throughput:.2f} files/s, backlog {backlog_count} files",
+            fg="blue",
+        )
+    )
@@ -0,0 +1,228 @@
+"""
+Optional report of the slowest and most memory-hungry files of a run.
+
+Set CIF_CLEANER_REPORT_TOP_N to a number, e.g. 20, before starting. Each
+option then saves the top files by wall time and by peak RSS increase to
+csv/<folder>_<option>_slowest_files.csv and
+csv/<folder>_<option>_memory_files.csv, with the CPU time, the supercell atom
+count and the atom site count of each file. Files are parsed by every option,
+so the parsing is reported as the "parse" option. Without the variable,
+nothing is written.
+
+The peak RSS increase of a file is the peak resident memory while it is
+processed above the resident memory when it starts (see start_profile).
+"""
+
+import os
+import sys
+import time
+import heapq
+import itertools
+import pandas as pd
+from core.utils import folder
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+REPORT_TOP_N_ENV = "CIF_CLEANER_REPORT_TOP_N"
+
+REPORT_COLUMNS = {
+    "file_name": "Filename",
+    "wall_time": "Wall time (s)",
+    "cpu_time": "CPU time (s)",
+    "peak_rss_increase_mb": "Peak RSS increase (MB)",
+    "supercell_atom_count": "Supercell atom count",
+    "atom_site_count": "Atom site count",
+    "batch_size": "Batch size",
+}
+
+
+class FileReport:
+    """
+    Top files of an option by wall time and by peak RSS increase, kept in
+    heaps of top_n profiles so the memory does not grow with the run.
+    """
+
+    def __init__(self, option, top_n: int = None):
+        self.option = option
+        self.top_n = top_n
+        self.slowest = []
+        self.memory = []
+        self.counter = itertools.count()
+
+    @property
+    def is_enabled(self) -> bool:
+        return bool(self.top_n)
+
+    def add(self, profile: dict, cif=None) -> None:
+        """
+        Add the profile of a file, with the atom counts of the Cif object
+        parsed in the main process if the profile does not have them.
+        """
+        if not self.is_enabled:
+            return
+        if cif is not None and "supercell_atom_count" not in profile:
+            profile = {**profile, **get_atom_counts(cif)}
+
+        for heap, key in (
+            (self.slowest, "wall_time"),
+            (self.memory, "peak_rss_increase_mb"),
+        ):
+            value = profile.get(key)
+            if value is None:
+                continue
+            item = (value, next(self.counter), profile)
+            if len(heap) < self.top_n:
+                heapq.heappush(heap, item)
+            else:
+                heapq.heappushpop(heap, item)
+
+    def save(self, dir_path) -> None:
+        if not self.is_enabled:
+            return
+        for heap, name in (
+            (self.slowest, "slowest_files"),
+            (self.memory, "memory_files"),
+        ):
+            if not heap:
+                continue
+            rows = [
+                {
+                    column: round_value(profile.get(key))
+                    for key, column in REPORT_COLUMNS.items()
+                }
+                for _, _, profile in sorted(heap, reverse=True)
+            ]
+            folder.save_to_csv_directory(
+                dir_path,
+                pd.DataFrame(rows, columns=list(REPORT_COLUMNS.values())),
+                f"{self.option}_{name}",
+            )
+
+
+def open_report(option) -> FileReport:
+    """
+    Return the report of an option, keeping the number of files set by
+    CIF_CLEANER_REPORT_TOP_N, or writing nothing if it is not set.
+    """
+    return FileReport(option, get_report_top_n())
+
+
+def get_report_top_n() -> int | None:
+    top_n = os.environ.get(REPORT_TOP_N_ENV)
+    return int(top_n) if top_n else None
+
+
+def get_peak_rss_mb() -> float | None:
+    """
+    Return the peak resident memory of the process so far, or None where it
+    is not available, e.g. on Windows.
+    """
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    if sys.platform == "darwin":
+        return peak_rss / 1024**2
+    return peak_rss / 1024
+
+
+def reset_peak_rss() -> bool:
+    """
+    Reset the peak resident memory of the process to its current resident
+    memory, which Linux allows through /proc/self/clear_refs. Return False
+    where it cannot be reset.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def get_proc_status_mb(field) -> float | None:
+    """
+    Return a memory field of /proc/self/status, e.g. VmRSS or VmHWM, in MB.
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def start_profile() -> tuple:
+    """
+    Return the clocks and the memory used at the start of a file. With the
+    report enabled on Linux, the peak resident memory of the process is
+    reset, so the peak of each file is measured even in a worker that
+    already processed larger files. Elsewhere, the peak of the process is
+    read instead, which only increases when a file needs more memory than
+    every earlier file of the worker.
+    """
+    start_rss = None
+    if get_report_top_n():
+        if reset_peak_rss():
+            start_rss = ("VmHWM", get_proc_status_mb("VmRSS"))
+        else:
+            start_rss = ("ru_maxrss", get_peak_rss_mb())
+    return time.perf_counter(), time.process_time(), start_rss
+
+
+def get_peak_rss_increase_mb(start_rss) -> float | None:
+    """
+    Return the peak resident memory since start_profile above the resident
+    memory at the start, or None if it was not measured.
+    """
+    if start_rss is None or start_rss[1] is None:
+        return None
+    source, start_mb = start_rss
+    if source == "VmHWM":
+        peak_mb = get_proc_status_mb("VmHWM")
+    else:
+        peak_mb = get_peak_rss_mb()
+    if peak_mb is None:
+        return None
+    return max(0.0, peak_mb - start_mb)
+
+
+def get_profile(start, file_name, batch_size=1, cif=None) -> dict:
+    """
+    Return the wall time, CPU time and peak RSS increase since start_profile.
+    For a batch of files computed together, the times are split evenly
+    between the files and each file gets the peak RSS increase of the batch.
+
+    With the report enabled, the atom counts of the Cif object are added,
+    building its supercell first if needed, so the time includes it.
+    """
+    atom_counts = {}
+    if cif is not None and get_report_top_n():
+        atom_counts = get_atom_counts(cif)
+
+    start_wall_time, start_cpu_time, start_rss = start
+    profile = {
+        "file_name": file_name,
+        "wall_time": (time.perf_counter() - start_wall_time) / batch_size,
+        "cpu_time": (time.process_time() - start_cpu_time) / batch_size,
+        "peak_rss_increase_mb": get_peak_rss_increase_mb(start_rss),
+        "batch_size": batch_size,
+        **atom_counts,
+    }
+    return profile
+
+
+def get_atom_counts(cif) -> dict:
+    return {
+        "supercell_atom_count": cif.supercell_atom_count,
+        "atom_site_count": len(cif.atom_site_info),
+    }
+
+
+def round_value(value):
+    return round(value, 3) if isinstance(value, float) else value
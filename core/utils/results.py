@@ -0,0 +1,431 @@
+"""
+Compact store of the per-file results of an option, kept as NumPy columns
+instead of a list or dict per file, with bulk export to CSV, Parquet or
+Arrow (see core.utils.table).
+
+File names are interned in a StringTable, one UTF-8 buffer with the offset
+of each name and an int32 hash index, so no Python string is kept per file.
+The row of a file is its id in the table. Strings of string lists, e.g.
+element pairs, are few and stored once as a Python list, with their int16 id
+in the rows.
+
+Scalar results are held in one array per column, with a flag for missing
+values, e.g. of files that could not be processed. Lists of results per
+file, e.g. CN values or min distances per element pair, are held in one flat
+array per column. The lists of a row have the same length and share its
+offset and length, so a row costs the same for one list column or several.
+
+Distances rounded to 3 decimals by cifkit are stored as int32 thousandths
+("fixed3"), which is exact and half the size of float64.
+"""
+
+import numpy as np
+import pandas as pd
+from core.utils import table
+
+SCALAR_TYPES = {"float64": np.float64, "int64": np.int64, "fixed3": np.int32}
+
+# Strings of string lists are stored as their id in the store, at most
+# MAX_STRING_COUNT distinct strings, e.g. element pairs
+LIST_TYPES = {
+    "float64_list": np.float64,
+    "fixed3_list": np.int32,
+    "int64_list": np.int64,
+    "int16_list": np.int16,
+    "string_list": np.int16,
+}
+
+MAX_STRING_COUNT = np.iinfo(np.int16).max + 1
+
+COLUMN_TYPES = (*SCALAR_TYPES, *LIST_TYPES)
+
+FIXED3_TYPES = ("fixed3", "fixed3_list")
+
+# Stored for None in fixed3 lists
+FIXED3_MISSING = np.iinfo(np.int32).min
+
+# Rows allocated at first, grown by GROWTH_FACTOR when full
+INITIAL_CAPACITY = 1024
+GROWTH_FACTOR = 1.5
+
+# Separates the values of a list in a table cell
+LIST_SEPARATOR = " "
+
+
+class StringTable:
+    """
+    Strings stored once in one UTF-8 buffer, with an int32 id each. Ids are
+    found by hashing into an open-addressing index of ids, kept at most half
+    full, instead of a dict of Python strings.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.count = 0
+        self.byte_count = 0
+        self.buffer = np.empty(capacity * 16, dtype=np.uint8)
+        self.offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self.index = np.full(capacity * 2, -1, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, string_id) -> str:
+        start, end = self.offsets[string_id : string_id + 2]
+        return self.buffer[start:end].tobytes().decode()
+
+    def find(self, string) -> int | None:
+        """
+        Return the id of the string, or None if it is not in the table.
+        """
+        string_id, _ = self.probe(string, string.encode())
+        return string_id
+
+    def add(self, string) -> int:
+        """
+        Return the id of the string, adding it if it is not in the table.
+        """
+        encoded = string.encode()
+        string_id, slot = self.probe(string, encoded)
+        if string_id is not None:
+            return string_id
+
+        string_id = self.count
+        if string_id + 1 == len(self.offsets):
+            self.offsets = resize(
+                self.offsets, get_grown_capacity(len(self.offsets)), np.int64, 0
+            )
+        end = self.byte_count + len(encoded)
+        if end > len(self.buffer):
+            self.buffer = resize(
+                self.buffer, max(get_grown_capacity(len(self.buffer)), end), np.uint8, 0
+            )
+        self.buffer[self.byte_count : end] = np.frombuffer(encoded, dtype=np.uint8)
+        self.byte_count = end
+        self.offsets[string_id + 1] = end
+        self.count += 1
+
+        self.index[slot] = string_id
+        if self.count * 2 > len(self.index):
+            self.rehash(len(self.index) * 2)
+        return string_id
+
+    def probe(self, string, encoded) -> tuple[int | None, int]:
+        """
+        Return the id of the string, or None, and the slot of the index where
+        it is or would be added.
+        """
+        mask = len(self.index) - 1
+        slot = hash(string) & mask
+        while True:
+            string_id = int(self.index[slot])
+            if string_id == -1:
+                return None, slot
+            start, end = self.offsets[string_id : string_id + 2]
+            if self.buffer[start:end].tobytes() == encoded:
+                return string_id, slot
+            slot = (slot + 1) & mask
+
+    def rehash(self, slot_count) -> None:
+        self.index = np.full(slot_count, -1, dtype=np.int32)
+        mask = slot_count - 1
+        for string_id, string in enumerate(self.to_list()):
+            slot = hash(string) & mask
+            while self.index[slot] != -1:
+                slot = (slot + 1) & mask
+            self.index[slot] = string_id
+
+    def to_list(self) -> list[str]:
+        """
+        Return every string in the order of their ids.
+        """
+        data = self.buffer[: self.byte_count].tobytes()
+        offsets = self.offsets[: self.count + 1].tolist()
+        return [data[start:end].decode() for start, end in zip(offsets, offsets[1:])]
+
+    @property
+    def nbytes(self) -> int:
+        return self.buffer.nbytes + self.offsets.nbytes + self.index.nbytes
+
+
+class ResultStore:
+    """
+    Results by file name, one row per file. The columns are given as
+    {name: type} with a type in COLUMN_TYPES. Setting the results of a file
+    again replaces its row, and the previous values of its lists are left
+    unused.
+    """
+
+    def __init__(self, columns: dict[str, str]):
+        for name, column_type in columns.items():
+            if column_type not in COLUMN_TYPES:
+                raise ValueError(
+                    f"Unknown type {column_type} of column {name},"
+                    f" use one of {COLUMN_TYPES}"
+                )
+        self.columns = dict(columns)
+        self.file_names = StringTable()
+        self.strings = []
+        self.string_ids = {}
+        self.capacity = 0
+        self.values = {}
+        self.is_missing = {}
+        # Offset and length of the lists of each row, shared by list columns
+        self.list_offsets = None
+        self.list_lengths = None
+        self.list_values = {}
+        self.list_size = 0
+        self.list_capacity = INITIAL_CAPACITY
+        for name, column_type in self.columns.items():
+            if column_type in LIST_TYPES:
+                self.list_values[name] = np.empty(
+                    self.list_capacity, dtype=LIST_TYPES[column_type]
+                )
+        self.grow(INITIAL_CAPACITY)
+
+    def __len__(self) -> int:
+        return len(self.file_names)
+
+    def __contains__(self, file_name) -> bool:
+        return self.file_names.find(file_name) is not None
+
+    def iter_file_names(self):
+        return iter(self.file_names.to_list())
+
+    def grow(self, capacity) -> None:
+        for name, column_type in self.columns.items():
+            if column_type in SCALAR_TYPES:
+                self.values[name] = resize(
+                    self.values.get(name), capacity, SCALAR_TYPES[column_type], 0
+                )
+            self.is_missing[name] = resize(
+                self.is_missing.get(name), capacity, bool, True
+            )
+        if self.list_values:
+            self.list_offsets = resize(self.list_offsets, capacity, np.int64, 0)
+            self.list_lengths = resize(self.list_lengths, capacity, np.uint16, 0)
+        self.capacity = capacity
+
+    def set(self, file_name, **values) -> None:
+        """
+        Set the results of a file, with None or no value for missing results.
+        The lists given for a file must have the same length.
+        """
+        unknown_columns = set(values) - set(self.columns)
+        if unknown_columns:
+            raise ValueError(f"Unknown columns {sorted(unknown_columns)}")
+
+        lists = {
+            name: self.to_list_array(name, value)
+            for name, value in values.items()
+            if value is not None and self.columns[name] in LIST_TYPES
+        }
+        list_length = self.get_list_length(lists)
+
+        row = self.file_names.add(file_name)
+        if row == self.capacity:
+            self.grow(get_grown_capacity(self.capacity))
+
+        for name, column_type in self.columns.items():
+            value = values.get(name)
+            self.is_missing[name][row] = value is None
+            if value is not None and column_type in SCALAR_TYPES:
+                if column_type == "fixed3":
+                    value = round(value * 1000)
+                self.values[name][row] = value
+        if self.list_values:
+            self.set_lists(row, lists, list_length)
+
+    def to_list_array(self, name, value) -> np.ndarray:
+        column_type = self.columns[name]
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        if column_type == "string_list":
+            value = [self.get_string_id(string) for string in value]
+        elif column_type == "fixed3_list":
+            value = [
+                FIXED3_MISSING if v is None else round(v * 1000) for v in value
+            ]
+        # None in a float list is stored as NaN
+        return np.array(list(value), dtype=LIST_TYPES[column_type])
+
+    def get_string_id(self, string) -> int:
+        string_id = self.string_ids.get(string)
+        if string_id is None:
+            if len(self.strings) == MAX_STRING_COUNT:
+                raise ValueError(f"More than {MAX_STRING_COUNT} strings in lists")
+            string_id = self.string_ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def get_list_length(self, lists) -> int:
+        lengths = {len(array) for array in lists.values()}
+        if len(lengths) > 1:
+            raise ValueError(
+                f"The lists of a file must have the same length, got"
+                f" {dict((name, len(array)) for name, array in lists.items())}"
+            )
+        list_length = lengths.pop() if lengths else 0
+        if list_length > np.iinfo(np.uint16).max:
+            raise ValueError(f"Lists of {list_length} values are too long")
+        return list_length
+
+    def set_lists(self, row, lists, list_length) -> None:
+        size = self.list_size
+        if size + list_length > self.list_capacity:
+            self.list_capacity = max(
+                get_grown_capacity(self.list_capacity), size + list_length
+            )
+            for name, flat_values in self.list_values.items():
+                self.list_values[name] = resize(
+                    flat_values, self.list_capacity, flat_values.dtype, 0
+                )
+        for name, array in lists.items():
+            self.list_values[name][size : size + list_length] = array
+        self.list_offsets[row] = size
+        self.list_lengths[row] = list_length
+        self.list_size = size + list_length
+
+    def get(self, file_name, column):
+        """
+        Return a result of a file, a list for list columns, or None if it is
+        missing.
+        """
+        row = self.file_names.find(file_name)
+        if row is None:
+            raise KeyError(file_name)
+        if self.is_missing[column][row]:
+            return None
+        column_type = self.columns[column]
+        if column_type in SCALAR_TYPES:
+            value = self.values[column][row].item()
+            return value / 1000 if column_type == "fixed3" else value
+
+        offset = self.list_offsets[row]
+        values = self.list_values[column][offset : offset + self.list_lengths[row]]
+        if column_type == "string_list":
+            return [self.strings[i] for i in values.tolist()]
+        if column_type in ("float64_list", "fixed3_list"):
+            return [
+                None if np.isnan(v) else v
+                for v in self.to_float(column, values).tolist()
+            ]
+        return values.tolist()
+
+    def to_float(self, column, values) -> np.ndarray:
+        """
+        Return the stored values of a float column as float64, with NaN for
+        missing values of fixed3 columns.
+        """
+        if self.columns[column] not in FIXED3_TYPES:
+            return values
+        return np.where(values == FIXED3_MISSING, np.nan, values / 1000)
+
+    def to_dataframe(self, column_names: dict[str, str] = None) -> pd.DataFrame:
+        """
+        Return a table with the file name and the columns renamed as in
+        column_names, by default every column. Lists are joined by a space,
+        and missing results are left empty.
+        """
+        if column_names is None:
+            column_names = {name: name for name in self.columns}
+        row_count = len(self)
+        data = {"Filename": self.file_names.to_list()}
+        for name, label in column_names.items():
+            column_type = self.columns[name]
+            is_missing = self.is_missing[name][:row_count]
+            if column_type in ("float64", "fixed3"):
+                values = self.to_float(name, self.values[name][:row_count])
+                data[label] = np.where(is_missing, np.nan, values)
+            elif column_type == "int64":
+                data[label] = pd.arrays.IntegerArray(
+                    self.values[name][:row_count].copy(), is_missing.copy()
+                )
+            else:
+                data[label] = self.join_lists(name)
+        return pd.DataFrame(data)
+
+    def join_lists(self, name) -> list[str | None]:
+        """
+        Return the list of each file joined by a space, or None if missing.
+        """
+        column_type = self.columns[name]
+        flat_values = self.list_values[name][: self.list_size]
+        if column_type == "string_list":
+            strings = [self.strings[i] for i in flat_values.tolist()]
+        else:
+            strings = list(map(str, self.to_float(name, flat_values).tolist()))
+        row_count = len(self)
+        return [
+            None if is_missing else LIST_SEPARATOR.join(strings[offset : offset + length])
+            for is_missing, offset, length in zip(
+                self.is_missing[name][:row_count].tolist(),
+                self.list_offsets[:row_count].tolist(),
+                self.list_lengths[:row_count].tolist(),
+            )
+        ]
+
+    def explode(self, column_names: dict[str, str]) -> pd.DataFrame:
+        """
+        Return a table with one row per value of the lists of each file, with
+        the file name and the list columns renamed as in column_names.
+        """
+        row_count = len(self)
+        first_name = next(iter(column_names))
+        lengths = np.where(
+            self.is_missing[first_name][:row_count],
+            0,
+            self.list_lengths[:row_count].astype(np.int64),
+        )
+        rows = np.repeat(np.arange(row_count), lengths)
+        # Position of each value within the list of its file
+        positions_in_list = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths
+        )
+        positions = self.list_offsets[:row_count][rows] + positions_in_list
+
+        file_names = np.array(self.file_names.to_list(), dtype=object)
+        data = {"Filename": file_names[rows]}
+        for name, label in column_names.items():
+            values = self.list_values[name][positions]
+            if self.columns[name] == "string_list":
+                values = np.array(self.strings, dtype=object)[values]
+            else:
+                values = self.to_float(name, values)
+            data[label] = values
+        return pd.DataFrame(data)
+
+    def save(
+        self, file_path, output_format="csv", column_names: dict[str, str] = None
+    ) -> None:
+        """
+        Save the table of to_dataframe as CSV, Parquet or Arrow.
+        """
+        table.save_dataframe(self.to_dataframe(column_names), file_path, output_format)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Return the bytes held by the arrays of the store.
+        """
+        arrays = [
+            *self.values.values(),
+            *self.is_missing.values(),
+            *self.list_values.values(),
+        ]
+        if self.list_values:
+            arrays += [self.list_offsets, self.list_lengths]
+        return self.file_names.nbytes + sum(array.nbytes for array in arrays)
+
+
+def get_grown_capacity(capacity) -> int:
+    return int(capacity * GROWTH_FACTOR) + 1
+
+
+def resize(array, capacity, dtype, fill_value) -> np.ndarray:
+    """
+    Return a copy of the array with the new capacity, filling the new rows.
+    """
+    resized = np.full(capacity, fill_value, dtype=dtype)
+    if array is not None:
+        resized[: len(array)] = array
+    return resized
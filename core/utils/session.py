@@ -0,0 +1,137 @@
+"""
+Session keeping the worker pool, the parsed files and the computed features
+alive across several options, so only the first option pays the setup cost.
+
+>>> from core.utils import session
+>>> with session.start_session():
+...     min_distance.filter_files_by_min_dist(path, is_interactive_mode=False)
+...     coordination.move_files_based_on_coordination_number(
+...         path, is_interactive_mode=False, numbers=[12], option=2
+...     )
+
+Outside a session, each option parses the folder and starts its own pool.
+"""
+
+import os
+import multiprocessing as mp
+import multiprocessing.pool
+from contextlib import contextmanager
+
+_active_session = None
+
+
+class Session:
+    """
+    Worker pool, parsed Cif objects and computed features shared by the
+    options run in a session. Parsed files and features are keyed by the
+    file path and only reused while the size and modification time of the
+    file are unchanged.
+    """
+
+    def __init__(self):
+        self.pool = None
+        self.pool_size = None
+        self.cifs = {}
+        self.features = {}
+
+    def get_pool(self, num_cpu: int) -> mp.Pool:
+        """
+        Return the pool of the session, started again only if another
+        number of workers is requested or the pool was terminated after a
+        lost worker (see core.utils.workers).
+        """
+        if self.pool is not None and (
+            self.pool_size != num_cpu or self.pool._state != mp.pool.RUN
+        ):
+            self.close_pool()
+        if self.pool is None:
+            self.pool = mp.Pool(num_cpu)
+            self.pool_size = num_cpu
+        return self.pool
+
+    def get_cif(self, file_path):
+        """
+        Return the Cif object parsed from the file in this session, or None.
+        """
+        file_key, cif = self.cifs.get(file_path, (None, None))
+        if file_key is None or file_key != get_file_key(file_path):
+            return None
+        return cif
+
+    def put_cif(self, file_path, cif) -> None:
+        self.cifs[file_path] = (get_file_key(file_path), cif)
+
+    def get_feature(self, feature_name, file_path):
+        """
+        Return the feature value computed for the file in this session, or
+        None.
+        """
+        features = self.features.get(feature_name, {})
+        file_key, value = features.get(file_path, (None, None))
+        if file_key is None or file_key != get_file_key(file_path):
+            return None
+        return value
+
+    def put_feature(self, feature_name, file_path, value) -> None:
+        features = self.features.setdefault(feature_name, {})
+        features[file_path] = (get_file_key(file_path), value)
+
+    def close_pool(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+        self.pool = None
+        self.pool_size = None
+
+    def close(self) -> None:
+        self.close_pool()
+        self.cifs.clear()
+        self.features.clear()
+
+
+def get_file_key(file_path) -> tuple[int, int] | None:
+    """
+    Return the size and modification time of the file, or None if it has
+    been moved.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+@contextmanager
+def start_session():
+    """
+    Start a session used by the options run until the block exits.
+    """
+    global _active_session
+    if _active_session is not None:
+        yield _active_session
+        return
+
+    _active_session = Session()
+    try:
+        yield _active_session
+    finally:
+        _active_session.close()
+        _active_session = None
+
+
+def get_active_session() -> Session | None:
+    return _active_session
+
+
+@contextmanager
+def open_pool(num_cpu: int):
+    """
+    Yield the pool of the active session, or a pool closed when the block
+    exits outside a session.
+    """
+    if _active_session is not None:
+        yield _active_session.get_pool(num_cpu)
+        return
+
+    with mp.Pool(num_cpu) as pool:
+        yield pool
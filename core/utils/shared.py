@@ -0,0 +1,134 @@
+"""
+Optional transport of the parsed structures to the workers in shared memory,
+so the workers of options 2 and 7 do not parse the files again.
+
+Set CIF_CLEANER_SHARED_MEMORY=1 before starting. The files are parsed once
+by the main process when the folder is loaded, and before computing, the
+points of every file to compute are placed in one
+multiprocessing.shared_memory block. Each task carries the name of the
+block, the rows of its file and its cell and labels. The workers pass the
+coordinates and label ids to core.utils.neighbor as NumPy views of the block
+(see core.utils.cache.get_point_arrays), without building the point tuples
+of the Cif object, so the points are not copied per worker.
+
+The main process unlinks the block when the pool is done, including when a
+worker crashes or the run is interrupted. If the main process itself is
+killed, the resource tracker of multiprocessing unlinks it.
+"""
+
+import os
+import numpy as np
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from core.utils import cache
+
+SHARED_MEMORY_ENV = "CIF_CLEANER_SHARED_MEMORY"
+
+# Coordinates and label index of each point
+POINT_ROW_BYTES = 4 * np.dtype(float).itemsize
+
+# Blocks attached by the worker process, by name
+_attached_blocks = {}
+
+
+def is_shared_memory_enabled() -> bool:
+    return os.environ.get(SHARED_MEMORY_ENV, "").lower() in ("1", "true", "yes")
+
+
+def iter_file_tasks(tasks):
+    """
+    Yield the task of each file, including the files of batch tasks.
+    """
+    for task in tasks:
+        if "batch" in task:
+            yield from task["batch"]
+        else:
+            yield task
+
+
+@contextmanager
+def share_structures(tasks, cifs_by_name: dict):
+    """
+    Place the structures of the files of the tasks, parsed by the main
+    process, in one shared memory block, adding its reference to each task
+    as "structure", and unlink the block when the block exits. Nothing is
+    shared unless CIF_CLEANER_SHARED_MEMORY is set.
+    """
+    file_tasks = [
+        task
+        for task in iter_file_tasks(tasks)
+        if os.path.basename(task["cif_path"]) in cifs_by_name
+    ]
+    if not is_shared_memory_enabled() or not file_tasks:
+        yield
+        return
+
+    packed = [
+        cache.pack_structure(cifs_by_name[os.path.basename(task["cif_path"])])
+        for task in file_tasks
+    ]
+    row_count = sum(len(array) for array, _ in packed)
+    block = shared_memory.SharedMemory(
+        create=True, size=max(row_count * POINT_ROW_BYTES, 1)
+    )
+    try:
+        start = 0
+        for task, (array, metadata) in zip(file_tasks, packed):
+            get_rows(block, start, len(array))[:] = array
+            task["structure"] = {
+                "block_name": block.name,
+                "start": start,
+                "row_count": len(array),
+                "metadata": metadata,
+            }
+            start += len(array)
+        del packed
+        yield
+    finally:
+        for task in file_tasks:
+            task.pop("structure", None)
+        block.close()
+        block.unlink()
+
+
+def get_rows(block, start, row_count) -> np.ndarray:
+    return np.ndarray(
+        (row_count, 4),
+        dtype=float,
+        buffer=block.buf,
+        offset=start * POINT_ROW_BYTES,
+    )
+
+
+def load_cif(file_path, structure: dict = None):
+    """
+    Return the structure of the file from shared memory if the task has one,
+    or else load it as core.utils.cache.load_cif does.
+    """
+    if structure is None:
+        return cache.load_cif(file_path)
+    block = attach_block(structure["block_name"])
+    points = get_rows(block, structure["start"], structure["row_count"])
+    return cache.CachedStructure(file_path, points, structure["metadata"])
+
+
+def attach_block(block_name):
+    """
+    Return the block attached by the worker, attaching it once per process.
+    Blocks of earlier runs, e.g. of the pool of a session, are detached.
+    """
+    block = _attached_blocks.get(block_name)
+    if block is not None:
+        return block
+
+    for name, old_block in list(_attached_blocks.items()):
+        try:
+            old_block.close()
+        except BufferError:
+            # Points of the block are still in use
+            continue
+        del _attached_blocks[name]
+
+    block = shared_memory.SharedMemory(name=block_name)
+    _attached_blocks[block_name] = block
+    return block
@@ -0,0 +1,210 @@
+"""
+Streaming summaries of per-file values, such as the min distance, the
+supercell atom count and the CN, updated as results arrive instead of from
+the full list of values at the end.
+
+A summary is a fixed-bin histogram, with bins as wide as the resolution of
+the values, e.g. 0.001 Å for distances rounded to 3 decimals, and a DDSketch
+quantile sketch. Both are counts per bin, so summaries from workers, shards
+or runs merge by adding counts, and are saved as JSON next to the plots.
+"""
+
+import json
+import math
+import numpy as np
+import pandas as pd
+from os.path import join
+from collections import Counter
+from core.utils import folder
+
+# Relative accuracy of the quantiles from the sketch
+SKETCH_RELATIVE_ACCURACY = 0.01
+
+# Quantiles saved in the summary tables
+SUMMARY_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+
+class QuantileSketch:
+    """
+    DDSketch with logarithmic bins, returning quantiles within the relative
+    accuracy of the true value for positive values.
+    """
+
+    def __init__(self, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bin_counts = Counter()
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value, count=1) -> None:
+        if value <= 0:
+            self.zero_count += count
+        else:
+            self.bin_counts[math.ceil(math.log(value) / self.log_gamma)] += count
+        self.count += count
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracies")
+        self.bin_counts.update(other.bin_counts)
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        cumulative_count = self.zero_count
+        if rank < cumulative_count:
+            return 0.0
+        for index in sorted(self.bin_counts):
+            cumulative_count += self.bin_counts[index]
+            if rank < cumulative_count:
+                return 2 * self.gamma**index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bin_counts) / (self.gamma + 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "bin_counts": {str(i): c for i, c in self.bin_counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.zero_count = data["zero_count"]
+        sketch.bin_counts = Counter(
+            {int(i): c for i, c in data["bin_counts"].items()}
+        )
+        sketch.count = sketch.zero_count + sum(sketch.bin_counts.values())
+        return sketch
+
+
+class StreamingSummary:
+    """
+    Fixed-bin histogram and quantile sketch of a value. Only the bins with a
+    value are stored, so the memory depends on the number of distinct bins,
+    not on the number of files.
+    """
+
+    def __init__(self, name, bin_width, relative_accuracy=SKETCH_RELATIVE_ACCURACY):
+        self.name = name
+        self.bin_width = bin_width
+        self.bin_counts = Counter()
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value, count=1) -> None:
+        # NumPy scalars are saved as JSON with the Python types
+        value = value.item() if isinstance(value, np.generic) else value
+        self.bin_counts[round(value / self.bin_width)] += count
+        self.sketch.add(value, count)
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "StreamingSummary") -> None:
+        if other.bin_width != self.bin_width:
+            raise ValueError(f"Cannot merge {other.name} bins into {self.name} bins")
+        self.bin_counts.update(other.bin_counts)
+        self.sketch.merge(other.sketch)
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def get_bin_values_and_counts(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Return the value of each stored bin and its count, sorted by value.
+        Values rounded to the bin width are returned exactly.
+        """
+        indexes = sorted(self.bin_counts)
+        decimals = max(0, -math.floor(math.log10(self.bin_width)))
+        values = np.round(np.array(indexes, dtype=float) * self.bin_width, decimals)
+        counts = np.array([self.bin_counts[i] for i in indexes], dtype=float)
+        return values, counts
+
+    def quantile(self, q: float) -> float | None:
+        return self.sketch.quantile(q)
+
+    def get_summary_row(self) -> dict:
+        """
+        Return the count, mean, min, max and quantiles as one table row.
+        """
+        row = {
+            "Value": self.name,
+            "Count": self.count,
+            "Mean": round(self.total / self.count, 6) if self.count else None,
+            "Min": self.min,
+            "Max": self.max,
+        }
+        for q in SUMMARY_QUANTILES:
+            value = self.quantile(q)
+            row[f"P{q * 100:g}"] = round(value, 6) if value is not None else None
+        return row
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "bin_width": self.bin_width,
+            "bin_counts": {str(i): c for i, c in self.bin_counts.items()},
+            "sketch": self.sketch.to_dict(),
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamingSummary":
+        summary = cls(data["name"], data["bin_width"])
+        summary.bin_counts = Counter(
+            {int(i): c for i, c in data["bin_counts"].items()}
+        )
+        summary.sketch = QuantileSketch.from_dict(data["sketch"])
+        summary.count = data["count"]
+        summary.total = data["total"]
+        summary.min = data["min"]
+        summary.max = data["max"]
+        return summary
+
+
+def save_summary(summary: StreamingSummary, file_path) -> None:
+    with open(file_path, "w") as f:
+        json.dump(summary.to_dict(), f)
+
+
+def save_summary_files(dir_path, summary: StreamingSummary, table_name) -> None:
+    """
+    Save the summary table and the summary as JSON in the 'plot'
+    sub-directory, e.g. plot/min-dist-summary.csv and .json.
+    """
+    folder.save_results_table(
+        dir_path, pd.DataFrame([summary.get_summary_row()]), f"{table_name}-summary"
+    )
+    save_summary(summary, join(dir_path, "plot", f"{table_name}-summary.json"))
+
+
+def load_summary(file_path) -> StreamingSummary:
+    with open(file_path) as f:
+        return StreamingSummary.from_dict(json.load(f))
+
+
+def merge_summaries(summaries) -> StreamingSummary:
+    """
+    Return a summary of the values of all summaries, e.g. from shards of a
+    folder processed on different machines.
+    """
+    summaries = list(summaries)
+    merged = StreamingSummary(summaries[0].name, summaries[0].bin_width)
+    for summary in summaries:
+        merged.merge(summary)
+    return merged
@@ -0,0 +1,129 @@
+"""
+Write per-file rows to CSV, Parquet or Arrow in batches as they are computed,
+instead of building a DataFrame of every row at the end.
+
+Parquet and Arrow need pyarrow, which is optional:
+
+    pip install pyarrow
+"""
+
+import os
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pa = None
+
+OUTPUT_FORMATS = ("csv", "parquet", "arrow")
+
+# Rows per Parquet row group or Arrow record batch, and per CSV write
+BATCH_SIZE = 65536
+
+COLUMN_TYPES = ("string", "int64", "float64")
+
+
+def is_arrow_available() -> bool:
+    return pa is not None
+
+
+def check_output_format(output_format) -> None:
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(
+            f"Unknown output format {output_format}, use one of {OUTPUT_FORMATS}"
+        )
+    if output_format != "csv" and pa is None:
+        raise ImportError(
+            f"Writing {output_format} needs pyarrow, install it with"
+            " 'pip install pyarrow'"
+        )
+
+
+def save_dataframe(df: pd.DataFrame, file_path, output_format="csv") -> None:
+    """
+    Write a whole table at once, in the same formats as TableWriter.
+    """
+    check_output_format(output_format)
+    if output_format == "csv":
+        df.to_csv(file_path, index=False)
+        return
+
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    if output_format == "parquet":
+        pa.parquet.write_table(arrow_table, file_path, row_group_size=BATCH_SIZE)
+    else:
+        with pa.ipc.new_file(file_path, arrow_table.schema) as writer:
+            writer.write_table(arrow_table, max_chunksize=BATCH_SIZE)
+
+
+class TableWriter:
+    """
+    Append rows to a table file, written one batch of rows at a time. The
+    columns are given as {name: type} with a type in COLUMN_TYPES, so every
+    batch has the same schema even when a batch has only missing values.
+    """
+
+    def __init__(self, file_path, columns: dict[str, str], output_format="csv"):
+        check_output_format(output_format)
+        self.file_path = file_path
+        self.columns = columns
+        self.output_format = output_format
+        self.rows = []
+        self.row_count = 0
+        self._writer = None
+        if output_format != "csv":
+            self.schema = pa.schema(
+                [(name, getattr(pa, type_name)()) for name, type_name in columns.items()]
+            )
+
+    def write_row(self, row: dict) -> None:
+        self.rows.append(row)
+        if len(self.rows) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.rows and self.row_count:
+            return
+
+        if self.output_format == "csv":
+            df = pd.DataFrame(self.rows, columns=list(self.columns))
+            df.to_csv(
+                self.file_path,
+                mode="a" if self.row_count else "w",
+                header=not self.row_count,
+                index=False,
+            )
+        else:
+            batch = pa.RecordBatch.from_pylist(self.rows, schema=self.schema)
+            if self._writer is None:
+                if self.output_format == "parquet":
+                    self._writer = pa.parquet.ParquetWriter(self.file_path, self.schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, self.schema)
+            if self.output_format == "parquet":
+                self._writer.write_batch(batch, row_group_size=BATCH_SIZE)
+            else:
+                self._writer.write_batch(batch)
+
+        self.row_count += len(self.rows)
+        self.rows = []
+
+    def close(self) -> None:
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def get_table_path(dir_path, base_filename, output_format="csv") -> str:
+    """
+    Return the path of a table inside a sub-directory named after the
+    format, e.g. csv/<folder>_info.csv or parquet/<folder>_info.parquet.
+    """
+    table_directory = os.path.join(dir_path, output_format)
+    os.makedirs(table_directory, exist_ok=True)
+    folder_name = os.path.basename(dir_path)
+    file_name = f"{folder_name}_{base_filename}.{output_format}"
+    return os.path.join(table_directory, file_name)
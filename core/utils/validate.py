@@ -0,0 +1,83 @@
+import os
+import shutil
+from cifkit.utils import cif_parser
+from cifkit.utils.folder import get_file_paths
+from cifkit.preprocessors.supercell import find_symmetry_operations, get_supercell_points
+
+# Reason codes, the folders used by cifkit for the same errors
+NO_LABELS = "error_no_labels"
+OPERATIONS = "error_operations"
+DUPLICATE_LABELS = "error_duplicate_labels"
+WRONG_LOOP_VALUE = "error_wrong_loop_value"
+COORDS = "error_coords"
+INVALID_LABEL = "error_invalid_label"
+OTHERS = "error_others"
+
+# Part of the error message of each reason, in the order checked by
+# cifkit.preprocessors.error.move_files_based_on_errors
+ERROR_MESSAGE_REASONS = (
+    ("symmetry operation", OPERATIONS),
+    ("no atomic label and type", NO_LABELS),
+    ("contains duplicate atom site labels", DUPLICATE_LABELS),
+    ("Wrong number of values in loop", WRONG_LOOP_VALUE),
+    ("missing atomic coordinates", COORDS),
+    ("element was not correctly parsed", INVALID_LABEL),
+)
+
+
+def get_validation_error(file_path) -> str | None:
+    """
+    Return the reason code of the error raised by cifkit while reading the
+    file, or None if the file can be parsed. The same steps as parsing a Cif
+    object are run, with the unit cell but not the supercell generated.
+    """
+    try:
+        block = cif_parser.get_cif_block(file_path)
+        cif_parser.get_unitcell_lengths(block)
+        cif_parser.get_unitcell_angles_rad(block)
+        cif_parser.get_formula_structure_weight_s_group(block)
+        cif_parser.parse_atom_site_occupancy_info(file_path)
+        find_symmetry_operations(block)
+        get_supercell_points(block, 1)
+    except Exception as e:
+        return get_error_reason(str(e))
+    return None
+
+
+def get_error_reason(error_message) -> str:
+    for message, reason in ERROR_MESSAGE_REASONS:
+        if message in error_message:
+            return reason
+    return OTHERS
+
+
+def relocate_invalid_files(cif_dir_path) -> dict[str, list[str]]:
+    """
+    Move the files failing validation to a folder per reason code before any
+    file is parsed, and return the moved file paths per reason code.
+
+    The options parsing the files anyway move them while parsing instead,
+    see core.utils.object.init_cif_ensemble.
+    """
+    invalid_file_paths = {}
+    for file_path in get_file_paths(cif_dir_path):
+        reason = get_validation_error(file_path)
+        if reason is not None:
+            invalid_file_paths.setdefault(reason, []).append(file_path)
+    move_invalid_files(cif_dir_path, invalid_file_paths)
+    return invalid_file_paths
+
+
+def move_invalid_files(cif_dir_path, invalid_file_paths) -> None:
+    """
+    Move the invalid file paths given per reason code to a folder per reason
+    code.
+    """
+    for reason, file_paths in invalid_file_paths.items():
+        destination_path = os.path.join(cif_dir_path, reason)
+        os.makedirs(destination_path, exist_ok=True)
+        for file_path in file_paths:
+            shutil.move(
+                file_path, os.path.join(destination_path, os.path.basename(file_path))
+            )
+        print(f"Moved {len(file_paths)} files to '{reason}' before processing")
@@ -0,0 +1,106 @@
+import os
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# From <sys/inotify.h>, a file finished writing or moved into the folder
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_EVENT_HEADER = struct.Struct("iIII")
+
+
+class FolderWatcher:
+    """
+    Report .cif files arriving in a folder, with inotify on Linux and polling
+    as a fallback. A polled file is reported once its size stops changing.
+    """
+
+    def __init__(self, dir_path: str, poll_interval=1.0, use_inotify=True):
+        self.dir_path = dir_path
+        self.poll_interval = poll_interval
+        self.inotify_fd = _init_inotify(dir_path) if use_inotify else None
+        self._sizes = {}
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self.inotify_fd is not None else "polling"
+
+    def list_files(self) -> list[str]:
+        return sorted(
+            os.path.join(self.dir_path, file_name)
+            for file_name in os.listdir(self.dir_path)
+            if file_name.endswith(".cif")
+        )
+
+    def wait_for_files(self, timeout: float) -> list[str]:
+        """
+        Wait up to timeout seconds and return the paths of new files.
+        """
+        if self.inotify_fd is not None:
+            return self._read_inotify_events(timeout)
+        return self._poll(timeout)
+
+    def _read_inotify_events(self, timeout) -> list[str]:
+        readable, _, _ = select.select([self.inotify_fd], [], [], timeout)
+        if not readable:
+            return []
+
+        file_paths = []
+        buffer = os.read(self.inotify_fd, 64 * 1024)
+        offset = 0
+        while offset < len(buffer):
+            _, _, _, name_length = IN_EVENT_HEADER.unpack_from(buffer, offset)
+            offset += IN_EVENT_HEADER.size
+            file_name = buffer[offset : offset + name_length].rstrip(b"\0").decode()
+            offset += name_length
+            if file_name.endswith(".cif"):
+                file_paths.append(os.path.join(self.dir_path, file_name))
+        return file_paths
+
+    def _poll(self, timeout) -> list[str]:
+        file_paths = []
+        sizes = {}
+        for file_path in self.list_files():
+            try:
+                sizes[file_path] = os.path.getsize(file_path)
+            except FileNotFoundError:
+                continue
+            # Report once the size is the same as the previous poll
+            if self._sizes.get(file_path) == sizes[file_path]:
+                file_paths.append(file_path)
+
+        self._sizes = sizes
+        if not file_paths:
+            select.select([], [], [], min(timeout, self.poll_interval))
+        return file_paths
+
+    def close(self):
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+
+def _init_inotify(dir_path: str):
+    """
+    Return an inotify file descriptor watching the folder, or None if inotify
+    is not available on this platform.
+    """
+    library_path = ctypes.util.find_library("c")
+    if not library_path:
+        return None
+    try:
+        libc = ctypes.CDLL(library_path, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+
+    watch_descriptor = libc.inotify_add_watch(
+        fd, os.fsencode(dir_path), IN_CLOSE_WRITE | IN_MOVED_TO
+    )
+    if watch_descriptor < 0:
+        os.close(fd)
+        return None
+    return fd
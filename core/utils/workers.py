@@ -0,0 +1,278 @@
+"""
+Automatic worker count for the pools, from the CPU cores and the memory
+available to the process and an estimate of the memory used per file.
+"""
+
+import os
+import queue
+import multiprocessing as mp
+from core.utils import neighbor
+
+# Cores left for the main process and the rest of the system
+RESERVED_CPU_COUNT = 2
+
+# Share of the available memory the workers may use
+MEMORY_FRACTION = 0.8
+
+# Memory of an idle worker, after the modules shared with the main process
+WORKER_BASE_MB = 100
+
+# Peak memory of the connections computed by cifkit, per pair of unit cell
+# point and supercell point, measured with tracemalloc on the test files
+BYTES_PER_CONNECTION = 320
+
+# Seconds between checks that the pool workers are alive while waiting for
+# a result
+WORKER_POLL_INTERVAL_S = 1
+
+
+def get_available_cpu_count() -> int:
+    """
+    Return the number of CPU cores the process may run on, limited by the
+    CPU affinity and the CPU quota of the cgroup (v1 or v2).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpu_count = len(os.sched_getaffinity(0))
+    else:
+        cpu_count = mp.cpu_count()
+
+    quota = read_cgroup_cpu_quota()
+    if quota is not None:
+        cpu_count = min(cpu_count, max(int(quota), 1))
+    return cpu_count
+
+
+def read_cgroup_cpu_quota() -> float | None:
+    """
+    Return the CPU quota of the cgroup in cores, or None without a limit.
+    """
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota == "max":
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota <= 0:
+            return None
+        return quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def get_available_memory_mb() -> float | None:
+    """
+    Return the memory available to the process, the lower of the available
+    system memory and the room left under the cgroup limit, or None if it
+    cannot be read on this platform.
+    """
+    available_mb = None
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available_mb = int(line.split()[1]) / 1024
+                    break
+    except (OSError, ValueError):
+        try:
+            available_mb = (
+                os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024**2
+            )
+        except (AttributeError, OSError, ValueError):
+            pass
+
+    for limit_path, usage_path in [
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),
+        (
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes",
+            "/sys/fs/cgroup/memory/memory.usage_in_bytes",
+        ),
+    ]:
+        try:
+            with open(limit_path) as f:
+                limit = f.read().strip()
+            with open(usage_path) as f:
+                usage = int(f.read())
+        except (OSError, ValueError):
+            continue
+        # Without a limit, cgroup v1 reports a number close to 2**63
+        if limit != "max" and int(limit) < 2**60:
+            cgroup_available_mb = (int(limit) - usage) / 1024**2
+            if available_mb is None or cgroup_available_mb < available_mb:
+                available_mb = cgroup_available_mb
+        break
+    return available_mb
+
+
+def estimate_file_memory_mb(cif, max_memory_mb: float = None) -> float:
+    """
+    Return the memory estimated to compute the connections of a file, from
+    the number of unit cell and supercell points. With max_memory_mb, the
+    distances are computed in chunks within that ceiling.
+    """
+    pair_count = len(cif.unitcell_points) * len(cif.supercell_points)
+    memory_mb = pair_count * BYTES_PER_CONNECTION / 1024**2
+    if max_memory_mb is not None:
+        memory_mb = min(memory_mb, max_memory_mb)
+    return WORKER_BASE_MB + memory_mb
+
+
+def batch_small_tasks(tasks, cifs, max_memory_mb: float = None):
+    """
+    Return the tasks with the files small enough to be computed together
+    grouped into {"batch": [task, ...]} tasks (see
+    core.utils.neighbor.split_batches), and the memory estimate of each task.
+    Larger files keep a task of their own.
+    """
+    point_counts = [
+        (len(cif.unitcell_points), len(cif.supercell_points)) for cif in cifs
+    ]
+    batches, single_indexes = neighbor.split_batches(
+        point_counts, max_memory_mb or neighbor.DEFAULT_MAX_MEMORY_MB
+    )
+
+    batched_tasks = [tasks[i] for i in single_indexes]
+    task_memory_mbs = [
+        estimate_file_memory_mb(cifs[i], max_memory_mb) for i in single_indexes
+    ]
+    for batch in batches:
+        batched_tasks.append({"batch": [tasks[i] for i in batch]})
+        padded_pair_count = (
+            len(batch)
+            * max(point_counts[i][0] for i in batch)
+            * max(point_counts[i][1] for i in batch)
+        )
+        task_memory_mbs.append(
+            WORKER_BASE_MB
+            + padded_pair_count * neighbor.BATCH_BYTES_PER_PAIR / 1024**2
+        )
+    return batched_tasks, task_memory_mbs
+
+
+def get_auto_worker_count(task_memory_mbs=(), task_count: int = None) -> int:
+    """
+    Return the number of workers that fit within the available cores and
+    memory, with the largest task estimate running in every worker.
+    """
+    worker_count = max(get_available_cpu_count() - RESERVED_CPU_COUNT, 1)
+    if task_count is not None:
+        worker_count = min(worker_count, max(task_count, 1))
+
+    available_mb = get_available_memory_mb()
+    if available_mb is not None:
+        peak_mb = max(task_memory_mbs, default=WORKER_BASE_MB)
+        memory_worker_count = int(available_mb * MEMORY_FRACTION // peak_mb)
+        worker_count = min(worker_count, max(memory_worker_count, 1))
+    return worker_count
+
+
+def resolve_worker_count(num_cpu, task_memory_mbs=(), task_count: int = None) -> int:
+    """
+    Return num_cpu, or the automatic worker count if num_cpu is None.
+    """
+    if num_cpu is None:
+        num_cpu = get_auto_worker_count(task_memory_mbs, task_count)
+        print(f"Using {num_cpu} worker(s), chosen from the available cores and memory")
+    return num_cpu
+
+
+def imap_unordered_within_memory(pool, func, tasks, task_memory_mbs, worker_count):
+    """
+    Yield the results of func over the tasks as they finish, like
+    pool.imap_unordered, but only submit a task while the available memory
+    fits its estimate. If memory runs low during the run, fewer tasks are
+    run at once, down to one, until memory is freed.
+
+    If a task raises, the tasks still running are waited for before the
+    error is raised, so a pool kept by the session is left idle. If a worker
+    is killed, e.g. by the OOM killer, its task never finishes, so the pool
+    is terminated and RuntimeError is raised.
+    """
+    finished = queue.Queue()
+    pending = list(zip(tasks, task_memory_mbs))[::-1]
+    in_flight_count = 0
+    in_flight_limit = worker_count
+    worker_processes = {}
+
+    try:
+        while pending or in_flight_count:
+            while pending and in_flight_count < in_flight_limit:
+                task, _ = pending.pop()
+                pool.apply_async(
+                    func,
+                    (task,),
+                    callback=lambda result: finished.put((result, None)),
+                    error_callback=lambda error: finished.put((None, error)),
+                )
+                in_flight_count += 1
+
+            try:
+                result, error = get_finished(finished, pool, worker_processes)
+            except RuntimeError:
+                # The pool was terminated with the tasks still running
+                in_flight_count = 0
+                raise
+            in_flight_count -= 1
+            if error is not None:
+                raise error
+            yield result
+
+            if pending:
+                limit = get_in_flight_limit(
+                    in_flight_count, pending[-1][1], worker_count
+                )
+                if limit < in_flight_limit:
+                    print(f"Memory is low, running {limit} task(s) at once")
+                in_flight_limit = limit
+    finally:
+        # Tasks left running when a task raised or the caller stopped early
+        while in_flight_count:
+            get_finished(finished, pool, worker_processes)
+            in_flight_count -= 1
+
+
+def get_finished(finished, pool, worker_processes):
+    """
+    Return the next (result, error) put in the finished queue, checking
+    every WORKER_POLL_INTERVAL_S that no worker of the pool was lost.
+    """
+    while True:
+        # The pool replaces a lost worker, so every worker seen is kept
+        for process in pool._pool:
+            worker_processes.setdefault(process.pid, process)
+        try:
+            return finished.get(timeout=WORKER_POLL_INTERVAL_S)
+        except queue.Empty:
+            pass
+        lost_exitcodes = [
+            process.exitcode
+            for process in worker_processes.values()
+            if process.exitcode not in (None, 0)
+        ]
+        if lost_exitcodes:
+            pool.terminate()
+            raise RuntimeError(
+                f"A worker exited with code {lost_exitcodes[0]} while running"
+                f" a task, e.g. killed for running out of memory. Run again"
+                f" with fewer workers or a lower memory ceiling per file"
+            )
+
+
+def get_in_flight_limit(in_flight_count, next_task_memory_mb, worker_count) -> int:
+    """
+    Return the number of tasks that may run at once, with the next task
+    submitted only if the available memory, which already accounts for the
+    running tasks, fits its estimate.
+    """
+    available_mb = get_available_memory_mb()
+    if available_mb is None:
+        return worker_count
+    extra_count = int(available_mb * MEMORY_FRACTION // next_task_memory_mb)
+    return max(min(worker_count, in_flight_count + extra_count), 1)
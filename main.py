@@ -1,4 +1,5 @@
 import os
+import sys
 
 from core.options import (
     min_distance,
@@ -10,13 +11,37 @@ from core.options import (
     composition,
     coordination,
     element,
+    refilter,
+    query,
+    watch,
+    serve,
+    classify,
+    compare,
 )
-from core.utils import folder
+from core.utils import folder, session
 
 
 def main():
     script_dir_path = os.path.dirname(os.path.abspath(__file__))
 
+    # Keep the pool, parsed files and results alive across several options
+    if "--session" in sys.argv[1:]:
+        with session.start_session():
+            cif_dir_path = None
+            while True:
+                cif_dir_path = run_option(script_dir_path, cif_dir_path)
+                answer = input("\nRun another option? (Y/n): ").strip().lower()
+                if answer not in ("", "y", "yes"):
+                    break
+        return
+
+    run_option(script_dir_path)
+
+
+def run_option(script_dir_path, last_cif_dir_path=None):
+    """
+    Run one option chosen from the menu and return the folder it ran on.
+    """
     print("\nWelcome! Please choose an option to proceed:")
     options = {
         "1": "Move files based on unsupported format after pre-formatting",
@@ -28,25 +53,44 @@ def main():
         "7": "Move files based on coordination number",
         "8": "Copy files based on atomic occupancy and mixing",
         "9": "Get file info in the folder",
+        "10": "Re-filter files based on saved distance or supercell results",
+        "11": "Move files based on a filter expression combining options",
+        "12": "Watch the folder and classify files as they arrive",
+        "13": "Start a local service returning info, distance and CN as JSON",
+        "14": "Move files based on composition type, tags and mixing at once",
+        "15": "Compare files with another folder",
     }
 
     for key, value in options.items():
         print(f"[{key}] {value}")
 
-    choice = input("Enter your choice (1-9): ")
+    choice = input("Enter your choice (1-15): ")
 
     if choice in options:
         print(f"You have chosen: {options[choice]}\n")
     else:
         print("Invalid choice!")
-        return
-
-    # Choose the folder
-    cif_dir_path = folder.choose_dir(script_dir_path)
+        return last_cif_dir_path
+
+    # 13. Serve requests for any folder, no folder to choose
+    if choice == "13":
+        serve.start_service()
+        return last_cif_dir_path
+
+    # Choose the folder, the previous one can be kept in a session
+    cif_dir_path = None
+    if last_cif_dir_path and os.path.isdir(last_cif_dir_path):
+        answer = input(
+            f"Use the same folder ({os.path.basename(last_cif_dir_path)})? (Y/n): "
+        )
+        if answer.strip().lower() in ("", "y", "yes"):
+            cif_dir_path = last_cif_dir_path
+    if not cif_dir_path:
+        cif_dir_path = folder.choose_dir(script_dir_path)
 
     if not cif_dir_path:
         print("No directory chosen. Exiting.")
-        return
+        return last_cif_dir_path
 
     # 1. Relocate CIF format with error
     if choice == "1":
@@ -84,6 +128,33 @@ def main():
     elif choice == "9":
         info.get_cif_folder_info(cif_dir_path)
 
+    # 10. Relocate CIF based on saved min distance or supercell atom count
+    elif choice == "10":
+        refilter.refilter_files(cif_dir_path)
+
+    # 11. Relocate CIF based on a filter expression
+    elif choice == "11":
+        query.move_files_based_on_query(cif_dir_path)
+
+    # 12. Relocate CIF as they arrive in the folder
+    elif choice == "12":
+        watch.watch_folder(cif_dir_path)
+
+    # 14. Relocate CIF by composition type, tag and mixing in one pass
+    elif choice == "14":
+        classify.move_files_based_on_dimensions(cif_dir_path)
+
+    # 15. Compare CIF with the files of another folder
+    elif choice == "15":
+        print("\nChoose the other folder to compare with.")
+        other_dir_path = folder.choose_dir(script_dir_path)
+        if not other_dir_path:
+            print("No directory chosen. Exiting.")
+            return cif_dir_path
+        compare.compare_folders(cif_dir_path, other_dir_path)
+
+    return cif_dir_path
+
 
 if __name__ == "__main__":
     main()
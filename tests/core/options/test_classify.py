@@ -0,0 +1,41 @@
+import pytest
+import shutil
+from core.options.classify import move_files_based_on_dimensions
+from cifkit.utils.folder import get_file_count
+
+
+@pytest.fixture
+def tmp_dir_path(tmpdir):
+    source_dir = "tests/data/occupancy"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("occupancy"))
+    return tmp_dir_path
+
+
+@pytest.mark.fast
+def test_move_files_based_on_dimensions_nested(tmp_dir_path):
+    move_files_based_on_dimensions(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        dimensions=["composition", "tag", "mixing"],
+    )
+
+    binary_path = tmp_dir_path.join("occupancy_binary")
+    assert get_file_count(binary_path.join("rt", "full_occupancy")) == 1
+    assert get_file_count(binary_path.join("rt", "full_occupancy_atomic_mixing")) == 2
+    assert get_file_count(binary_path.join("ht", "deficiency_atomic_mixing")) == 2
+    assert get_file_count(binary_path.join("no_tag", "full_occupancy")) == 1
+    assert get_file_count(tmp_dir_path) == 0
+
+
+@pytest.mark.fast
+def test_move_files_based_on_dimensions_combined(tmp_dir_path):
+    move_files_based_on_dimensions(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        dimensions=["tag", "composition"],
+        nested=False,
+    )
+
+    assert get_file_count(tmp_dir_path.join("occupancy_rt_binary")) == 3
+    assert get_file_count(tmp_dir_path.join("occupancy_ht_binary")) == 3
+    assert get_file_count(tmp_dir_path.join("occupancy_no_tag_binary")) == 2
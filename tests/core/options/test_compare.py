@@ -0,0 +1,96 @@
+import os
+import math
+import pandas as pd
+import pytest
+import shutil
+from cifkit import Cif
+from core.options.compare import compare_folders, get_entry
+
+
+@pytest.fixture
+def tmp_dir_paths(tmpdir):
+    source_dir = "tests/data/info"
+    dir_path = shutil.copytree(source_dir, tmpdir.join("info"))
+    other_dir_path = shutil.copytree(source_dir, tmpdir.join("other"))
+
+    # Near match: cell lengths within 1% of 7.6223 Å
+    other_file_path = os.path.join(other_dir_path, "250134.cif")
+    with open(other_file_path) as f:
+        content = f.read()
+    with open(other_file_path, "w") as f:
+        f.write(content.replace("7.6223", "7.6400"))
+
+    # Only in the first folder
+    os.remove(os.path.join(other_dir_path, "250164.cif"))
+    return dir_path, other_dir_path
+
+
+@pytest.mark.fast
+def test_compare_folders(tmp_dir_paths):
+    dir_path, other_dir_path = tmp_dir_paths
+    compare_folders(dir_path, other_dir_path, is_interactive_mode=False, num_cpu=1)
+
+    csv_file_path = os.path.join(dir_path, "csv", "info_compare_other.csv")
+    csv_data = pd.read_csv(csv_file_path)
+    matches = dict(zip(csv_data["Filename"], csv_data["Match"]))
+    assert matches == {
+        "250134.cif": "near",
+        "250143.cif": "exact",
+        "250164.cif": "only in folder",
+    }
+
+    # No file is moved
+    assert len(os.listdir(other_dir_path)) == 2
+
+
+@pytest.mark.fast
+def test_compare_folders_tolerance(tmp_dir_paths):
+    dir_path, other_dir_path = tmp_dir_paths
+    compare_folders(
+        dir_path,
+        other_dir_path,
+        is_interactive_mode=False,
+        tolerance=0.001,
+        num_cpu=1,
+    )
+
+    csv_file_path = os.path.join(dir_path, "csv", "info_compare_other.csv")
+    csv_data = pd.read_csv(csv_file_path)
+    assert set(csv_data["Match"]) == {
+        "exact",
+        "only in folder",
+        "only in other folder",
+    }
+    assert list(
+        csv_data.loc[csv_data["Match"] == "only in other folder", "Other filename"]
+    ) == ["250134.cif"]
+
+
+@pytest.mark.fast
+@pytest.mark.parametrize("tolerance", [0, -0.01])
+def test_compare_folders_invalid_tolerance(tmp_dir_paths, tolerance):
+    dir_path, other_dir_path = tmp_dir_paths
+    with pytest.raises(ValueError, match="greater than 0"):
+        compare_folders(
+            dir_path,
+            other_dir_path,
+            is_interactive_mode=False,
+            tolerance=tolerance,
+            num_cpu=1,
+        )
+
+
+@pytest.mark.fast
+def test_get_entry(tmp_dir_paths):
+    dir_path, _ = tmp_dir_paths
+    file_path = os.path.join(dir_path, "250143.cif")
+    cif = Cif(file_path, is_formatted=True)
+
+    # The same fields as the Cif object, read without building the supercell
+    entry = get_entry(file_path)
+    assert entry["file_name"] == "250143.cif"
+    assert entry["structure"] == cif.structure
+    assert entry["lengths"] == tuple(cif.unitcell_lengths)
+    assert entry["angles"] == pytest.approx(
+        [math.degrees(angle) for angle in cif.unitcell_angles]
+    )
@@ -72,3 +72,94 @@ def test_move_files_based_on_one_number_containing(tmp_dir_path):
     dest_path = tmp_dir_path.join("coordination_CN_exact_12")
     assert get_file_count(dest_path) == 7
     assert get_file_count(tmp_dir_path) == 3
+
+
+@pytest.mark.slow
+def test_move_files_based_on_coordination_number_bounded_memory(tmp_dir_path):
+    """
+    Test the CN computed in chunks within a memory ceiling
+    """
+    move_files_based_on_coordination_number(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        numbers=[12],
+        option=2,
+        max_memory_mb=0.05,
+    )
+
+    dest_path = tmp_dir_path.join("coordination_CN_contain_12")
+    assert get_file_count(dest_path) == 8
+    assert get_file_count(tmp_dir_path) == 2
+
+
+@pytest.mark.slow
+def test_move_files_based_on_coordination_number_resume(tmp_dir_path):
+    """
+    Test resume from the checkpoint of an interrupted run
+    """
+    # 1200981.cif has CN 9, 11, 16 but the checkpoint is used instead
+    checkpoint_dir_path = tmp_dir_path.mkdir("checkpoint")
+    checkpoint_dir_path.join("CN.jsonl").write(
+        '{"file_name": "1200981.cif", "CN_values": [12]}\n'
+        '{"file_name": "529848.cif", "CN_val'
+    )
+
+    move_files_based_on_coordination_number(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        numbers=[12],
+        option=1,
+    )
+
+    dest_path = tmp_dir_path.join("coordination_CN_exact_12")
+    assert get_file_count(dest_path) == 8
+    assert dest_path.join("1200981.cif").exists()
+
+    # The checkpoint is removed once the run is complete
+    assert not checkpoint_dir_path.exists()
+
+
+@pytest.mark.fast
+def test_move_files_based_on_coordination_number_resume_settings(tmp_dir_path):
+    """
+    Test the checkpoint of a run with other settings is not resumed
+    """
+    checkpoint_dir_path = tmp_dir_path.mkdir("checkpoint")
+    checkpoint_dir_path.join("CN.jsonl").write(
+        '{"file_name": "1200981.cif", "CN_values": [12]}\n'
+    )
+
+    move_files_based_on_coordination_number(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        numbers=[12],
+        option=1,
+        skip_translated_points=True,
+    )
+
+    dest_path = tmp_dir_path.join("coordination_CN_exact_12")
+    assert not dest_path.join("1200981.cif").exists()
+    assert checkpoint_dir_path.join("CN.jsonl").exists()
+
+
+@pytest.mark.slow
+def test_move_files_based_on_coordination_number_prototype(tmpdir, capsys):
+    """
+    Test the CN values reused across files with the same prototype
+    """
+    source_dir = "tests/data/supercell"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("supercell"))
+
+    move_files_based_on_coordination_number(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        numbers=[18],
+        option=2,
+        skip_translated_points=True,
+        prototype_tolerance=0.01,
+    )
+
+    # 7 Y0.5Co3Ge3 files with CN 2, 16, 18 share the same prototype key
+    dest_path = tmp_dir_path.join("supercell_CN_contain_18")
+    assert get_file_count(dest_path) == 7
+    assert "Reused CN values for 6 files" in capsys.readouterr().out
@@ -2,7 +2,8 @@ import pandas as pd
 import pytest
 import shutil
 from os.path import exists
-from core.options.info import get_cif_folder_info
+from core.options import info
+from core.options.info import INFO_COLUMNS, get_cif_folder_info, parse_info_columns
 from cifkit.utils.folder import get_file_count
 
 
@@ -37,3 +38,58 @@ def test_cif_folder_info_with_dist(tmp_dir_path):
     assert len(csv_data.index) == 3
     expected_filenames = {250134, 250143, 250164}
     assert set(csv_data["Filename"]) == expected_filenames
+
+
+@pytest.mark.fast
+def test_cif_folder_info_columns(tmp_dir_path):
+    get_cif_folder_info(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        columns=["Filename", "Formula", "Min distance (Å)"],
+    )
+
+    # Only the chosen columns are computed
+    csv_data = pd.read_csv(tmp_dir_path.join("csv", "info_info_with_dist.csv"))
+    assert list(csv_data.columns) == [
+        "Filename",
+        "Formula",
+        "Min distance (Å)",
+        "Processing time (s)",
+    ]
+    assert csv_data["Min distance (Å)"].notna().all()
+
+
+@pytest.mark.fast
+def test_cif_folder_info_parquet(tmp_dir_path):
+    pytest.importorskip("pyarrow")
+    get_cif_folder_info(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        columns=["Filename", "Supercell atom count"],
+        output_format="parquet",
+    )
+
+    parquet_data = pd.read_parquet(
+        tmp_dir_path.join("parquet", "info_info.parquet"),
+        columns=["Filename", "Supercell atom count"],
+    )
+    assert set(parquet_data["Filename"]) == {"250134", "250143", "250164"}
+
+
+@pytest.mark.fast
+def test_parse_info_columns():
+    column_names = list(INFO_COLUMNS)
+    assert parse_info_columns("2 1 2", column_names) == column_names[1::-1]
+    assert parse_info_columns(" ", column_names) is None
+    for choice in ("0", str(len(column_names) + 1), "x", "1,2", "-1"):
+        with pytest.raises(ValueError):
+            parse_info_columns(choice, column_names)
+
+
+@pytest.mark.fast
+def test_prompt_info_columns(monkeypatch, capsys):
+    # Invalid choices are asked again
+    choices = iter(["99", "1 x", "1"])
+    monkeypatch.setattr(info.click, "prompt", lambda *args, **kwargs: next(choices))
+    assert info.prompt_info_columns() == [list(INFO_COLUMNS)[0]]
+    assert capsys.readouterr().out.count("Invalid columns") == 2
@@ -1,6 +1,9 @@
+import pandas as pd
 import pytest
 import shutil
+from os.path import exists
 from core.options.min_distance import filter_files_by_min_dist
+from core.utils import checkpoint
 from cifkit.utils.folder import get_file_count
 
 
@@ -18,8 +21,8 @@ def test_filter_files_by_min_dist(tmpdir):
     ("tests/data/min_dist/382886.cif", 2.592),
     """
 
-    # Initial file count (For non-interactive default is 2.6 A)
-    min_dist_below_path = tmp_dir_path.join("min_dist_below_2.6")
+    # Initial file count (For non-interactive default is 2.6 to 12.0 A)
+    min_dist_below_path = tmp_dir_path.join("dist_between_2.6_12.0")
     assert get_file_count(tmp_dir_path) == 5
     filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False)
 
@@ -28,3 +31,113 @@ def test_filter_files_by_min_dist(tmpdir):
 
     # 3 files should remain in the original directory
     assert get_file_count(tmp_dir_path) == 3
+
+
+@pytest.mark.slow
+def test_filter_files_by_normalized_pair_dist(tmpdir):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("dist"))
+
+    filter_files_by_min_dist(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        pairs=["Sn-Ni"],
+        normalized_dist_threshold=0.95,
+    )
+
+    # Pair table is saved from the same pass, 3 element pairs per file
+    csv_data = pd.read_csv(tmp_dir_path.join("csv", "dist_min_dist_per_pair.csv"))
+    assert len(csv_data.index) == 15
+    assert exists(tmp_dir_path.join("plot", "histogram-min-dist-Ni-Sn.png"))
+
+    # Ni-Sn in 311764.cif is 2.613 Å, below 0.95 of the CIF radius sum 2.757 Å
+    normalized_path = tmp_dir_path.join("normalized_dist_below_0.95")
+    assert get_file_count(normalized_path) == 1
+    assert exists(normalized_path.join("311764.cif"))
+
+
+@pytest.mark.slow
+def test_filter_files_by_min_dist_bounded_memory(tmpdir):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("dist"))
+
+    # A small ceiling splits each supercell into many chunks
+    filter_files_by_min_dist(
+        tmp_dir_path, is_interactive_mode=False, max_memory_mb=0.05
+    )
+
+    # Same files are moved as with the distances computed by cifkit
+    min_dist_below_path = tmp_dir_path.join("dist_between_2.6_12.0")
+    assert get_file_count(min_dist_below_path) == 2
+    assert exists(min_dist_below_path.join("382882.cif"))
+    assert exists(min_dist_below_path.join("382886.cif"))
+
+    csv_data = pd.read_csv(tmp_dir_path.join("plot", "min-dist.csv"))
+    min_dists = dict(zip(csv_data["Filename"], csv_data["Min distance (Å)"]))
+    assert min_dists["311764.cif"] == 2.613
+
+
+@pytest.mark.slow
+def test_filter_files_by_min_dist_invalid_file(tmpdir):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("dist"))
+    shutil.copy("tests/data/format/missing_loop.cif", tmp_dir_path)
+
+    filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False)
+
+    # The file with a missing loop value is moved before the ensemble is built
+    invalid_path = tmp_dir_path.join("error_wrong_loop_value")
+    assert get_file_count(invalid_path) == 1
+    assert exists(invalid_path.join("missing_loop.cif"))
+    assert get_file_count(tmp_dir_path.join("dist_between_2.6_12.0")) == 2
+
+
+@pytest.mark.slow
+def test_filter_files_by_min_dist_metrics(tmpdir, monkeypatch):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("dist"))
+    monkeypatch.setenv("CIF_CLEANER_METRICS_DIR", str(tmpdir.join("metrics")))
+
+    filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False)
+
+    with open(tmpdir.join("metrics", "cif_cleaner_min_dist.prom")) as f:
+        lines = f.read().splitlines()
+    assert 'cif_cleaner_files_processed_total{option="min_dist"} 5' in lines
+    assert 'cif_cleaner_errors_total{option="min_dist"} 0' in lines
+    assert 'cif_cleaner_relocations_total{option="min_dist"} 2' in lines
+    assert 'cif_cleaner_file_seconds_count{option="min_dist"} 5' in lines
+    assert 'cif_cleaner_file_seconds_bucket{option="min_dist",le="+Inf"} 5' in lines
+
+
+@pytest.mark.slow
+def test_filter_files_by_min_dist_interrupted(tmpdir, monkeypatch):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("dist"))
+
+    # Interrupt the run after 2 files are finished
+    append_checkpoint = checkpoint.append_checkpoint
+    finished_records = []
+
+    def append_checkpoint_until_interrupted(checkpoint_file, record):
+        if len(finished_records) == 2:
+            raise KeyboardInterrupt
+        finished_records.append(record)
+        append_checkpoint(checkpoint_file, record)
+
+    monkeypatch.setattr(
+        checkpoint, "append_checkpoint", append_checkpoint_until_interrupted
+    )
+    with pytest.raises(KeyboardInterrupt):
+        filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False, num_cpu=1)
+
+    # The files finished before the interruption are already relocated
+    min_dist_below_path = tmp_dir_path.join("dist_between_2.6_12.0")
+    for record in finished_records:
+        is_moved = not 2.6 < record["min_dist"] < 12.0
+        assert exists(min_dist_below_path.join(record["file_name"])) == is_moved
+
+    # Resuming moves the rest and keeps every file in the table
+    monkeypatch.undo()
+    filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False, num_cpu=1)
+    assert get_file_count(min_dist_below_path) == 2
+    assert len(pd.read_csv(tmp_dir_path.join("plot", "min-dist.csv")).index) == 5
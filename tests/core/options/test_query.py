@@ -0,0 +1,57 @@
+import pytest
+import shutil
+from core.options.query import move_files_based_on_query, parse_expression
+from cifkit.utils.folder import get_file_count
+
+
+@pytest.fixture
+def tmp_dir_path(tmpdir):
+    source_dir = "tests/data/coordination"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("coordination"))
+    return tmp_dir_path
+
+
+@pytest.mark.fast
+def test_parse_expression_orders_by_cost():
+    predicates = parse_expression("CN~12 and min_dist>2.6 and composition=binary")
+    assert predicates == [
+        ("composition", "=", [2]),
+        ("CN", "~", [12]),
+        ("min_dist", ">", [2.6]),
+    ]
+
+    with pytest.raises(ValueError):
+        parse_expression("elements>Er")
+
+
+@pytest.mark.fast
+def test_move_files_based_on_cheap_query(tmp_dir_path):
+    assert get_file_count(tmp_dir_path) == 10
+
+    move_files_based_on_query(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        expression="composition=binary and elements~Ni",
+    )
+
+    dest_path = tmp_dir_path.join("coordination_query")
+    assert get_file_count(dest_path) == 2
+    assert get_file_count(tmp_dir_path) == 8
+
+
+@pytest.mark.slow
+def test_move_files_based_on_expensive_query(tmp_dir_path):
+    """
+    Only the 2 binary files with Ni are scheduled for the CN computation,
+    529848.cif has CN 12 while 1200981.cif has CN 9, 11 and 16
+    """
+    move_files_based_on_query(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        expression="composition=binary and elements~Ni and CN~12 and min_dist>2.4",
+    )
+
+    dest_path = tmp_dir_path.join("coordination_query")
+    assert get_file_count(dest_path) == 1
+    assert dest_path.join("529848.cif").exists()
+    assert get_file_count(tmp_dir_path) == 9
@@ -0,0 +1,115 @@
+import pytest
+import shutil
+import pandas as pd
+from os.path import exists
+from core.options.refilter import refilter_files, parse_bands
+from core.options.supercell_size import SUPERCELL_SIZE_COLUMN
+from cifkit.utils.folder import get_file_count
+
+
+@pytest.fixture
+def tmp_dir_path(tmpdir):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("refilter"))
+
+    # Results saved by option 2 next to the histogram
+    tmp_dir_path.mkdir("plot")
+    pd.DataFrame(
+        [
+            ["311764.cif", 2.613],
+            ["382882.cif", 2.584],
+            ["453919.cif", 2.621],
+            ["453316.cif", 2.625],
+            ["382886.cif", 2.592],
+        ],
+        columns=["Filename", "Min distance (Å)"],
+    ).to_csv(tmp_dir_path.join("plot", "min-dist.csv"), index=False)
+    return tmp_dir_path
+
+
+@pytest.mark.fast
+def test_refilter_files_by_min_dist_bounds(tmp_dir_path):
+    refilter_files(
+        tmp_dir_path, is_interactive_mode=False, table="min_dist", bounds=(2.6, 12.0)
+    )
+
+    # 2 files out of the bounds are moved, as in option 2
+    assert get_file_count(tmp_dir_path.join("dist_between_2.6_12.0")) == 2
+    assert get_file_count(tmp_dir_path) == 3
+
+
+@pytest.mark.fast
+def test_refilter_files_by_min_dist_bands(tmp_dir_path):
+    refilter_files(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        table="min_dist",
+        bands=[(2.5, 2.6), (2.6, 2.62), (2.62, 2.7)],
+    )
+
+    assert get_file_count(tmp_dir_path.join("dist_band_2.5_2.6")) == 2
+    assert get_file_count(tmp_dir_path.join("dist_band_2.6_2.62")) == 1
+    assert get_file_count(tmp_dir_path.join("dist_band_2.62_2.7")) == 2
+    assert get_file_count(tmp_dir_path) == 0
+
+
+@pytest.mark.fast
+def test_refilter_files_by_min_dist_band_edges(tmp_dir_path):
+    refilter_files(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        table="min_dist",
+        bands=[(2.0, 2.613), (2.613, 2.621)],
+    )
+
+    # Bands are half-open, a value on a shared edge goes to the upper band
+    assert get_file_count(tmp_dir_path.join("dist_band_2.0_2.613")) == 2
+    assert get_file_count(tmp_dir_path.join("dist_band_2.613_2.621")) == 1
+    assert exists(tmp_dir_path.join("dist_band_2.613_2.621", "311764.cif"))
+    assert get_file_count(tmp_dir_path) == 2
+
+
+@pytest.mark.fast
+def test_parse_bands():
+    assert parse_bands("2.0-2.4 2.4-2.6") == [(2.0, 2.4), (2.4, 2.6)]
+    assert parse_bands("100-200", int) == [(100, 200)]
+    assert parse_bands("2.4-2.6 2.0-2.4") == [(2.4, 2.6), (2.0, 2.4)]
+    for bands_input in (
+        "2.0",
+        "2.0-x",
+        "2.0-2.4-2.6",
+        "2.6-2.4",
+        "",
+        "2.0-2.5 2.4-2.6",
+        "2.0-2.6 2.2-2.4",
+    ):
+        with pytest.raises(ValueError):
+            parse_bands(bands_input)
+
+
+@pytest.mark.fast
+def test_refilter_files_by_supercell_bands(tmp_dir_path):
+    pd.DataFrame(
+        [["311764.cif", 100], ["382882.cif", 200], ["453919.cif", 300]],
+        columns=["Filename", SUPERCELL_SIZE_COLUMN],
+    ).to_csv(tmp_dir_path.join("plot", "supercell-size.csv"), index=False)
+    refilter_files(
+        tmp_dir_path,
+        is_interactive_mode=False,
+        table="supercell",
+        bands=[(100, 200), (200, 300)],
+    )
+
+    # Half-open as the min distance bands, 300 is in no band
+    assert get_file_count(tmp_dir_path.join("supercell_above_100_below_200")) == 1
+    assert exists(tmp_dir_path.join("supercell_above_200_below_300", "382882.cif"))
+    assert get_file_count(tmp_dir_path.join("supercell_above_200_below_300")) == 1
+    assert exists(tmp_dir_path.join("453919.cif"))
+
+    with pytest.raises(ValueError, match="overlap"):
+        refilter_files(
+            tmp_dir_path,
+            is_interactive_mode=False,
+            table="supercell",
+            bands=[(100, 250), (200, 300)],
+        )
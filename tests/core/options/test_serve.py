@@ -0,0 +1,89 @@
+import json
+import pytest
+import socket
+import threading
+import multiprocessing as mp
+from http.client import HTTPConnection
+from core.options.serve import make_server
+
+
+class UnixHTTPConnection(HTTPConnection):
+    def __init__(self, socket_path):
+        super().__init__("localhost")
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+@pytest.fixture(params=["tcp", "unix"])
+def connection(request, tmpdir):
+    pool = mp.Pool(1)
+    socket_path = str(tmpdir.join("cif.sock")) if request.param == "unix" else None
+    server = make_server(pool, port=0, socket_path=socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    if socket_path:
+        yield UnixHTTPConnection(socket_path)
+    else:
+        yield HTTPConnection("127.0.0.1", server.server_port)
+
+    server.shutdown()
+    server.server_close()
+    pool.close()
+    pool.join()
+
+
+def post(connection, path, body, content_type):
+    connection.request("POST", path, body, {"Content-Type": content_type})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read())
+
+
+@pytest.mark.fast
+def test_service_info_for_folder(connection):
+    status, data = post(
+        connection,
+        "/info",
+        json.dumps({"path": "tests/data/info"}),
+        "application/json",
+    )
+    assert status == 200
+    file_names = {result["file_name"] for result in data["results"]}
+    assert file_names == {"250134.cif", "250143.cif", "250164.cif"}
+
+
+@pytest.mark.slow
+def test_service_min_dist_and_CN_for_cif_bytes(connection):
+    with open("tests/data/min_dist/311764.cif", "rb") as f:
+        content = f.read()
+
+    status, data = post(connection, "/min_dist?name=311764.cif", content, "chemical/x-cif")
+    assert status == 200
+    assert data["results"] == [{"file_name": "311764.cif", "min_dist": 2.613}]
+
+    status, data = post(connection, "/CN", content, "chemical/x-cif")
+    assert status == 200
+    assert data["results"][0]["CN"] == [15, 16]
+
+
+@pytest.mark.fast
+def test_service_unknown_path(connection):
+    status, _ = post(connection, "/unknown", b"", "chemical/x-cif")
+    assert status == 404
+
+
+@pytest.mark.fast
+def test_service_invalid_json_body(connection):
+    for body in ("[]", '"x"', "{}", '{"path": 1}', "{"):
+        status, data = post(connection, "/info", body, "application/json")
+        assert status == 400
+        assert data["error"].startswith("Invalid request")
+
+    # The service still answers after invalid requests
+    status, _ = post(
+        connection, "/info", json.dumps({"path": "tests/data/info"}), "application/json"
+    )
+    assert status == 200
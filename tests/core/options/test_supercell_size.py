@@ -1,3 +1,4 @@
+import pandas as pd
 import pytest
 import shutil
 from core.options.supercell_size import move_files_based_on_supercell_size
@@ -27,3 +28,7 @@ def test_move_files_based_on_supercell_size(tmpdir):
 
     # 3 files should remain in the original directory
     assert get_file_count(tmp_dir_path) == 3
+
+    # Atom counts are saved next to the histogram for re-filtering
+    csv_data = pd.read_csv(tmp_dir_path.join("plot", "supercell-size.csv"))
+    assert len(csv_data.index) == 12
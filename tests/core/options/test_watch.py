@@ -0,0 +1,113 @@
+import os
+import signal
+import pytest
+import shutil
+import threading
+from core.options import watch
+from core.options.watch import watch_folder, watch_worker
+from cifkit.utils.folder import get_file_count
+
+
+@pytest.fixture
+def tmp_dir_path(tmpdir):
+    source_dir = "tests/data/composition"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("composition"))
+    return tmp_dir_path
+
+
+@pytest.mark.fast
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watch_folder_classifies_arriving_files(tmpdir, use_inotify):
+    watch_dir_path = tmpdir.mkdir("watch")
+
+    # 2 files are present at the start, 3 files arrive while watching
+    for file_name in ["301531.cif", "554324.cif"]:
+        shutil.copy(f"tests/data/composition/{file_name}", watch_dir_path)
+
+    def drop_files():
+        for file_name in ["301697.cif", "301710.cif", "529848.cif"]:
+            shutil.copy(f"tests/data/composition/{file_name}", watch_dir_path)
+
+    timer = threading.Timer(0.5, drop_files)
+    timer.start()
+    watch_folder(
+        str(watch_dir_path),
+        is_interactive_mode=False,
+        dimensions=["composition", "tag"],
+        poll_interval=0.2,
+        idle_timeout=2,
+        use_inotify=use_inotify,
+    )
+    timer.join()
+
+    # 2 files are binary, 3 files are ternary, none has a tag
+    assert get_file_count(watch_dir_path.join("watch_binary", "no_tag")) == 2
+    assert get_file_count(watch_dir_path.join("watch_ternary", "no_tag")) == 3
+    assert get_file_count(watch_dir_path) == 0
+
+
+@pytest.mark.fast
+def test_watch_folder_with_expression(tmp_dir_path):
+    watch_folder(
+        str(tmp_dir_path),
+        is_interactive_mode=False,
+        expression="composition=binary",
+        idle_timeout=0.5,
+    )
+
+    assert get_file_count(tmp_dir_path.join("composition_query")) == 2
+    assert get_file_count(tmp_dir_path.join("composition_unmatched")) == 3
+
+
+@pytest.mark.fast
+def test_watch_folder_file_removed(tmp_dir_path, monkeypatch, capsys):
+    move = shutil.move
+
+    # 301531.cif is deleted after it is processed and before it is moved
+    def remove_and_move(source_path, destination_path):
+        if os.path.basename(source_path) == "301531.cif":
+            os.remove(source_path)
+        return move(source_path, destination_path)
+
+    monkeypatch.setattr(watch.shutil, "move", remove_and_move)
+    watch_folder(
+        str(tmp_dir_path),
+        is_interactive_mode=False,
+        dimensions=["composition"],
+        idle_timeout=0.5,
+    )
+
+    # The other files are still classified and the removed file is an error
+    assert get_file_count(tmp_dir_path.join("composition_binary")) == 2
+    assert get_file_count(tmp_dir_path.join("composition_ternary")) == 2
+    output = capsys.readouterr().out
+    assert "301531.cif was removed before it was moved" in output
+    assert "Processed 5 files (1 errors)" in output
+
+
+def kill_worker_of_301531(cif_path, dimensions, predicates):
+    if os.path.basename(cif_path) == "301531.cif":
+        os.kill(os.getpid(), signal.SIGKILL)
+    return watch_worker(cif_path, dimensions, predicates)
+
+
+@pytest.mark.fast
+def test_watch_folder_lost_worker(tmp_dir_path, monkeypatch, capsys):
+    # The worker of 301531.cif is killed and the file never finishes
+    monkeypatch.setattr(watch, "watch_worker", kill_worker_of_301531)
+    watch_folder(
+        str(tmp_dir_path),
+        is_interactive_mode=False,
+        dimensions=["composition"],
+        num_cpu=2,
+        idle_timeout=0.5,
+        task_timeout=2,
+    )
+
+    error_dir_path = tmp_dir_path.join("composition_cifs_encountered_error")
+    assert os.listdir(error_dir_path) == ["301531.cif"]
+    assert get_file_count(tmp_dir_path.join("composition_binary")) == 2
+    assert get_file_count(tmp_dir_path.join("composition_ternary")) == 2
+    output = capsys.readouterr().out
+    assert "301531.cif did not finish within 2 s" in output
+    assert "Processed 5 files (1 errors)" in output
@@ -0,0 +1,45 @@
+import pytest
+import shutil
+from core import api
+from cifkit.utils.folder import get_file_paths, get_file_count
+
+
+@pytest.mark.fast
+def test_iter_results_info_and_classification():
+    file_paths = sorted(get_file_paths("tests/data/composition"))
+    results = list(
+        api.iter_results(iter(file_paths), dimensions=["composition", "tag"])
+    )
+
+    # Results are yielded in order and no file is moved
+    assert [r.file_path for r in results] == file_paths
+    assert get_file_count("tests/data/composition") == 5
+
+    classifications = [tuple(r.classification) for r in results]
+    assert classifications.count(("binary", "no_tag")) == 2
+    assert classifications.count(("ternary", "no_tag")) == 3
+    assert all(r.formula and r.error is None for r in results)
+
+
+@pytest.mark.slow
+def test_iter_results_min_dist_and_CN_in_parallel():
+    file_paths = ["tests/data/min_dist/311764.cif", "tests/data/min_dist/382882.cif"]
+    results = list(api.iter_results(file_paths, fields=("min_dist", "CN"), num_cpu=2))
+
+    assert [r.min_dist for r in results] == [2.613, 2.584]
+    assert results[0].CN_values == {15, 16}
+    assert results[0].formula is None
+
+
+@pytest.mark.fast
+def test_relocate_is_a_separate_step(tmpdir):
+    tmp_dir_path = shutil.copytree("tests/data/composition", tmpdir.join("composition"))
+    results = api.iter_results(get_file_paths(tmp_dir_path), dimensions=["composition"])
+
+    api.relocate(
+        results,
+        lambda r: tmp_dir_path.join("binary") if r.classification == ["binary"] else None,
+    )
+
+    assert get_file_count(tmp_dir_path.join("binary")) == 2
+    assert get_file_count(tmp_dir_path) == 3
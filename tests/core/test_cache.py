@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import shutil
+from cifkit import Cif
+from core.options.min_distance import filter_files_by_min_dist
+from core.utils import cache
+
+
+@pytest.fixture
+def cache_dir_path(tmpdir, monkeypatch):
+    cache_dir_path = str(tmpdir.join("cache"))
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, cache_dir_path)
+    return cache_dir_path
+
+
+@pytest.mark.fast
+def test_load_cif(tmpdir, cache_dir_path):
+    file_path = shutil.copy("tests/data/min_dist/311764.cif", tmpdir)
+
+    # Parsed on the first load, then loaded from the cache
+    cif = cache.load_cif(file_path)
+    assert isinstance(cif, Cif)
+    cached = cache.load_cif(file_path)
+    assert isinstance(cached, cache.CachedStructure)
+    assert cached.unitcell_points == cif.unitcell_points
+    assert cached.supercell_points == cif.supercell_points
+    assert cached.unitcell_lengths == cif.unitcell_lengths
+    assert cached.unitcell_angles == cif.unitcell_angles
+    assert cached.unique_elements == cif.unique_elements
+    assert cached.supercell_atom_count == cif.supercell_atom_count
+
+    # The arrays passed to core.utils.neighbor are views of the cached file
+    unitcell, supercell, labels = cache.get_point_arrays(cached)
+    assert isinstance(cached.points, np.memmap)
+    assert all(np.shares_memory(array, cached.points) for array in unitcell + supercell)
+    assert [labels[int(i)] for i in supercell[1]] == [
+        point[3] for point in cif.supercell_points
+    ]
+
+    # An edited file is parsed again
+    with open(file_path, "a") as f:
+        f.write("\n")
+    assert isinstance(cache.load_cif(file_path), Cif)
+
+
+@pytest.mark.fast
+def test_load_cif_without_cache(tmpdir, monkeypatch):
+    monkeypatch.delenv(cache.CACHE_DIR_ENV, raising=False)
+    file_path = shutil.copy("tests/data/min_dist/311764.cif", tmpdir)
+    assert isinstance(cache.load_cif(file_path), Cif)
+
+
+@pytest.mark.slow
+def test_filter_files_by_min_dist_cached(tmpdir, cache_dir_path):
+    min_dists = []
+    for name in ("dist", "dist_cached"):
+        tmp_dir_path = shutil.copytree("tests/data/min_dist", tmpdir.join(name))
+        filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False)
+        csv_data = pd.read_csv(tmp_dir_path.join("plot", "min-dist.csv"))
+        min_dists.append(dict(zip(csv_data["Filename"], csv_data["Min distance (Å)"])))
+
+    # The second folder has the same files, loaded from the cache
+    assert min_dists[0] == min_dists[1]
+    assert min_dists[0]["311764.cif"] == 2.613
+    cifkit_dir_path = os.path.join(cache_dir_path, os.listdir(cache_dir_path)[0])
+    assert len(os.listdir(cifkit_dir_path)) == 10
@@ -0,0 +1,39 @@
+import pytest
+from core.utils import checkpoint
+
+
+@pytest.mark.fast
+def test_open_checkpoint_after_crash(tmpdir):
+    checkpoint_path = str(tmpdir.join("CN.jsonl"))
+    with open(checkpoint_path, "w") as f:
+        f.write('{"file_name": "1200981.cif", "CN_values": [12]}\n')
+        f.write('{"file_name": "529848.cif", "CN_val')
+
+    # The line cut short by the crash is removed before appending
+    with checkpoint.open_checkpoint(checkpoint_path) as checkpoint_file:
+        checkpoint.append_checkpoint(
+            checkpoint_file, {"file_name": "529848.cif", "CN_values": [14]}
+        )
+
+    records = checkpoint.load_checkpoint(checkpoint_path)
+    assert records["1200981.cif"]["CN_values"] == [12]
+    assert records["529848.cif"]["CN_values"] == [14]
+
+
+@pytest.mark.fast
+def test_truncate_partial_line(tmpdir):
+    checkpoint_path = tmpdir.join("CN.jsonl")
+
+    # Only a partial line, longer than a block
+    checkpoint_path.write("x" * 10)
+    checkpoint.truncate_partial_line(str(checkpoint_path), block_size=4)
+    assert checkpoint_path.read() == ""
+
+    # Complete lines are kept
+    checkpoint_path.write("a\nbb\n")
+    checkpoint.truncate_partial_line(str(checkpoint_path), block_size=4)
+    assert checkpoint_path.read() == "a\nbb\n"
+
+    checkpoint_path.write("a\nbb\nccccccc")
+    checkpoint.truncate_partial_line(str(checkpoint_path), block_size=4)
+    assert checkpoint_path.read() == "a\nbb\n"
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from os.path import exists
+from core.utils import histogram
+
+
+@pytest.mark.fast
+def test_save_histogram_bins(tmpdir, monkeypatch):
+    monkeypatch.setenv(histogram.PLOT_FORMAT_ENV, "svg")
+    data = [2.5, 2.6, 2.6, 3.1, 3.9]
+    file_path = histogram.get_histogram_path(str(tmpdir), "histogram-min-dist")
+    histogram.save_histogram(data, 5, "Title", "Distance (Å)", "Count", file_path)
+
+    assert file_path.endswith(".svg")
+    assert exists(file_path)
+
+    # The saved bins are the NumPy histogram, enough to redraw the plot
+    counts, edges = histogram.load_histogram_bins(file_path)
+    expected_counts, expected_edges = np.histogram(data, 5)
+    assert counts.tolist() == expected_counts.tolist()
+    assert np.allclose(edges, expected_edges)
+
+    redrawn_path = str(tmpdir.join("redrawn.png"))
+    histogram.save_binned_histogram(
+        counts, edges, "Title", "Distance (Å)", "Count", redrawn_path
+    )
+    assert exists(redrawn_path)
+
+
+@pytest.mark.fast
+def test_get_plot_format_invalid(monkeypatch):
+    monkeypatch.setenv(histogram.PLOT_FORMAT_ENV, "jpg")
+    with pytest.raises(ValueError):
+        histogram.get_plot_format()
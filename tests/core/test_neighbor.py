@@ -0,0 +1,108 @@
+import glob
+import pytest
+import shutil
+from cifkit import Cif
+from core.options import coordination, min_distance
+from core.utils import cache, neighbor
+
+
+@pytest.fixture
+def cifs(tmpdir):
+    tmp_dir_path = shutil.copytree("tests/data/coordination", tmpdir.join("CN"))
+    return [
+        Cif(file_path, is_formatted=True)
+        for file_path in sorted(glob.glob(str(tmp_dir_path.join("*.cif"))))
+    ]
+
+
+def get_structure(cif):
+    return (
+        *cache.get_point_arrays(cif),
+        cif.unitcell_lengths,
+        cif.unitcell_angles,
+    )
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("skip_translated_points", [False, True])
+def test_compute_batch_site_neighbors(cifs, skip_translated_points):
+    batch_results = neighbor.compute_batch_site_neighbors(
+        [get_structure(cif) for cif in cifs], skip_translated_points
+    )
+
+    # Same neighbours and pair distances as one file at a time
+    for cif, batch_result in zip(cifs, batch_results):
+        assert batch_result == neighbor.compute_site_neighbors(
+            *get_structure(cif), skip_translated_points=skip_translated_points
+        )
+
+    # Same min distance and CN values as cifkit
+    if not skip_translated_points:
+        for cif, (site_neighbors, _) in zip(cifs, batch_results):
+            assert neighbor.get_shortest_distance(site_neighbors) == (
+                cif.shortest_distance
+            )
+            assert neighbor.get_CN_unique_values_by_min_dist_method(
+                site_neighbors
+            ) == cif.CN_unique_values_by_min_dist_method
+
+
+@pytest.mark.fast
+def test_split_batches():
+    point_counts = [(36, 364), (2, 54), (400, 5000), (9, 91), (36, 364)]
+    batches, single_indexes = neighbor.split_batches(point_counts)
+
+    # Sorted by size, the large structure is computed alone
+    assert batches == [[1, 3, 0, 4]]
+    assert single_indexes == [2]
+
+    # Within 2 MB, the larger cells are each a batch of one, computed alone
+    batches, single_indexes = neighbor.split_batches(point_counts, 2)
+    assert batches == [[1, 3]]
+    assert single_indexes == [0, 2, 4]
+
+
+@pytest.mark.slow
+def test_batch_and_single_workers(tmpdir, capsys):
+    tmp_dir_path = shutil.copytree("tests/data/min_dist", tmpdir.join("dist"))
+    tasks = [
+        {"idx": idx, "cif_path": file_path, "file_count": 5}
+        for idx, file_path in enumerate(
+            sorted(glob.glob(str(tmp_dir_path.join("*.cif")))), start=1
+        )
+    ]
+
+    # Same min distance, per-pair min distances and CN values whether a file
+    # is computed in a batch of small files or on its own
+    for mp_aux in (min_distance.mp_aux, coordination.mp_aux):
+        batch_results = [result for result, _ in mp_aux({"batch": tasks})]
+        single_results = [mp_aux(task)[0][0] for task in tasks]
+        assert batch_results == single_results
+        assert all(result[1] is not None for result in batch_results)
+
+    # The batches were computed together, without falling back to one file
+    # at a time
+    assert "Traceback" not in capsys.readouterr().out
+
+
+@pytest.mark.fast
+@pytest.mark.parametrize("is_batch", [False, True])
+def test_candidates_of_high_symmetry_cell(tmpdir, monkeypatch, is_batch):
+    # Cubic cell whose supercell holds every point 3 times
+    file_path = shutil.copy("tests/data/tag/1942974.cif", tmpdir)
+    cif = Cif(file_path, is_formatted=True)
+    structure = get_structure(cif)
+    site_neighbors, _ = neighbor.compute_site_neighbors(*structure)
+
+    # Duplicate points are removed before the candidates are cut, so fewer
+    # candidates still hold the nearest distinct neighbours
+    monkeypatch.setattr(neighbor, "CANDIDATE_COUNT", 24)
+    if is_batch:
+        [(cut_site_neighbors, _)] = neighbor.compute_batch_site_neighbors([structure])
+    else:
+        cut_site_neighbors, _ = neighbor.compute_site_neighbors(*structure)
+    for label, neighbors in site_neighbors.items():
+        assert cut_site_neighbors[label] == neighbors[:24]
+
+    CN_values = neighbor.get_CN_unique_values_by_min_dist_method(cut_site_neighbors)
+    assert CN_values == cif.CN_unique_values_by_min_dist_method
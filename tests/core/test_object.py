@@ -0,0 +1,79 @@
+import os
+import pickle
+import pytest
+import shutil
+from cifkit import CifEnsemble
+from core.utils import object, validate, workers
+from core.utils.object import init_cif_ensemble, build_cif_ensemble, load_cif
+
+
+@pytest.fixture
+def parallel_parsing(monkeypatch):
+    # Use the pool for the few test files, even on a single core
+    monkeypatch.setattr(object, "PARALLEL_MIN_FILE_COUNT", 1)
+    monkeypatch.setattr(workers, "get_available_cpu_count", lambda: 4)
+
+
+@pytest.mark.fast
+def test_get_parse_worker_count(monkeypatch):
+    monkeypatch.setattr(workers, "get_available_cpu_count", lambda: 1)
+    monkeypatch.setattr(workers, "get_auto_worker_count", lambda **kwargs: 1)
+    assert object.get_parse_worker_count(4, 1000) == 1
+    assert object.get_parse_worker_count(None, 1000) == 1
+
+    monkeypatch.setattr(workers, "get_available_cpu_count", lambda: 8)
+    assert object.get_parse_worker_count(4, 1000) == 4
+    assert object.get_parse_worker_count(16, 1000) == 8
+    assert object.get_parse_worker_count(4, object.PARALLEL_MIN_FILE_COUNT - 1) == 1
+
+
+@pytest.mark.fast
+def test_init_cif_ensemble(parallel_parsing):
+    dir_path = "tests/data/supercell"
+    ensemble = init_cif_ensemble(dir_path, num_cpu=1)
+    parallel_ensemble = init_cif_ensemble(dir_path, num_cpu=2)
+
+    # Same files, points and statistics as the serial ensemble
+    assert parallel_ensemble.file_paths == ensemble.file_paths
+    assert parallel_ensemble.file_count == 12
+    for cif, parallel_cif in zip(ensemble.cifs, parallel_ensemble.cifs):
+        assert parallel_cif.file_name == cif.file_name
+        assert parallel_cif.supercell_points == cif.supercell_points
+    assert (
+        parallel_ensemble.composition_type_stats == ensemble.composition_type_stats
+    )
+    assert parallel_ensemble.structure_stats == ensemble.structure_stats
+
+
+@pytest.mark.fast
+def test_build_cif_ensemble(tmpdir):
+    """
+    Test the cifkit internals relied on, for the version in requirements.txt
+    """
+    tmp_dir_path = shutil.copytree("tests/data/supercell", tmpdir.join("supercell"))
+    ensemble = CifEnsemble(str(tmp_dir_path), preprocess=False)
+
+    # The workers send back the Cif objects without the parsed CIF block
+    results = [load_cif(file_path) for file_path in ensemble.file_paths]
+    cifs = [pickle.loads(pickle.dumps(cif)) for cif, *_ in results]
+    built_ensemble = build_cif_ensemble(str(tmp_dir_path), ensemble.file_paths, cifs)
+    assert sorted(vars(built_ensemble)) == sorted(vars(ensemble))
+
+
+@pytest.mark.fast
+@pytest.mark.parametrize("num_cpu", [1, 2])
+def test_init_cif_ensemble_relocate_invalid(
+    tmpdir, monkeypatch, parallel_parsing, num_cpu
+):
+    tmp_dir_path = shutil.copytree("tests/data/format", tmpdir.join("format"))
+
+    # Each file is parsed once, without a separate validation pass
+    monkeypatch.setattr(validate, "get_validation_error", None)
+    ensemble = init_cif_ensemble(
+        str(tmp_dir_path), num_cpu=num_cpu, relocate_invalid=True
+    )
+    assert [cif.file_name for cif in ensemble.cifs] == ["good_cif.cif"]
+    assert ensemble.file_count == 1
+    assert os.listdir(tmp_dir_path.join(validate.WRONG_LOOP_VALUE)) == [
+        "missing_loop.cif"
+    ]
@@ -0,0 +1,74 @@
+import os
+import mmap
+import pandas as pd
+import pytest
+import shutil
+from core.options.info import get_cif_folder_info
+from core.utils import report
+
+
+@pytest.mark.fast
+def test_file_report(tmpdir):
+    file_report = report.FileReport("CN", top_n=2)
+    for i, wall_time in enumerate([0.5, 2.0, 0.1, 1.0]):
+        file_report.add(
+            {
+                "file_name": f"{i}.cif",
+                "wall_time": wall_time,
+                "cpu_time": wall_time,
+                "peak_rss_increase_mb": float(i),
+                "batch_size": 1,
+            }
+        )
+    file_report.save(str(tmpdir))
+
+    # Only the top 2 files are kept, largest first
+    slowest = pd.read_csv(tmpdir.join("csv", f"{tmpdir.basename}_CN_slowest_files.csv"))
+    assert list(slowest["Filename"]) == ["1.cif", "3.cif"]
+    memory = pd.read_csv(tmpdir.join("csv", f"{tmpdir.basename}_CN_memory_files.csv"))
+    assert list(memory["Filename"]) == ["3.cif", "2.cif"]
+
+
+@pytest.mark.fast
+def test_file_report_disabled(tmpdir, monkeypatch):
+    monkeypatch.delenv(report.REPORT_TOP_N_ENV, raising=False)
+    file_report = report.open_report("CN")
+    file_report.add({"file_name": "1.cif", "wall_time": 1.0})
+    file_report.save(str(tmpdir))
+    assert not file_report.is_enabled
+    assert not os.path.exists(tmpdir.join("csv"))
+
+
+@pytest.mark.fast
+def test_get_profile_peak_rss(monkeypatch):
+    monkeypatch.setenv(report.REPORT_TOP_N_ENV, "2")
+    if not report.reset_peak_rss():
+        pytest.skip("the peak RSS cannot be reset on this platform")
+
+    # A file using less memory than an earlier file of the same worker still
+    # reports its own peak
+    increases = []
+    for size_mb in (64, 32):
+        start = report.start_profile()
+        with mmap.mmap(-1, size_mb * 1024**2) as data:
+            for i in range(0, len(data), mmap.PAGESIZE):
+                data[i] = 1
+        increases.append(report.get_profile(start, "1.cif")["peak_rss_increase_mb"])
+    assert increases[0] > 48
+    assert 16 < increases[1] < 48
+
+
+@pytest.mark.fast
+def test_get_cif_folder_info_report(tmpdir, monkeypatch):
+    monkeypatch.setenv(report.REPORT_TOP_N_ENV, "2")
+    tmp_dir_path = shutil.copytree("tests/data/info", tmpdir.join("info"))
+    get_cif_folder_info(tmp_dir_path, is_interactive_mode=False)
+
+    # Parsing and the info columns are reported separately
+    for option in ("parse", "info"):
+        csv_data = pd.read_csv(
+            tmp_dir_path.join("csv", f"info_{option}_slowest_files.csv")
+        )
+        assert len(csv_data) == 2
+        assert (csv_data["Supercell atom count"] > 0).all()
+        assert (csv_data["Atom site count"] > 0).all()
@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+import pytest
+from core.utils import results
+
+
+@pytest.fixture
+def store():
+    store = results.ResultStore(
+        {
+            "min_dist": "float64",
+            "atom_count": "int64",
+            "CN_values": "int64_list",
+            "pairs": "string_list",
+            "pair_min_dists": "float64_list",
+        }
+    )
+    store.set(
+        "250134.cif",
+        min_dist=2.5,
+        atom_count=364,
+        CN_values={14, 12},
+        pairs=["Co-Er", "Er-Er"],
+        pair_min_dists=[2.5, 3.1],
+    )
+    store.set("250143.cif")
+    return store
+
+
+@pytest.mark.fast
+def test_result_store(store):
+    assert len(store) == 2
+    assert "250134.cif" in store
+    assert store.get("250134.cif", "min_dist") == 2.5
+    assert store.get("250134.cif", "CN_values") == [12, 14]
+    assert store.get("250134.cif", "pairs") == ["Co-Er", "Er-Er"]
+
+    # Files that could not be processed have missing results
+    assert store.get("250143.cif", "min_dist") is None
+    assert store.get("250143.cif", "CN_values") is None
+
+    # Setting a file again replaces its row
+    store.set("250143.cif", min_dist=2.7, CN_values=[9], pair_min_dists=[None])
+    assert len(store) == 2
+    assert store.get("250143.cif", "min_dist") == 2.7
+    assert store.get("250143.cif", "CN_values") == [9]
+    assert store.get("250143.cif", "pair_min_dists") == [None]
+
+
+@pytest.mark.fast
+def test_result_store_grows():
+    store = results.ResultStore({"CN_values": "int64_list"})
+    file_count = results.INITIAL_CAPACITY * 2 + 1
+    for i in range(file_count):
+        store.set(f"{i}.cif", CN_values=range(i % 5))
+
+    assert len(store) == file_count
+    assert store.get("2048.cif", "CN_values") == [0, 1, 2]
+
+
+@pytest.mark.fast
+def test_result_store_tables(store, tmpdir):
+    df = store.to_dataframe({"min_dist": "Min distance (Å)", "CN_values": "CN"})
+    assert list(df.columns) == ["Filename", "Min distance (Å)", "CN"]
+    assert df["CN"][0] == "12 14"
+    assert pd.isna(df["CN"][1])
+    assert pd.isna(df["Min distance (Å)"][1])
+
+    pair_table = store.explode({"pairs": "Pair", "pair_min_dists": "Distance"})
+    assert pair_table.values.tolist() == [
+        ["250134.cif", "Co-Er", 2.5],
+        ["250134.cif", "Er-Er", 3.1],
+    ]
+
+    file_path = str(tmpdir.join("results.csv"))
+    store.save(file_path)
+    csv_data = pd.read_csv(file_path)
+    assert csv_data["atom_count"].tolist()[0] == 364
+    assert csv_data["pairs"].tolist()[0] == "Co-Er Er-Er"
+
+
+@pytest.mark.fast
+def test_result_store_parquet(store, tmpdir):
+    pytest.importorskip("pyarrow")
+    file_path = str(tmpdir.join("results.parquet"))
+    store.save(file_path, "parquet")
+    assert pd.read_parquet(file_path)["min_dist"].tolist()[0] == 2.5
+
+
+@pytest.mark.fast
+def test_result_store_size():
+    from core.options.min_distance import MIN_DIST_RESULT_COLUMNS, set_min_dist_result
+
+    file_count = 100_000
+    pair_min_dists = {"Co-Co": (2.5, 2.5), "Co-Er": (2.7, 3.0), "Er-Er": (3.1, 3.5)}
+    store = results.ResultStore(MIN_DIST_RESULT_COLUMNS)
+    for i in range(file_count):
+        set_min_dist_result(store, (f"{1000000 + i}.cif", 2.5, pair_min_dists))
+
+    # File names are interned, not kept as a Python string per file
+    assert isinstance(store.file_names, results.StringTable)
+    assert store.file_names.index.dtype == np.int32
+    assert store.get("1099999.cif", "pair_min_dists") == [2.5, 2.7, 3.1]
+
+    # At most 112 MB per million files with 3 element pairs, or 64 MB with
+    # 2 CN values, growth slack included
+    assert store.nbytes / file_count < 112
+
+    store = results.ResultStore({"CN_values": "int16_list"})
+    for i in range(file_count):
+        store.set(f"{1000000 + i}.cif", CN_values={12, 14})
+    assert store.nbytes / file_count < 64
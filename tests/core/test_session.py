@@ -0,0 +1,31 @@
+import pytest
+import shutil
+from core.options.min_distance import filter_files_by_min_dist
+from core.options.coordination import move_files_based_on_coordination_number
+from core.utils import session
+from cifkit.utils.folder import get_file_count
+
+
+@pytest.mark.slow
+def test_session_reuses_pool_files_and_features(tmpdir, capsys):
+    source_dir = "tests/data/min_dist"
+    tmp_dir_path = shutil.copytree(source_dir, tmpdir.join("dist"))
+
+    with session.start_session() as active_session:
+        filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False, num_cpu=1)
+        pool = active_session.pool
+        capsys.readouterr()
+
+        # The 3 remaining files are neither parsed nor computed again
+        filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False, num_cpu=1)
+        output = capsys.readouterr().out
+        assert "Reused 3 parsed files from the session" in output
+        assert "Reused min distances of 3 files from the session" in output
+
+        move_files_based_on_coordination_number(
+            tmp_dir_path, is_interactive_mode=False, numbers=[14], option=2, num_cpu=1
+        )
+        assert active_session.pool is pool
+
+    assert session.get_active_session() is None
+    assert get_file_count(tmp_dir_path.join("dist_between_2.6_12.0")) == 2
@@ -0,0 +1,60 @@
+import glob
+import numpy as np
+import pandas as pd
+import pytest
+import shutil
+from multiprocessing import shared_memory
+from cifkit import Cif
+from core.options.min_distance import filter_files_by_min_dist
+from core.utils import cache, shared
+
+
+@pytest.mark.fast
+def test_share_structures(tmpdir, monkeypatch):
+    monkeypatch.setenv(shared.SHARED_MEMORY_ENV, "1")
+    tmp_dir_path = shutil.copytree("tests/data/min_dist", tmpdir.join("dist"))
+    file_paths = sorted(glob.glob(str(tmp_dir_path.join("*.cif"))))[:3]
+    cifs = [Cif(file_path, is_formatted=True) for file_path in file_paths]
+    tasks = [
+        {"cif_path": file_paths[0]},
+        {"batch": [{"cif_path": file_path} for file_path in file_paths[1:]]},
+    ]
+
+    with shared.share_structures(tasks, {cif.file_name: cif for cif in cifs}):
+        file_tasks = list(shared.iter_file_tasks(tasks))
+        block_name = file_tasks[0]["structure"]["block_name"]
+        for task, cif in zip(file_tasks, cifs):
+            structure = shared.load_cif(task["cif_path"], task["structure"])
+            assert structure.unitcell_points == cif.unitcell_points
+            assert structure.supercell_points == cif.supercell_points
+            assert structure.unitcell_lengths == cif.unitcell_lengths
+
+            # The arrays passed to core.utils.neighbor are views of the block
+            unitcell, supercell, _ = cache.get_point_arrays(structure)
+            block_values = np.frombuffer(
+                shared.attach_block(block_name).buf, dtype=float
+            )
+            assert all(
+                np.shares_memory(array, block_values) for array in unitcell + supercell
+            )
+            del block_values
+
+    # The block is unlinked and the tasks no longer refer to it
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=block_name)
+    assert all("structure" not in task for task in shared.iter_file_tasks(tasks))
+
+
+@pytest.mark.slow
+def test_filter_files_by_min_dist_shared(tmpdir, monkeypatch):
+    min_dists = []
+    for name, is_shared in (("dist", False), ("dist_shared", True)):
+        if is_shared:
+            monkeypatch.setenv(shared.SHARED_MEMORY_ENV, "1")
+        tmp_dir_path = shutil.copytree("tests/data/min_dist", tmpdir.join(name))
+        filter_files_by_min_dist(tmp_dir_path, is_interactive_mode=False, num_cpu=2)
+        csv_data = pd.read_csv(tmp_dir_path.join("plot", "min-dist.csv"))
+        min_dists.append(dict(zip(csv_data["Filename"], csv_data["Min distance (Å)"])))
+
+    # Same min distances without parsing the files again in the workers
+    assert min_dists[0] == min_dists[1]
@@ -0,0 +1,47 @@
+import json
+import pytest
+import numpy as np
+from core.utils.summary import StreamingSummary, merge_summaries
+
+
+@pytest.fixture
+def min_dists():
+    rng = np.random.default_rng(0)
+    return np.round(rng.uniform(2.0, 3.5, 1000), 3)
+
+
+@pytest.mark.fast
+def test_summary_histogram_matches_values(min_dists):
+    summary = StreamingSummary("Min distance (Å)", 0.001)
+    for value in min_dists:
+        summary.add(value)
+
+    values, counts = summary.get_bin_values_and_counts()
+    expected_counts, expected_edges = np.histogram(min_dists, 50)
+    summary_counts, summary_edges = np.histogram(values, 50, weights=counts)
+    assert np.array_equal(summary_counts, expected_counts)
+    assert np.array_equal(summary_edges, expected_edges)
+
+    for q in (0.01, 0.5, 0.99):
+        expected = np.quantile(min_dists, q, method="lower")
+        assert summary.quantile(q) == pytest.approx(expected, rel=0.01)
+
+
+@pytest.mark.fast
+def test_summary_merge_across_shards(min_dists):
+    shards = []
+    for shard in np.array_split(min_dists, 4):
+        summary = StreamingSummary("Min distance (Å)", 0.001)
+        for value in shard:
+            summary.add(value)
+        # Shards are saved and loaded as JSON
+        data = json.loads(json.dumps(summary.to_dict()))
+        shards.append(StreamingSummary.from_dict(data))
+
+    whole = StreamingSummary("Min distance (Å)", 0.001)
+    for value in min_dists:
+        whole.add(value)
+
+    merged = merge_summaries(shards)
+    assert merged.bin_counts == whole.bin_counts
+    assert merged.get_summary_row() == whole.get_summary_row()
@@ -0,0 +1,20 @@
+import pytest
+import shutil
+from cifkit import Cif
+from core.utils import validate
+
+# ICSD citation loops closing with a text field line, e.g.
+# "; 1927 1927 1 156 SUNVAQ"
+ICSD_FILE_NAMES = ["EntryWithCollCode53971.cif", "EntryWithCollCode641992.cif"]
+
+
+@pytest.mark.fast
+def test_relocate_invalid_files_keeps_text_field_loops(tmpdir):
+    for file_name in ICSD_FILE_NAMES:
+        shutil.copy(f"20240817_cif_ICSD/{file_name}", tmpdir)
+
+    # Parsed by cifkit, so not moved before processing
+    for file_name in ICSD_FILE_NAMES:
+        Cif(str(tmpdir.join(file_name)), is_formatted=True)
+        assert validate.get_validation_error(str(tmpdir.join(file_name))) is None
+    assert validate.relocate_invalid_files(str(tmpdir)) == {}
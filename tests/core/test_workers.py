@@ -0,0 +1,88 @@
+import os
+import time
+import signal
+import pytest
+import multiprocessing as mp
+from core.utils import workers, session
+
+
+def square(value):
+    return value**2
+
+
+@pytest.mark.fast
+def test_get_auto_worker_count(monkeypatch):
+    monkeypatch.setattr(workers, "get_available_cpu_count", lambda: 16)
+    monkeypatch.setattr(workers, "get_available_memory_mb", lambda: 1000)
+
+    # 800 MB usable, the largest file needs 400 MB
+    assert workers.get_auto_worker_count([150, 400]) == 2
+    assert workers.get_auto_worker_count([100]) == 8
+    assert workers.get_auto_worker_count([100], task_count=3) == 3
+    assert workers.get_auto_worker_count([5000]) == 1
+
+
+@pytest.mark.fast
+def test_imap_unordered_within_memory(monkeypatch):
+    # Memory runs low after the first result, so one task runs at a time
+    available_mbs = iter([1000] + [100] * 10)
+    monkeypatch.setattr(workers, "get_available_memory_mb", lambda: next(available_mbs))
+    limits = []
+    get_in_flight_limit = workers.get_in_flight_limit
+    monkeypatch.setattr(
+        workers,
+        "get_in_flight_limit",
+        lambda *args: limits.append(get_in_flight_limit(*args)) or limits[-1],
+    )
+
+    with mp.Pool(2) as pool:
+        results = workers.imap_unordered_within_memory(
+            pool, square, range(6), [200] * 6, 2
+        )
+        assert sorted(results) == [0, 1, 4, 9, 16, 25]
+    assert limits[0] == 2
+    assert limits[1:] == [1] * (len(limits) - 1)
+
+
+def sleep_or_raise(value):
+    if value == 0:
+        raise ValueError("bad file")
+    time.sleep(0.5)
+    return value
+
+
+def kill_worker(value):
+    if value == 0:
+        os.kill(os.getpid(), signal.SIGKILL)
+    return value
+
+
+@pytest.mark.fast
+def test_imap_unordered_within_memory_error():
+    with mp.Pool(2) as pool:
+        results = workers.imap_unordered_within_memory(
+            pool, sleep_or_raise, range(4), [1] * 4, 2
+        )
+        with pytest.raises(ValueError, match="bad file"):
+            list(results)
+        # The task still running was waited for, and the pool can be reused
+        assert not pool._cache
+        assert pool.apply(square, (3,)) == 9
+
+
+@pytest.mark.fast
+def test_imap_unordered_within_memory_lost_worker(monkeypatch):
+    monkeypatch.setattr(workers, "WORKER_POLL_INTERVAL_S", 0.1)
+    with session.start_session() as active_session:
+        with session.open_pool(2) as pool:
+            results = workers.imap_unordered_within_memory(
+                pool, kill_worker, range(4), [1] * 4, 2
+            )
+            with pytest.raises(RuntimeError, match="exited with code -9"):
+                list(results)
+
+        # The terminated pool is replaced by the session
+        with session.open_pool(2) as new_pool:
+            assert new_pool is not pool
+            assert new_pool.apply(square, (3,)) == 9
+        assert active_session.pool is new_pool